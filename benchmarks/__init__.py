@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for Uturn's hot paths.
+
+Run them from the root of the repository::
+
+    python -m benchmarks
+    python -m benchmarks --save baseline.json
+    python -m benchmarks --compare baseline.json
+
+Each benchmark reports the number of operations per second and the peak
+memory allocated during a single operation (measured with ``tracemalloc``).
+Results can be saved as a JSON baseline; comparing against a baseline flags
+every benchmark that got slower (or allocates more) than the threshold.
+
+"""
+from __future__ import print_function
+import gc
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.test.utils import override_settings
+
+
+#: Registered benchmarks, in order of registration.
+BENCHMARKS = []
+
+#: Modules registering benchmarks.
+MODULES = ('http', 'middleware', 'tags', 'body_lookup', 'signing',
+           'placeholders', 'rewrite')
+
+
+class Benchmark(object):
+    """
+    A named benchmark.
+
+    ``setup`` is called once and returns the callable to measure; it takes
+    no arguments. Both run with the given ``settings`` overridden. When the
+    callable has a ``stats`` attribute, it's called after the measurements
+    and the dictionary it returns is added to the results.
+
+    """
+    def __init__(self, name, setup, settings=None, min_time=0.2):
+        self.name = name
+        self.setup = setup
+        self.settings = settings or {}
+        self.min_time = min_time
+
+    def run(self, repeat=3):
+        with override_settings(**self.settings):
+            operation = self.setup()
+            operation()
+            number = _calibrate(operation, self.min_time)
+            best = min(_time(operation, number) for i in range(repeat))
+            result = {
+                'ops': number / best if best else float('inf'),
+                'peak': _peak(operation),
+            }
+            stats = getattr(operation, 'stats', None)
+            if stats is not None:
+                result.update(stats())
+            return result
+
+
+def benchmark(name, settings=None, min_time=0.2):
+    """
+    Registers the decorated setup function as a benchmark.
+
+    """
+    def register(setup):
+        BENCHMARKS.append(Benchmark(name, setup, settings, min_time))
+        return setup
+    return register
+
+
+def setup_django(**overrides):
+    """
+    Configures Django for the benchmarks.
+
+    """
+    if settings.configured:
+        return
+    options = dict(
+        DEBUG=False,
+        INSTALLED_APPS=('uturn',),
+        ROOT_URLCONF='benchmarks.urls',
+        ALLOWED_HOSTS=['*'],
+        MIDDLEWARE=[],
+        # Keep uploads in memory: measure parsing, not disk access.
+        FILE_UPLOAD_MAX_MEMORY_SIZE=100 * 1024 * 1024,
+        DATA_UPLOAD_MAX_MEMORY_SIZE=None,
+        TEMPLATES=[{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'OPTIONS': {
+                'context_processors': [
+                    'django.template.context_processors.request',
+                ],
+            },
+        }],
+    )
+    options.update(overrides)
+    settings.configure(**options)
+    import django
+    django.setup()
+
+
+def _time(operation, number):
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for i in range(number):
+            operation()
+        return time.perf_counter() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def _calibrate(operation, min_time):
+    number = 1
+    while True:
+        if _time(operation, number) >= min_time or number >= 10 ** 7:
+            return number
+        number *= 10
+
+
+def _peak(operation):
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        operation()
+        return tracemalloc.get_traced_memory()[1] - current
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import argparse
+import importlib
+import json
+import platform
+import sys
+
+import django
+
+from . import BENCHMARKS, MODULES, setup_django
+
+
+#: Keys of the results every benchmark reports.
+RESULTS = ('ops', 'peak')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description="Benchmark Uturn's hot paths")
+    parser.add_argument('names', nargs='*',
+                        help='only run benchmarks starting with these names')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of timing runs per benchmark')
+    parser.add_argument('--save', metavar='FILE',
+                        help='store the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='flag regressions against a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative change considered a regression '
+                             '(default: 0.1)')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    for module in MODULES:
+        importlib.import_module('benchmarks.' + module)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline['python'] != _python() or baseline['django'] != _django():
+            print('Warning: baseline was recorded with Python %s and Django '
+                  '%s' % (baseline['python'], baseline['django']))
+
+    print('Python %s, Django %s' % (_python(), _django()))
+    print('%-50s %14s %12s' % ('benchmark', 'ops/sec', 'peak bytes'))
+    results = {}
+    regressions = []
+    for bench in BENCHMARKS:
+        if args.names and not bench.name.startswith(tuple(args.names)):
+            continue
+        result = results[bench.name] = bench.run(args.repeat)
+        flags = ''
+        if baseline and bench.name in baseline['results']:
+            flags = _compare(baseline['results'][bench.name], result,
+                             args.threshold)
+            if flags:
+                regressions.append(bench.name)
+        stats = ' '.join('%s=%.3f' % (key, result[key])
+                         for key in sorted(result) if key not in RESULTS)
+        print('%-50s %14.1f %12d %s' % (bench.name, result['ops'],
+                                        result['peak'],
+                                        ' '.join(filter(None, (stats, flags)))))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': _python(), 'django': _django(),
+                       'results': results}, f, indent=2, sort_keys=True)
+    if regressions:
+        print('%d regression(s): %s' % (len(regressions),
+                                        ', '.join(regressions)))
+        return 1
+    return 0
+
+
+def _compare(old, new, threshold):
+    flags = []
+    if new['ops'] < old['ops'] * (1 - threshold):
+        flags.append('SLOWER (%.1f%%)' % (100.0 * new['ops'] / old['ops'] - 100))
+    if new['peak'] > old['peak'] * (1 + threshold) and \
+            new['peak'] - old['peak'] > 64:
+        flags.append('MORE MEMORY (%+d bytes)' % (new['peak'] - old['peak']))
+    return ' '.join(flags)
+
+
+def _python():
+    return platform.python_version()
+
+
+def _django():
+    return django.get_version()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the cost of looking up the next parameter on a POST request carrying
+a 50 MB multipart upload, for each ``UTURN_BODY_LOOKUP`` mode. Compare with
+``body_lookup.none``, which only builds the request.
+
+"""
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, RequestFactory, \
+                               encode_multipart
+
+from uturn.http import get_redirect_url
+
+from . import benchmark
+
+
+UPLOAD_SIZE = 50 * 1024 * 1024
+
+_body = []
+
+
+class Upload(object):
+    name = 'upload.bin'
+
+    def read(self):
+        return b'x' * UPLOAD_SIZE
+
+
+def _request():
+    if not _body:
+        _body.append(encode_multipart(BOUNDARY, {'file': Upload()}))
+    body = _body[0]
+    factory = RequestFactory()
+
+    def request():
+        return factory.generic('POST', '/page/?next=/query', body,
+                               content_type=MULTIPART_CONTENT)
+    return request
+
+
+@benchmark('body_lookup.none', min_time=1)
+def none():
+    return _request()
+
+
+def _register(mode):
+    def setup():
+        request = _request()
+        return lambda: get_redirect_url(request())
+    benchmark('body_lookup.' + mode, settings={'UTURN_BODY_LOOKUP': mode},
+              min_time=1)(setup)
+
+
+for mode in ('always', 'form', 'parsed'):
+    _register(mode)
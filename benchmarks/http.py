@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+from django.http import HttpResponse, HttpResponseRedirect
+from django.test.client import RequestFactory
+
+from uturn.http import build_uturn_urls, get_redirect_url, \
+                       invalidate_redirect_url, smart_response
+
+from . import benchmark
+
+
+TENANTS = ['.tenant%d.example.com' % i for i in range(300)]
+
+
+def _get_redirect_url(next, cached=False):
+    request = RequestFactory().get('/page/', {'next': next})
+
+    def run():
+        if not cached:
+            invalidate_redirect_url(request)
+        return get_redirect_url(request)
+    return run
+
+
+@benchmark('get_redirect_url.relative')
+def relative():
+    return _get_redirect_url('/tickets/?status=open&page=2')
+
+
+@benchmark('get_redirect_url.relative.metrics',
+           settings={'UTURN_METRICS': True})
+def relative_metrics():
+    return _get_redirect_url('/tickets/?status=open&page=2')
+
+
+@benchmark('get_redirect_url.relative.cached')
+def relative_cached():
+    return _get_redirect_url('/tickets/?status=open&page=2', cached=True)
+
+
+@benchmark('get_redirect_url.relative.resolved',
+           settings={'UTURN_RESOLVE_TARGETS': True})
+def relative_resolved():
+    return _get_redirect_url('/tickets/42/?status=open&page=2')
+
+
+@benchmark('get_redirect_url.relative.resolved.uncached',
+           settings={'UTURN_RESOLVE_TARGETS': True,
+                     'UTURN_RESOLVE_CACHE_SIZE': 0})
+def relative_resolved_uncached():
+    return _get_redirect_url('/tickets/42/?status=open&page=2')
+
+
+@benchmark('get_redirect_url.relative.canonical',
+           settings={'UTURN_CANONICALIZE': True})
+def relative_canonical():
+    return _get_redirect_url('/tickets/?status=open&utm_source=mail&page=2')
+
+
+@benchmark('get_redirect_url.absolute.current_host')
+def absolute_current_host():
+    return _get_redirect_url('http://testserver/tickets/')
+
+
+@benchmark('get_redirect_url.absolute.allowed',
+           settings={'UTURN_ALLOWED_HOSTS': TENANTS})
+def absolute_allowed():
+    return _get_redirect_url('https://www.tenant299.example.com/tickets/')
+
+
+@benchmark('get_redirect_url.absolute.rejected',
+           settings={'UTURN_ALLOWED_HOSTS': TENANTS})
+def absolute_rejected():
+    return _get_redirect_url('https://evil.example.org/tickets/')
+
+
+@benchmark('get_redirect_url.missing')
+def missing():
+    request = RequestFactory().get('/page/')
+
+    def run():
+        invalidate_redirect_url(request)
+        return get_redirect_url(request)
+    return run
+
+
+def _smart_response(response):
+    request = RequestFactory().get('/page/', {'next': '/tickets/'})
+
+    def run():
+        invalidate_redirect_url(request)
+        response['Location'] = '/default/'
+        return smart_response(request, response)
+    return run
+
+
+@benchmark('smart_response.redirect')
+def smart_response_redirect():
+    return _smart_response(HttpResponseRedirect('/default/'))
+
+
+@benchmark('smart_response.response')
+def smart_response_response():
+    return _smart_response(HttpResponse(b'A page'))
+
+
+def _build_uturn_urls():
+    request = RequestFactory().get('/tickets/')
+    targets = [('ticket', (pk % 50,), None) for pk in range(1000)]
+    return lambda: build_uturn_urls(request, targets)
+
+
+@benchmark('build_uturn_urls.1000')
+def build_uturn_urls_1000():
+    return _build_uturn_urls()
+
+
+@benchmark('build_uturn_urls.1000.cached',
+           settings={'UTURN_REVERSE_CACHE_SIZE': 1024})
+def build_uturn_urls_1000_cached():
+    return _build_uturn_urls()
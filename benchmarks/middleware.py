@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from django.core.handlers.base import BaseHandler
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+
+from . import benchmark
+
+
+UTURN = ['uturn.middleware.UturnMiddleware']
+
+
+def _handler(middleware, path, data=None):
+    with override_settings(MIDDLEWARE=middleware):
+        handler = BaseHandler()
+        handler.load_middleware()
+    factory = RequestFactory()
+
+    def run():
+        return handler.get_response(factory.get(path, data))
+    return run
+
+
+@benchmark('middleware.none.page')
+def none_page():
+    return _handler([], '/page/')
+
+
+@benchmark('middleware.uturn.page')
+def uturn_page():
+    return _handler(UTURN, '/page/')
+
+
+@benchmark('middleware.none.redirect')
+def none_redirect():
+    return _handler([], '/redirect/', {'next': '/page/'})
+
+
+@benchmark('middleware.uturn.redirect')
+def uturn_redirect():
+    return _handler(UTURN, '/redirect/', {'next': '/page/'})
+
+
+@benchmark('middleware.uturn.redirect.metrics',
+           settings={'UTURN_METRICS': True})
+def uturn_redirect_metrics():
+    return _handler(UTURN, '/redirect/', {'next': '/page/'})
+
+
+@benchmark('middleware.uturn.excluded',
+           settings={'UTURN_EXCLUDE_PATHS': ['/static/', '/health/',
+                                             '/redirect/']})
+def uturn_excluded():
+    return _handler(UTURN, '/redirect/', {'next': '/page/'})
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+A cached list page of 100 ``uturn`` links, requested with a different next
+URL each time (like a page reached from many origins). Without placeholders
+every next URL gets its own cache entry; with placeholders a single entry
+serves them all. ``hit_ratio`` is the fraction of requests served from the
+cache.
+
+"""
+from django.core.cache import cache
+from django.core.handlers.base import BaseHandler
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+
+from . import benchmark, urls
+
+
+CACHE = ['django.middleware.cache.UpdateCacheMiddleware',
+         'django.middleware.cache.FetchFromCacheMiddleware']
+
+PLACEHOLDERS = ['uturn.middleware.UturnPlaceholderMiddleware'] + CACHE
+
+
+def _cached_page(middleware):
+    with override_settings(MIDDLEWARE=middleware):
+        handler = BaseHandler()
+        handler.load_middleware()
+    factory = RequestFactory()
+    cache.clear()
+    counter = [0]
+    del urls.rendered[:]
+
+    def run():
+        counter[0] += 1
+        next = '/tickets/?page=%d' % counter[0]
+        return handler.get_response(factory.get('/ticket-list/',
+                                                {'next': next}))
+
+    def stats():
+        return {'hit_ratio': 1 - float(len(urls.rendered)) / counter[0]}
+    run.stats = stats
+    return run
+
+
+@benchmark('placeholders.cached_page.next')
+def cached_page_next():
+    return _cached_page(CACHE)
+
+
+@benchmark('placeholders.cached_page.placeholders',
+           settings={'UTURN_PLACEHOLDERS': True})
+def cached_page_placeholders():
+    return _cached_page(PLACEHOLDERS)
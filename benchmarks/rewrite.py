@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+``UturnLinkMiddleware`` on 1 MB pages: a table of links, one in ten of them
+marked with ``data-uturn``, served as a regular response and streamed in
+8 KB chunks. The unmarked page measures the cost of looking for the marker.
+
+"""
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test.client import RequestFactory
+
+from . import benchmark
+from uturn.middleware import UturnLinkMiddleware
+
+
+SIZE = 1024 * 1024
+
+CHUNK_SIZE = 8192
+
+
+def _page(marked=True):
+    rows = []
+    length = 0
+    pk = 0
+    while length < SIZE:
+        pk += 1
+        marker = ' data-uturn' if marked and pk % 10 == 0 else ''
+        row = ("<tr><td class='title'>Ticket %d</td><td>"
+               "<a href='/tickets/%d/'%s>edit</a></td></tr>\n" %
+               (pk, pk, marker))
+        rows.append(row)
+        length += len(row)
+    return ('<html><body><table>%s</table></body></html>' %
+            ''.join(rows)).encode('utf-8')
+
+
+def _response(page):
+    middleware = UturnLinkMiddleware()
+    request = RequestFactory().get('/tickets/', {'status': 'open'})
+
+    def run():
+        return middleware.process_response(request, HttpResponse(page))
+    return run
+
+
+def _streaming(page):
+    middleware = UturnLinkMiddleware()
+    request = RequestFactory().get('/tickets/', {'status': 'open'})
+    chunks = [page[i:i + CHUNK_SIZE] for i in range(0, len(page), CHUNK_SIZE)]
+
+    def run():
+        response = middleware.process_response(
+            request, StreamingHttpResponse(iter(chunks)))
+        for chunk in response.streaming_content:
+            pass
+    return run
+
+
+@benchmark('rewrite.response.1mb.unmarked')
+def response_unmarked():
+    return _response(_page(marked=False))
+
+
+@benchmark('rewrite.response.1mb')
+def response_marked():
+    return _response(_page())
+
+
+@benchmark('rewrite.streaming.1mb.unmarked')
+def streaming_unmarked():
+    return _streaming(_page(marked=False))
+
+
+@benchmark('rewrite.streaming.1mb')
+def streaming_marked():
+    return _streaming(_page())
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Compares verifying signed next URLs with validating them by parsing: see the
+``get_redirect_url`` benchmarks for the latter.
+
+"""
+from uturn.signing import sign
+
+from . import benchmark
+from .http import TENANTS, _get_redirect_url
+
+
+SIGNED = {
+    'UTURN_SIGNED': True,
+    'UTURN_SIGNING_KEYS': ['current', 'previous'],
+    'UTURN_ALLOWED_HOSTS': TENANTS,
+}
+
+REQUIRED = dict(SIGNED, UTURN_REQUIRE_SIGNATURE=True)
+
+
+@benchmark('signing.sign', settings=SIGNED)
+def signing_sign():
+    return lambda: sign('/tickets/?status=open&page=2')
+
+
+@benchmark('signing.verify.relative', settings=SIGNED)
+def verify_relative():
+    return _get_redirect_url(sign('/tickets/?status=open&page=2'))
+
+
+@benchmark('signing.verify.absolute', settings=SIGNED)
+def verify_absolute():
+    return _get_redirect_url(sign('https://www.tenant299.example.com/tickets/'))
+
+
+@benchmark('signing.reject.forged', settings=REQUIRED)
+def reject_forged():
+    return _get_redirect_url('https://evil.example.org/:AAAAAAAAAAAAAAAAAAAAAA')
+
+
+@benchmark('signing.reject.unsigned', settings=REQUIRED)
+def reject_unsigned():
+    return _get_redirect_url('https://evil.example.org/tickets/')
+
+
+@benchmark('signing.fallback.forged', settings=SIGNED)
+def fallback_forged():
+    return _get_redirect_url('https://evil.example.org/:AAAAAAAAAAAAAAAAAAAAAA')
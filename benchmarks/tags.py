@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from django.template import RequestContext, Template
+from django.test.client import RequestFactory
+try:
+    import jinja2
+except ImportError:
+    jinja2 = None
+
+from . import benchmark
+
+
+SIZES = (1, 100, 10000)
+
+
+def _render(tag, count, data=None):
+    template = Template('{% load uturn %}' + (tag + '\n') * count)
+    request = RequestFactory().get('/tickets/', data)
+
+    def run():
+        return template.render(RequestContext(request))
+    return run
+
+
+def _render_jinja2(tag, count, data=None):
+    env = jinja2.Environment(autoescape=True,
+                             extensions=['uturn.jinja2.UturnExtension'])
+    template = env.from_string((tag + '\n') * count)
+    request = RequestFactory().get('/tickets/', data)
+
+    def run():
+        return template.render(request=request, pk=1)
+    return run
+
+
+def _register(name, tag, data=None, settings=None, render=_render):
+    for count in SIZES:
+        def setup(count=count):
+            return render(tag, count, data)
+        benchmark('tags.%s.%d' % (name, count), settings=settings)(setup)
+
+
+_register('url', "{% url 'ticket' 1 %}")
+_register('uturn', "{% uturn 'ticket' 1 %}")
+_register('uturn.cached', "{% uturn 'ticket' 1 %}",
+          settings={'UTURN_REVERSE_CACHE_SIZE': 1024})
+_register('defaulturl', "{% defaulturl 'ticket-list' %}")
+_register('defaulturl.next', "{% defaulturl 'ticket-list' %}",
+          {'next': '/tickets/?status=open'})
+_register('uturn_param.next', "{% uturn_param %}",
+          {'next': '/tickets/?status=open'})
+
+if jinja2 is not None:
+    _register('jinja2.uturn', "{% uturn 'ticket', 1 %}",
+              render=_render_jinja2)
+    _register('jinja2.uturn.variable', "{% uturn 'ticket', pk %}",
+              render=_render_jinja2)
+    _register('jinja2.uturn.global', "{{ uturn('ticket', 1) }}",
+              render=_render_jinja2)
+    _register('jinja2.defaulturl', "{% defaulturl 'ticket-list' %}",
+              render=_render_jinja2)
+    _register('jinja2.defaulturl.next', "{% defaulturl 'ticket-list' %}",
+              {'next': '/tickets/?status=open'}, render=_render_jinja2)
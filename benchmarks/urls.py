@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from django.http import HttpResponse, HttpResponseRedirect
+from django.template import RequestContext, Template
+from django.urls import re_path
+
+
+def page(request):
+    return HttpResponse(b'<html><body>A page</body></html>')
+
+
+def redirect(request):
+    return HttpResponseRedirect('/tickets/')
+
+
+def ticket(request, pk):
+    return HttpResponse(b'A ticket')
+
+
+#: Set each time ``ticket_list`` renders its template.
+rendered = []
+
+ticket_list_template = Template(
+    '{% load uturn %}<html><body><ul>' +
+    ''.join("<li><a href='{%% uturn 'ticket' %d %%}'>Ticket %d</a></li>" %
+            (pk, pk) for pk in range(100)) +
+    "</ul><a href='{% defaulturl 'page' %}'>Back</a>"
+    "<form method='post'>{% uturn_param %}</form></body></html>")
+
+
+def ticket_list(request):
+    rendered.append(True)
+    return HttpResponse(ticket_list_template.render(RequestContext(request)))
+
+
+urlpatterns = [
+    re_path(r'^page/$', page, name='page'),
+    re_path(r'^redirect/$', redirect, name='redirect'),
+    re_path(r'^tickets/$', page, name='ticket-list'),
+    re_path(r'^tickets/(?P<pk>\d+)/$', ticket, name='ticket'),
+    re_path(r'^ticket-list/$', ticket_list, name='ticket-list-page'),
+]
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import django
 from django.conf import settings
 from django.core.management import call_command
 
@@ -14,11 +15,18 @@ def main():
             }
         },
         ROOT_URLCONF='uturn.tests.urls',
-        TEMPLATE_CONTEXT_PROCESSORS = (
-            'django.core.context_processors.request',
-        ),
+        SECRET_KEY='uturn-tests',
+        TEMPLATES = [{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'OPTIONS': {
+                'context_processors': (
+                    'django.template.context_processors.request',
+                ),
+            },
+        }],
     )
-    call_command('test', 'uturn')
+    django.setup()
+    call_command('test', 'uturn.tests')
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
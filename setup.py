@@ -7,7 +7,8 @@ setup(
     author='Kevin Wetzels',
     author_email='kevin@roam.be',
     url='https://github.com/roam/django-uturn',
-    install_requires=['Django>=1.4'],
+    install_requires=['Django>=3.2'],
+    python_requires='>=3.8',
     packages=['uturn', 'uturn.templatetags'],
     license='BSD',
     description='Overriding redirects in Django, to return where you came '\
@@ -16,13 +17,19 @@ setup(
     classifiers = [
         'Development Status :: 5 - Production/Stable',
         'Environment :: Web Environment',
+        'Framework :: Django',
+        'Framework :: Django :: 3.2',
+        'Framework :: Django :: 4.2',
+        'Framework :: Django :: 5.2',
         'Intended Audience :: Developers',
         'License :: OSI Approved :: BSD License',
         'Operating System :: OS Independent',
         'Programming Language :: Python',
-        'Programming Language :: Python :: 2.6',
-        'Programming Language :: Python :: 2.7',
-        'Programming Language :: Python :: 3.2',
-        'Programming Language :: Python :: 3.3',
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
+        'Programming Language :: Python :: 3.12',
    ],
 )
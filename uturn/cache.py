@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple, OrderedDict
+from threading import Lock
+
+from django.urls import get_resolver
+
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+#: Returned by ``LRUCache.get`` for missing keys unless told otherwise.
+MISSING = object()
+
+
+class LRUCache(object):
+    """
+    A bounded, thread safe mapping evicting the least recently used entries.
+
+    Keeps track of hits and misses; use ``info`` to retrieve the statistics.
+
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize,
+                         len(self._data))
+
+    def __len__(self):
+        return len(self._data)
+
+
+class URLCache(LRUCache):
+    """
+    An ``LRUCache`` for values derived from the URL configuration.
+
+    It's cleared whenever Django's URL caches are cleared (by
+    ``clear_url_caches``, e.g. when ``ROOT_URLCONF`` changes): the default
+    resolver is rebuilt when that happens, which this cache notices.
+
+    """
+    def __init__(self, maxsize):
+        super(URLCache, self).__init__(maxsize)
+        self._resolver = None
+
+    def get(self, key, default=MISSING):
+        self._check_resolver()
+        return super(URLCache, self).get(key, default)
+
+    def set(self, key, value):
+        self._check_resolver()
+        super(URLCache, self).set(key, value)
+
+    def _check_resolver(self):
+        resolver = get_resolver(None)
+        if resolver is not self._resolver:
+            self.clear()
+            self._resolver = resolver
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+import fnmatch
+from operator import itemgetter
+import re
+from urllib.parse import unquote_plus
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.dispatch import receiver
+from django.http.request import split_domain_port
+
+from .cache import LRUCache, MISSING, URLCache
+from .metrics import Collector
+from django.core.signals import setting_changed
+
+
+#: Values for the ``UTURN_BODY_LOOKUP`` setting.
+BODY_LOOKUP_ALWAYS = 'always'
+BODY_LOOKUP_FORM = 'form'
+BODY_LOOKUP_PARSED = 'parsed'
+BODY_LOOKUPS = (BODY_LOOKUP_ALWAYS, BODY_LOOKUP_FORM, BODY_LOOKUP_PARSED)
+
+
+class AllowedHosts(object):
+    """
+    Index of the hosts redirects are allowed to target.
+
+    Hosts follow the semantics of Django's ``ALLOWED_HOSTS`` setting: a value
+    starting with a period like ``.example.com`` matches ``example.com`` and
+    all of its subdomains, while ``*`` matches any host. Like Django, hosts
+    are matched by domain, ignoring the port, and invalid hosts (e.g. with
+    user information) never match. Exact hosts are kept in a frozenset and
+    wildcards in a suffix index, so a lookup costs one set membership test
+    per label of the host rather than a scan of every configured host.
+
+    """
+    def __init__(self, hosts):
+        exact = set()
+        suffixes = set()
+        self.any = False
+        for host in hosts or ():
+            host = host.lower()
+            if host == '*':
+                self.any = True
+            elif host.startswith('.'):
+                suffixes.add(host)
+            else:
+                exact.add(host)
+        self.exact = frozenset(exact)
+        self.suffixes = frozenset(suffixes)
+
+    def __bool__(self):
+        return bool(self.any or self.exact or self.suffixes)
+
+    def __contains__(self, host):
+        # Lowercased, without port and trailing dot; empty when the host is
+        # invalid, e.g. when it contains user information
+        domain = split_domain_port(host)[0]
+        if not domain:
+            return False
+        if self.any or domain in self.exact:
+            return True
+        if not self.suffixes or domain.endswith(']'):
+            # IPv6 addresses can't be matched by a wildcard
+            return False
+        if '.' + domain in self.suffixes:
+            return True
+        index = domain.find('.')
+        while index >= 0:
+            if domain[index:] in self.suffixes:
+                return True
+            index = domain.find('.', index + 1)
+        return False
+
+
+class Scope(object):
+    """
+    Decides which requests ``UturnMiddleware`` handles.
+
+    Paths are matched by prefix, URL names against the ``view_name`` of the
+    request's ``resolver_match`` (including namespaces, e.g.
+    ``tickets:edit``). Exclusions take precedence over inclusions; when there
+    are no inclusions, every request that isn't excluded is handled. The
+    prefixes are compiled into a single regular expression, so checking
+    the path of a request takes a single match.
+
+    """
+    def __init__(self, include_paths=None, exclude_paths=None,
+                 include_names=None, exclude_names=None):
+        self.include_paths = _prefixes(include_paths)
+        self.exclude_paths = _prefixes(exclude_paths)
+        self.include_names = frozenset(include_names or ())
+        self.exclude_names = frozenset(exclude_names or ())
+        self.include = bool(self.include_paths or self.include_names)
+
+    def __bool__(self):
+        return bool(self.include or self.exclude_paths or self.exclude_names)
+
+    def __contains__(self, request):
+        path = request.path
+        if self.exclude_paths is not None and self.exclude_paths.match(path):
+            return False
+        if self.exclude_names or self.include_names:
+            match = getattr(request, 'resolver_match', None)
+            name = match.view_name if match is not None else None
+            if name in self.exclude_names:
+                return False
+            if name in self.include_names:
+                return True
+        if not self.include:
+            return True
+        return bool(self.include_paths is not None and
+                    self.include_paths.match(path))
+
+
+def _prefixes(prefixes):
+    if not prefixes:
+        return None
+    # Longer prefixes first: not required for matching, but it keeps the
+    # expression deterministic
+    prefixes = sorted(set(prefixes), key=lambda p: (-len(p), p))
+    return re.compile('|'.join(re.escape(prefix) for prefix in prefixes))
+
+
+class Canonicalizer(object):
+    """
+    Rewrites next URLs into a canonical form, so equivalent URLs collapse into
+    one value.
+
+    Fragments and parameters without a value are dropped, as are parameters
+    matching one of the ``drop`` patterns (shell style, like ``utm_*``) and,
+    when ``keep`` patterns are given, parameters matching none of them. The
+    remaining parameters are sorted by name; repeated parameters keep their
+    order. Canonical forms are kept in an ``LRUCache`` of ``size`` entries.
+
+    """
+    def __init__(self, keep=None, drop=None, size=1024):
+        self.keep = _patterns(keep)
+        self.drop = _patterns(drop)
+        self.cache = LRUCache(size) if size else None
+
+    def __call__(self, url):
+        cache = self.cache
+        if cache is None:
+            return self.canonicalize(url)
+        canonical = cache.get(url)
+        if canonical is MISSING:
+            canonical = self.canonicalize(url)
+            cache.set(url, canonical)
+        return canonical
+
+    def canonicalize(self, url):
+        url = url.partition('#')[0]
+        base, sep, query = url.partition('?')
+        params = []
+        for part in query.split('&'):
+            name, eq, value = part.partition('=')
+            if not value:
+                continue
+            name = unquote_plus(name)
+            if self.drop is not None and self.drop.match(name):
+                continue
+            if self.keep is not None and not self.keep.match(name):
+                continue
+            params.append((name, part))
+        if not params:
+            return base
+        params.sort(key=itemgetter(0))
+        return base + '?' + '&'.join(part for name, part in params)
+
+
+def _patterns(patterns):
+    if not patterns:
+        return None
+    return re.compile('|'.join(fnmatch.translate(pattern)
+                               for pattern in patterns))
+
+
+class UturnConfig(object):
+    """
+    The Uturn settings, read once from the Django settings.
+
+    Use ``get_config`` to retrieve the current configuration. It's rebuilt
+    whenever a ``UTURN_`` setting changes through Django's ``setting_changed``
+    signal (e.g. when using ``override_settings`` in your tests).
+
+    """
+    def __init__(self):
+        self.param = getattr(settings, 'UTURN_REDIRECT_PARAM', 'next')
+        self.allowed_hosts = AllowedHosts(
+            getattr(settings, 'UTURN_ALLOWED_HOSTS', None))
+        self.header = getattr(settings, 'UTURN_REDIRECT_HEADER', None)
+        self.header_key = None
+        if self.header:
+            self.header_key = 'HTTP_' + self.header.upper().replace('-', '_')
+        self.client_redirects = getattr(settings, 'UTURN_CLIENT_REDIRECTS',
+                                        False)
+        self.htmx_redirect_header = getattr(
+            settings, 'UTURN_HTMX_REDIRECT_HEADER', 'HX-Location')
+        self.client_header = getattr(settings, 'UTURN_CLIENT_HEADER',
+                                     'X-Uturn-Client')
+        self.client_header_key = None
+        if self.client_header:
+            self.client_header_key = 'HTTP_' + \
+                self.client_header.upper().replace('-', '_')
+        size = getattr(settings, 'UTURN_REVERSE_CACHE_SIZE', 0)
+        self.reverse_cache = URLCache(size) if size else None
+        self.tokens = getattr(settings, 'UTURN_TOKENS', False)
+        self.token_cache = getattr(settings, 'UTURN_TOKEN_CACHE', 'default')
+        self.token_timeout = getattr(settings, 'UTURN_TOKEN_TIMEOUT', 3600)
+        self.token_length = getattr(settings, 'UTURN_TOKEN_LENGTH', 8)
+        self.signed = getattr(settings, 'UTURN_SIGNED', False)
+        self.require_signature = getattr(settings, 'UTURN_REQUIRE_SIGNATURE',
+                                         False)
+        self.signing_salt = getattr(settings, 'UTURN_SIGNING_SALT',
+                                    'uturn.signing')
+        keys = getattr(settings, 'UTURN_SIGNING_KEYS', None)
+        if self.signed and not keys:
+            keys = [settings.SECRET_KEY]
+            keys.extend(getattr(settings, 'SECRET_KEY_FALLBACKS', ()))
+        self.signing_keys = tuple(keys or ())
+        self.metrics = _collector(getattr(settings, 'UTURN_METRICS', False))
+        scope = Scope(getattr(settings, 'UTURN_INCLUDE_PATHS', None),
+                      getattr(settings, 'UTURN_EXCLUDE_PATHS', None),
+                      getattr(settings, 'UTURN_INCLUDE_URL_NAMES', None),
+                      getattr(settings, 'UTURN_EXCLUDE_URL_NAMES', None))
+        self.scope = scope if scope else None
+        self.rewrite_statuses = frozenset(
+            getattr(settings, 'UTURN_REWRITE_STATUSES', (302,)))
+        self.see_other_after_post = getattr(
+            settings, 'UTURN_SEE_OTHER_AFTER_POST', False)
+        self.placeholders = getattr(settings, 'UTURN_PLACEHOLDERS', False)
+        self.return_stack = getattr(settings, 'UTURN_RETURN_STACK', False)
+        self.return_stack_depth = getattr(settings, 'UTURN_RETURN_STACK_DEPTH',
+                                          5)
+        self.return_stack_bytes = getattr(settings, 'UTURN_RETURN_STACK_BYTES',
+                                          1024)
+        self.resolve_targets = getattr(settings, 'UTURN_RESOLVE_TARGETS',
+                                       False)
+        size = getattr(settings, 'UTURN_RESOLVE_CACHE_SIZE', 1024)
+        self.resolve_cache = None
+        if self.resolve_targets and size:
+            self.resolve_cache = URLCache(size)
+        self.max_hops = getattr(settings, 'UTURN_MAX_HOPS', 0)
+        self.hop_param = getattr(settings, 'UTURN_HOP_PARAM', 'uturn_hops')
+        self.canonicalize = None
+        if getattr(settings, 'UTURN_CANONICALIZE', False):
+            self.canonicalize = Canonicalizer(
+                getattr(settings, 'UTURN_CANONICAL_KEEP_PARAMS', None),
+                getattr(settings, 'UTURN_CANONICAL_DROP_PARAMS', ('utm_*',)),
+                getattr(settings, 'UTURN_CANONICAL_CACHE_SIZE', 1024))
+        self.body_lookup = getattr(settings, 'UTURN_BODY_LOOKUP',
+                                   BODY_LOOKUP_ALWAYS)
+        if self.body_lookup not in BODY_LOOKUPS:
+            raise ImproperlyConfigured(
+                'UTURN_BODY_LOOKUP should be one of %s, not %r' % (
+                    ', '.join(BODY_LOOKUPS), self.body_lookup))
+
+
+_config = None
+
+#: The collector kept while metrics are enabled, so the numbers survive
+#: unrelated setting changes.
+_metrics = None
+
+
+def _collector(enabled):
+    global _metrics
+    if not enabled:
+        return None
+    if _metrics is None:
+        _metrics = Collector()
+    return _metrics
+
+
+def get_config():
+    """
+    Returns the current ``UturnConfig``, building it when necessary.
+
+    """
+    global _config
+    config = _config
+    if config is None:
+        config = _config = UturnConfig()
+    return config
+
+
+def reset_config():
+    """
+    Discards the current configuration; the next call to ``get_config`` will
+    rebuild it from the settings.
+
+    """
+    global _config
+    _config = None
+
+
+@receiver(setting_changed)
+def _setting_changed(sender, setting, **kwargs):
+    if setting.startswith('UTURN_') or setting.startswith('SECRET_KEY'):
+        reset_config()
@@ -1,9 +1,10 @@
 # -*- coding: utf-8 -*-
 from functools import wraps
+from .compat import iscoroutinefunction
 from .http import smart_response
 
 
-def uturn(view):
+def uturn(view=None, statuses=None, see_other=None):
     """
     Decorator for view functions that applies smart redirects when needed.
 
@@ -12,11 +13,37 @@ def uturn(view):
     override the redirect with the new location.
 
     This only applies to temporary redirects, not permanent redirects or any
-    other kind of response.
+    other kind of response. Both policies can be overridden per view::
+
+        @uturn(statuses=(302, 303, 307), see_other=True)
+        def edit(request):
+            ...
+
+    ``statuses`` lists the redirect status codes to rewrite (the
+    ``UTURN_REWRITE_STATUSES`` setting by default); ``see_other`` turns
+    redirects rewritten after a ``POST`` into ``303 See Other`` (the
+    ``UTURN_SEE_OTHER_AFTER_POST`` setting by default).
+
+    Coroutine views are wrapped in a coroutine, so they stay on the event loop
+    when served through ASGI.
 
     """
+    if view is None:
+        def decorator(view):
+            return uturn(view, statuses, see_other)
+        return decorator
+    if statuses is not None:
+        statuses = frozenset(statuses)
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrap(request, *args, **kwargs):
+            response = await view(request, *args, **kwargs)
+            return smart_response(request, response, statuses, see_other)
+        return async_wrap
+
     @wraps(view)
     def wrap(request, *args, **kwargs):
         response = view(request, *args, **kwargs)
-        return smart_response(request, response)
+        return smart_response(request, response, statuses, see_other)
     return wrap
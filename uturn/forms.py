@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from django import forms
+from django.utils.safestring import mark_safe
+
+from . import placeholders
+from .conf import get_config
+from .http import get_redirect_url, param_name, uturn_input
+
+
+class UturnInput(forms.HiddenInput):
+    """
+    Renders the hidden field of the ``uturn_param`` template tag for
+    ``request``, without going through Django's form renderer.
+
+    The markup is built once per request (see ``uturn.http.uturn_input``) and
+    always uses the ``UTURN_REDIRECT_PARAM`` name, whatever the prefix of the
+    form, so the next URL is found in the submitted data like any other.
+
+    """
+    def __init__(self, request=None, attrs=None):
+        super(UturnInput, self).__init__(attrs)
+        self.request = request
+
+    def render(self, name, value, attrs=None, renderer=None):
+        if self.request is not None and get_config().placeholders:
+            return mark_safe(placeholders.INPUT)
+        return uturn_input(self.request)
+
+
+class UturnField(forms.Field):
+    """
+    A hidden field passing the next URL of ``request`` along.
+
+    The submitted value is looked up and validated like any next URL of the
+    request: the cleaned value is the validated next URL, or ``None``.
+
+    """
+    widget = UturnInput
+
+    def __init__(self, request=None, **kwargs):
+        kwargs.setdefault('required', False)
+        super(UturnField, self).__init__(**kwargs)
+        self.request = request
+        self.widget.request = request
+
+    def clean(self, value):
+        return get_redirect_url(self.request)
+
+    def has_changed(self, initial, data):
+        return False
+
+
+class UturnFormMixin(object):
+    """
+    Adds a ``UturnField`` named after the ``UTURN_REDIRECT_PARAM`` setting to
+    a form.
+
+    Pass the request as the ``uturn_request`` keyword argument;
+    ``uturn.views.UturnMixin`` does so for the forms of generic views. Render
+    the form as usual, without the ``uturn_param`` tag.
+
+    """
+    def __init__(self, *args, **kwargs):
+        self.uturn_request = kwargs.pop('uturn_request', None)
+        super(UturnFormMixin, self).__init__(*args, **kwargs)
+        self.fields[param_name()] = UturnField(self.uturn_request)
@@ -1,18 +1,47 @@
 # -*- coding: utf-8 -*-
-try:
-    import urlparse
-except ImportError:
-    # Python 3
-    import urllib.parse as urlparse
+import json
+import re
+import urllib.parse as urlparse
 
+from django.conf import settings
 from django.shortcuts import redirect as core_redirect
 from django.http import HttpResponseRedirect
 from django.utils.encoding import iri_to_uri
-from django.conf import settings
+from django.utils.html import conditional_escape
+from django.utils.http import urlencode
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+from django.urls import Resolver404, get_script_prefix, resolve, reverse
+
+from .cache import MISSING
+from .conf import BODY_LOOKUP_ALWAYS, BODY_LOOKUP_FORM, get_config
+from . import signals, signing, tokens
+from .metrics import timer
+
+
+#: Marks a request for which the redirect URL hasn't been determined yet.
+_UNSET = object()
+
+#: Content types Django parses into ``request.POST``.
+FORM_CONTENT_TYPES = ('application/x-www-form-urlencoded',
+                      'multipart/form-data')
+
+#: Next URLs accepted without parsing them: paths starting with a single
+#: slash, without backslashes or control characters.
+_PLAIN_PATH_RE = re.compile(r'/(?![/\\])[^\\\x00-\x1f\x7f]*\Z')
+
+#: Characters rejected in next URLs needing a closer look.
+_UNSAFE_RE = re.compile(r'[\\\x00-\x1f\x7f]')
+
+#: Separates the entries of a return stack.
+STACK_SEPARATOR = ' '
+
+#: Types of arguments for which reversed URLs can be cached.
+CACHEABLE_TYPES = (type(None), int, float, type(''), type(b''))
 
 
 def param_name():
-    return getattr(settings, 'UTURN_REDIRECT_PARAM', 'next')
+    return get_config().param
 
 
 def get_redirect_url(request):
@@ -31,27 +60,329 @@ def get_redirect_url(request):
     <http://cwe.mitre.org/data/definitions/601.html>`_ to discover the risks
     involved.
 
+    By default, the parameter is read from ``request.POST`` for POST requests,
+    which makes Django parse the request body. Set ``UTURN_BODY_LOOKUP`` to
+    ``'form'`` to check the query string first and only parse form encoded
+    bodies, or to ``'parsed'`` to check the query string first and only read
+    ``request.POST`` when Django has already parsed the body.
+
+    Clients can also pass the next URL in the request header named by the
+    ``UTURN_REDIRECT_HEADER`` setting (e.g. ``X-Uturn-Next``). The header
+    takes precedence over the parameter and works for any request method.
+
+    When the ``UTURN_TOKENS`` setting is enabled, the value can be a token
+    standing in for the next URL. When the ``UTURN_SIGNED`` setting is
+    enabled, signed URLs are accepted without further validation and
+    unsigned URLs are only accepted when ``UTURN_REQUIRE_SIGNATURE`` is
+    disabled. See ``encode_redirect_url``.
+
+    When the ``UTURN_CANONICALIZE`` setting is enabled, the URL is returned in
+    its canonical form; see ``uturn.conf.Canonicalizer``.
+
+    When the ``UTURN_RETURN_STACK`` setting is enabled, the value can be a
+    return stack: space separated URLs, the first one on top. The URL on top
+    is returned, with the rest of the stack as its next URL.
+
+    The result is determined once per request and stored on the request. If
+    you modify ``request.GET`` or ``request.POST`` afterwards, call
+    ``invalidate_redirect_url`` to have it determined again.
+
     """
     if request is None:
         return None
-    next = None
-    param = param_name()
-    if request.method == 'GET':
-        next = request.GET.get(param, None)
-    elif request.method == 'POST':
-        next = request.POST.get(param, None)
+    next = getattr(request, '_uturn_redirect_url', _UNSET)
+    if next is _UNSET:
+        config = get_config()
+        metrics = config.metrics
+        if metrics is None:
+            next = _find_redirect_url(request, config)
+        else:
+            start = timer()
+            next = _find_redirect_url(request, config)
+            metrics.observe('uturn_lookup_seconds', timer() - start)
+        request._uturn_redirect_url = next
+    return next
+
+
+def invalidate_redirect_url(request):
+    """
+    Forgets the redirect URL stored on the request by ``get_redirect_url``.
+
+    """
+    if request is None:
+        return
+    for attr in ('_uturn_redirect_url', '_uturn_return_stack',
+                 '_uturn_next', '_uturn_fragment', '_uturn_input'):
+        if hasattr(request, attr):
+            delattr(request, attr)
+
+
+def _find_redirect_url(request, config):
+    next = _lookup(request, config)
     if not next:
         return None
-    # Check if it's an absolute URL.
-    allowed_hosts = getattr(settings, 'UTURN_ALLOWED_HOSTS', None)
-    allowed_hosts = allowed_hosts if allowed_hosts else [request.get_host()]
-    host = urlparse.urlparse(next)[1]
-    if host:
-        # Make sure the absolute URL points to an allowed host, otherwise
-        # ignore the value.
-        return next if host in allowed_hosts else None
-    # Make sure it's a relative URL to prevent "open redirects"
-    return next if next.startswith('/') else None
+    if config.tokens and tokens.is_token(next):
+        value = next
+        next = tokens.resolve(next)
+        if not next:
+            return _reject(request, value, 'token', config)
+    elif config.signed:
+        url = signing.unsign(next)
+        if url is not None:
+            if not config.return_stack:
+                # Only validated URLs are signed
+                return _canonical(url, config)
+            # Entries of a return stack are validated once they're on top
+            next = url
+        elif config.require_signature:
+            return _reject(request, next, 'signature', config)
+    if config.return_stack:
+        return _pop_return_stack(request, next, config)
+    return _canonical(_validate(request, next, config), config)
+
+
+def _canonical(url, config):
+    canonicalize = config.canonicalize
+    if canonicalize is None or not url:
+        return url
+    return canonicalize(url)
+
+
+def _validate(request, next, config):
+    reason = _rejection(request, next, config)
+    return next if reason is None else _reject(request, next, reason, config)
+
+
+def _rejection(request, next, config):
+    """
+    Returns the reason to reject the next URL ``next`` (``'path'``,
+    ``'scheme'``, ``'host'`` or ``'unresolvable'``), or ``None`` when it's
+    accepted.
+
+    """
+    # Most next URLs are plain relative paths, which are accepted without
+    # parsing them
+    if _PLAIN_PATH_RE.match(next) is None:
+        return _url_rejection(request, next, config)
+    if config.resolve_targets and not _resolves(request, next, config):
+        return 'unresolvable'
+    return None
+
+
+def _url_rejection(request, next, config):
+    """
+    Strictly validates the next URLs that aren't plain relative paths: only
+    absolute URLs (including scheme relative ones) using HTTP(S) and pointing
+    to an allowed host are accepted.
+
+    """
+    # Browsers ignore some characters and treat backslashes like slashes,
+    # turning e.g. ``/\evil.com`` into ``//evil.com``: reject them outright
+    if _UNSAFE_RE.search(next) is not None or next[:1].isspace() or \
+            next.startswith('///'):
+        return 'path'
+    try:
+        scheme, host, path, query, fragment = urlparse.urlsplit(next)
+    except ValueError:
+        return 'path'
+    if not host:
+        # Not a plain relative path, nor an absolute URL
+        return 'path'
+    if scheme and scheme.lower() not in ('http', 'https'):
+        return 'scheme'
+    # Make sure the absolute URL points to an allowed host, otherwise
+    # ignore the value.
+    if config.allowed_hosts:
+        allowed = host in config.allowed_hosts
+    elif request is None:
+        allowed = False
+    else:
+        allowed = host.lower() == request.get_host().lower()
+    return None if allowed else 'host'
+
+
+def _resolves(request, next, config):
+    """
+    Returns whether the path of the relative URL ``next`` matches the URL
+    configuration. Verdicts are cached per path, URL configuration, script
+    prefix and active language.
+
+    """
+    path = urlparse.unquote(urlparse.urlsplit(next)[2])
+    urlconf = getattr(request, 'urlconf', None)
+    append_slash = settings.APPEND_SLASH
+    prefix = get_script_prefix()
+    cache = config.resolve_cache
+    # Paths of ``i18n_patterns`` only resolve in their language
+    key = (path, urlconf, append_slash, prefix, get_language())
+    if cache is not None:
+        verdict = cache.get(key)
+        if verdict is not MISSING:
+            return verdict
+    verdict = False
+    if path.startswith(prefix):
+        path = '/' + path[len(prefix):]
+        candidates = [path]
+        if append_slash and not path.endswith('/'):
+            # CommonMiddleware will redirect to the path with a slash
+            candidates.append(path + '/')
+        for candidate in candidates:
+            try:
+                resolve(candidate, urlconf)
+            except Resolver404:
+                continue
+            verdict = True
+            break
+    if cache is not None:
+        cache.set(key, verdict)
+    return verdict
+
+
+def _pop_return_stack(request, stack, config):
+    """
+    Returns the URL on top of the return ``stack``, passing the rest of the
+    stack along as its next URL.
+
+    """
+    top, sep, rest = stack.partition(STACK_SEPARATOR)
+    top = _canonical(_validate(request, top, config), config)
+    if top is None:
+        return None
+    request._uturn_return_stack = stack
+    if not rest:
+        return top
+    return add_query_param(top, config.param,
+                           encode_redirect_url(rest, request))
+
+
+def _push_return_stack(request, config):
+    """
+    Returns the return stack of ``request`` with its own full path on top,
+    dropping the bottom entries beyond ``UTURN_RETURN_STACK_DEPTH`` entries
+    or ``UTURN_RETURN_STACK_BYTES`` bytes.
+
+    """
+    path = iri_to_uri(request.path)
+    query = strip_param(request.META.get('QUERY_STRING', ''), config.param)
+    if query:
+        path += '?' + iri_to_uri(query)
+    entries = [path]
+    get_redirect_url(request)
+    stack = getattr(request, '_uturn_return_stack', None)
+    if stack:
+        entries.extend(entry for entry in stack.split(STACK_SEPARATOR)
+                       if entry)
+    if config.canonicalize is not None:
+        # Canonical entries, without returning to the same page twice in a
+        # row
+        canonical = []
+        for entry in entries:
+            entry = config.canonicalize(entry)
+            if not canonical or canonical[-1] != entry:
+                canonical.append(entry)
+        entries = canonical
+    del entries[config.return_stack_depth:]
+    size = sum(len(entry) for entry in entries) + len(entries) - 1
+    while size > config.return_stack_bytes and len(entries) > 1:
+        size -= len(entries.pop()) + 1
+    return STACK_SEPARATOR.join(entries)
+
+
+def strip_param(query_string, param):
+    """
+    Removes every ``param`` from ``query_string``, leaving everything else as
+    is.
+
+    """
+    prefix = param + '='
+    parts = [part for part in query_string.split('&')
+             if part != param and not part.startswith(prefix)]
+    return '&'.join(parts)
+
+
+def add_query_param(url, param, value):
+    """
+    Adds ``param`` with ``value`` to the query string of ``url``.
+
+    """
+    sep = '&' if '?' in url else '?'
+    return url + sep + urlencode({param: value})
+
+
+def _reject(request, value, reason, config):
+    """
+    Records the rejection of the next URL ``value`` and returns ``None``.
+
+    """
+    if config.metrics is not None:
+        config.metrics.increment('uturn_rejected_total', reason)
+    if signals.redirect_rejected.receivers:
+        signals.redirect_rejected.send(sender=None, request=request,
+                                       value=value, reason=reason)
+    return None
+
+
+def encode_redirect_url(url, request=None):
+    """
+    Returns the value to pass around as the next parameter for ``url``.
+
+    That's the URL itself, unless the ``UTURN_TOKENS`` setting is enabled: in
+    that case the URL is stored in the cache and a short token is returned
+    instead. Otherwise, when the ``UTURN_SIGNED`` setting is enabled, the URL
+    is returned with its signature. ``get_redirect_url`` turns either back
+    into the URL.
+
+    Signed URLs aren't validated again, so only URLs ``get_redirect_url``
+    would accept for ``request`` are signed; others are returned as is (and
+    rejected when they come back). Without a ``request``, absolute URLs are
+    only signed when they point to one of the ``UTURN_ALLOWED_HOSTS``.
+
+    """
+    config = get_config()
+    if config.tokens:
+        return tokens.tokenize(url)
+    if config.signed:
+        # Entries of a return stack are validated once they're on top
+        if config.return_stack or _rejection(request, url, config) is None:
+            return signing.sign(url)
+    return url
+
+
+def _lookup(request, config):
+    """
+    Retrieves the unvalidated next URL from the request.
+
+    """
+    if config.header_key:
+        next = request.META.get(config.header_key, None)
+        if next:
+            return next
+    param = config.param
+    if request.method == 'GET':
+        return request.GET.get(param, None)
+    if request.method == 'POST':
+        if config.body_lookup == BODY_LOOKUP_ALWAYS:
+            return request.POST.get(param, None)
+        next = request.GET.get(param, None)
+        if not next and _can_read_post(request, config.body_lookup):
+            next = request.POST.get(param, None)
+        return next
+    return None
+
+
+def _can_read_post(request, body_lookup):
+    """
+    Checks whether ``request.POST`` can be read without parsing the body in
+    situations the ``UTURN_BODY_LOOKUP`` setting doesn't allow.
+
+    """
+    if hasattr(request, '_post'):
+        # Django already parsed the body
+        return True
+    if body_lookup == BODY_LOOKUP_FORM:
+        content_type = request.META.get('CONTENT_TYPE', '')
+        return content_type.startswith(FORM_CONTENT_TYPES)
+    return False
 
 
 def smart_redirect(request, to, *args, **kwargs):
@@ -62,33 +393,177 @@ def smart_redirect(request, to, *args, **kwargs):
     The next parameter takes precedence.
 
     """
-    next = get_redirect_url(request)
+    next = _redirect_target(request, get_config())
     if next:
         return core_redirect(next)
     return core_redirect(to, *args, **kwargs)
 
 
-def smart_response(request, response):
+def get_redirect_target(request):
+    """
+    Returns the next URL to redirect ``request`` to, or ``None`` when there
+    is none or when redirecting would loop.
+
+    Unlike ``get_redirect_url``, this checks for redirect loops and adds the
+    hop counter when the ``UTURN_MAX_HOPS`` setting is set: use it in views
+    redirecting to the next URL themselves.
+
+    """
+    return _redirect_target(request, get_config())
+
+
+def _redirect_target(request, config):
+    """
+    Returns the next URL to redirect ``request`` to, or ``None`` when there
+    is none or when redirecting would loop.
+
+    A ``GET`` or ``HEAD`` request redirected to itself (ignoring the order of
+    the query parameters and the next URL itself) loops. When the
+    ``UTURN_MAX_HOPS`` setting is set, each redirect carries a hop counter in
+    the ``UTURN_HOP_PARAM`` parameter, and redirects loop once the counter
+    reaches the maximum.
+
+    """
+    next = get_redirect_url(request)
+    if not next:
+        return None
+    hops = 0
+    if config.max_hops:
+        try:
+            hops = int(request.GET.get(config.hop_param, 0))
+        except ValueError:
+            hops = 0
+        if hops >= config.max_hops:
+            return _reject(request, next, 'loop', config)
+    if request.method in ('GET', 'HEAD') and \
+            _is_current(request, next, config):
+        return _reject(request, next, 'loop', config)
+    if config.max_hops:
+        next = add_query_param(next, config.hop_param, str(hops + 1))
+    return next
+
+
+def _is_current(request, url, config):
+    """
+    Returns whether ``url`` points to the URL of ``request``.
+
+    """
+    if _PLAIN_PATH_RE.match(url) is not None:
+        path, sep, query = url.partition('#')[0].partition('?')
+    else:
+        scheme, host, path, query, fragment = urlparse.urlsplit(url)
+        if host and host.lower() != request.get_host().lower():
+            return False
+    if urlparse.unquote(path) != request.path:
+        return False
+    current = request.META.get('QUERY_STRING', '')
+    return _query_params(query, config) == _query_params(current, config)
+
+
+def _query_params(query, config):
+    ignored = (config.param, config.hop_param)
+    params = []
+    for part in query.split('&'):
+        name, eq, value = part.partition('=')
+        if not value:
+            continue
+        name = urlparse.unquote_plus(name)
+        if name not in ignored:
+            params.append((name, urlparse.unquote_plus(value)))
+    params.sort()
+    return params
+
+
+def smart_response(request, response, statuses=None, see_other=None):
     """
     Reissues a redirect when necessary - leaves other response alone.
 
-    The response is examined; in case it's a temporary redirect and a
-    redirect alternative is specified in the request, a new redirect is
-    constructed targeting the alternative. In all other cases, the response
-    is returned as is.
+    The response is examined; in case it's a redirect with one of the
+    ``statuses`` (a frozenset, defaulting to the ``UTURN_REWRITE_STATUSES``
+    setting: only ``302 Found``) and a redirect alternative is specified in
+    the request, a new redirect is constructed targeting the alternative. In
+    all other cases, the response is returned as is. Streaming responses
+    (like ``FileResponse``) are never examined.
+
+    When ``see_other`` is true (defaulting to the
+    ``UTURN_SEE_OTHER_AFTER_POST`` setting), redirects rewritten in response
+    to a ``POST`` request become ``303 See Other``, so the browser fetches
+    the alternative with a ``GET`` instead of resubmitting the form.
+
+    Redirects that would loop are left alone; see ``get_redirect_target``.
+
+    When the ``UTURN_CLIENT_REDIRECTS`` setting is enabled, temporary
+    redirects in response to htmx requests (identified by the ``HX-Request``
+    header) and requests carrying the ``UTURN_CLIENT_HEADER`` header are
+    turned into ``200 OK`` responses telling the client where to go, saving
+    the browser a round trip. See ``client_redirect``.
 
     """
-    if not response:
+    if not response or getattr(response, 'streaming', False):
+        # Leave streaming responses (including file downloads) alone
+        return response
+    config = get_config()
+    if statuses is None:
+        statuses = config.rewrite_statuses
+    if response.status_code not in statuses:
         return response
     location = response.get('Location', None)
-    if not location or response.status_code != 302:
+    if not location:
         return response
-    next = get_redirect_url(request)
+    next = _redirect_target(request, config)
     if next:
-        response['Location'] = iri_to_uri(next)
+        location = response['Location'] = iri_to_uri(next)
+        if see_other is None:
+            see_other = config.see_other_after_post
+        if see_other and request.method == 'POST':
+            response.status_code = 303
+        if config.metrics is not None:
+            config.metrics.increment('uturn_redirects_total', 'overridden')
+        if signals.redirect_overridden.receivers:
+            signals.redirect_overridden.send(sender=None, request=request,
+                                             response=response,
+                                             location=location)
+    else:
+        if config.metrics is not None:
+            config.metrics.increment('uturn_redirects_total', 'kept')
+        if signals.redirect_kept.receivers:
+            signals.redirect_kept.send(sender=None, request=request,
+                                       response=response)
+    if config.client_redirects:
+        client_redirect(request, response, location)
     return response
 
 
+def client_redirect(request, response, location):
+    """
+    Turns the redirect ``response`` into a ``200 OK`` response for clients
+    that navigate by themselves.
+
+    For htmx requests, the location is passed in the header named by the
+    ``UTURN_HTMX_REDIRECT_HEADER`` setting: ``HX-Location`` (the default)
+    or ``HX-Redirect``. For requests carrying the ``UTURN_CLIENT_HEADER``
+    header (``X-Uturn-Client`` by default), the response body becomes a small
+    JSON document: ``{"location": "/next/"}``.
+
+    Other requests are left alone. Returns whether the response was changed.
+
+    """
+    config = get_config()
+    meta = request.META
+    if meta.get('HTTP_HX_REQUEST') == 'true':
+        del response['Location']
+        response.status_code = 200
+        response[config.htmx_redirect_header] = location
+        return True
+    if config.client_header_key and meta.get(config.client_header_key):
+        del response['Location']
+        response.status_code = 200
+        response['Content-Type'] = 'application/json'
+        response.content = json.dumps({'location': location})
+        return True
+    return False
+
+
 class SmartHttpResponseRedirect(HttpResponseRedirect):
     """
     Acts like Django's regular ``HttpResponseRedirect``, unless a redirect
@@ -97,6 +572,166 @@ class SmartHttpResponseRedirect(HttpResponseRedirect):
     """
 
     def __init__(self, request, redirect_to):
-        next = get_redirect_url(request)
+        next = _redirect_target(request, get_config())
         redirect_to = next if next else redirect_to
         super(SmartHttpResponseRedirect, self).__init__(redirect_to)
+
+
+def uturn_fragment(request):
+    """
+    Returns the query string fragment passing the current request path as the
+    next URL, e.g. ``next=%2Ftickets%2F``.
+
+    When the ``UTURN_RETURN_STACK`` setting is enabled, the next URL is the
+    full path of the request (without its next URL) on top of the request's
+    own return stack.
+
+    The fragment is encoded once per request and stored on the request.
+
+    """
+    fragment = getattr(request, '_uturn_fragment', None)
+    if fragment is None:
+        fragment = urlencode({get_config().param: uturn_next(request)})
+        request._uturn_fragment = fragment
+    return fragment
+
+
+def uturn_next(request):
+    """
+    Returns the next URL passed along by the links of the ``uturn`` tag and
+    the forms marked for ``uturn.rewrite``, before it's URL encoded: the
+    current request path, or the return stack when the ``UTURN_RETURN_STACK``
+    setting is enabled, signed when signing is enabled.
+
+    The value is built once per request and stored on the request.
+
+    """
+    next = getattr(request, '_uturn_next', None)
+    if next is None:
+        config = get_config()
+        if config.return_stack:
+            next = _push_return_stack(request, config)
+        else:
+            next = request.path
+        next = request._uturn_next = encode_redirect_url(next, request)
+    return next
+
+
+def uturn_input(request):
+    """
+    Returns the hidden form field passing the next URL of ``request`` along,
+    or an empty string when there's no next URL. Used by the ``uturn_param``
+    template tag and ``uturn.forms.UturnField``.
+
+    The field is built once per request and stored on the request.
+
+    """
+    if request is None:
+        return ''
+    markup = getattr(request, '_uturn_input', None)
+    if markup is None:
+        markup = ''
+        next = get_redirect_url(request)
+        if next:
+            attr = {
+                'param': conditional_escape(param_name()),
+                'value': conditional_escape(
+                    encode_redirect_url(next, request))
+            }
+            f = ("<input type='hidden' name='%(param)s' value='%(value)s'>" %
+                 attr)
+            markup = mark_safe("<div style='display:none'>%s</div>" % f)
+        request._uturn_input = markup
+    return markup
+
+
+def add_uturn_param(url, request):
+    """
+    Adds the current request path to ``url`` as the next URL.
+
+    """
+    sep = '&' if '?' in url else '?'
+    return url + sep + uturn_fragment(request)
+
+
+def build_uturn_urls(request, urls):
+    """
+    Reverses URLs and adds the current request path to each of them as the
+    next URL, like the ``uturn`` template tag does.
+
+    ``urls`` is an iterable of ``(viewname, args, kwargs)`` tuples; ``args``
+    and ``kwargs`` can be ``None``. Use this in views and serializers building
+    many links at once: the next URL is only encoded once. Returns a list of
+    URLs.
+
+    """
+    fragment = uturn_fragment(request)
+    result = []
+    for viewname, args, kwargs in urls:
+        url = reverse_url(request, viewname, args, kwargs)
+        result.append(url + ('&' if '?' in url else '?') + fragment)
+    return result
+
+
+def reverse_url(request, viewname, args=None, kwargs=None):
+    """
+    Reverses a URL like Django's ``reverse`` does, taking the current
+    application and URL configuration of the ``request`` into account.
+
+    When the ``UTURN_REVERSE_CACHE_SIZE`` setting is set, reversed URLs are
+    kept in a cache of that size and reused for the same view name, arguments,
+    current application, URL configuration and active language. Only URLs
+    with arguments of simple types (strings, numbers, booleans and ``None``)
+    are cached.
+
+    """
+    args = args or ()
+    kwargs = kwargs or {}
+    current_app = _current_app(request)
+    cache = get_config().reverse_cache
+    key = None
+    if cache is not None:
+        # The URL configuration can be changed per request
+        urlconf = getattr(request, 'urlconf', None)
+        key = _cache_key(viewname, args, kwargs, current_app, urlconf)
+    url = MISSING if key is None else cache.get(key)
+    if url is MISSING:
+        url = reverse(viewname, args=args, kwargs=kwargs,
+                      current_app=current_app)
+        if key is not None:
+            cache.set(key, url)
+    return url
+
+
+def reverse_cache_info():
+    """
+    Returns the statistics of the reversed URL cache or ``None`` if it's
+    disabled.
+
+    """
+    cache = get_config().reverse_cache
+    return cache.info() if cache is not None else None
+
+
+def _current_app(request):
+    try:
+        return request.current_app
+    except AttributeError:
+        try:
+            return request.resolver_match.namespace
+        except AttributeError:
+            return None
+
+
+def _cache_key(viewname, args, kwargs, current_app, urlconf):
+    items = tuple(sorted(kwargs.items()))
+    values = tuple(args) + tuple(value for name, value in items)
+    for value in (viewname,) + values:
+        if not isinstance(value, CACHEABLE_TYPES):
+            return None
+    # Types are part of the key: 1, True and 1.0 are equal but render
+    # differently.
+    types = tuple(type(value) for value in values)
+    # URLs of ``i18n_patterns`` depend on the active language
+    return (viewname, tuple(args), items, types, current_app, urlconf,
+            get_language())
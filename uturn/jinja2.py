@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Uturn for Jinja2 templates.
+
+Add the extension to the ``OPTIONS`` of Django's Jinja2 template backend::
+
+    'OPTIONS': {
+        'extensions': ['uturn.jinja2.UturnExtension'],
+    }
+
+It adds the ``uturn``, ``defaulturl`` and ``uturn_param`` tags, which behave
+like the Django template tags with the same names and take the same
+arguments, separated by commas::
+
+    <a href="{% uturn 'ticket-edit', ticket.pk %}">Edit</a>
+    <a href="{% defaulturl 'ticket-list' %}">Cancel</a>
+    <form method="post">{% uturn_param %}</form>
+
+The tags are compiled into the template: they read the ``request`` like any
+other template variable, and URLs whose view name and arguments are all
+literals are reversed once rather than on every render. The extension also
+adds ``uturn()``, ``defaulturl()`` and ``uturn_param()`` globals, for use in
+expressions.
+
+Without a ``request`` (Django's backend passes it to every template), the
+tags render the plain URL, or nothing for ``uturn_param``.
+
+"""
+from __future__ import absolute_import, unicode_literals
+
+from django.utils.safestring import mark_safe
+from jinja2 import nodes
+from jinja2.ext import Extension
+from jinja2.runtime import Undefined
+try:
+    from jinja2 import pass_context
+except ImportError:
+    # Jinja2 < 3.0
+    from jinja2 import contextfunction as pass_context
+from django.urls import get_resolver, get_script_prefix, get_urlconf
+
+from . import placeholders
+from .conf import get_config
+from .http import add_uturn_param, get_redirect_url, reverse_url, uturn_input
+from .templatetags.uturn import FoldedUrl
+
+
+def _request(request):
+    # Templates rendered without a request get an undefined value
+    return None if isinstance(request, Undefined) else request
+
+
+def _url_state(request):
+    """
+    Returns the resolver and script prefix folded URLs are reversed with,
+    looked up once per request.
+
+    """
+    state = getattr(request, '_uturn_url_state', None)
+    if state is None:
+        state = (get_resolver(get_urlconf()), get_script_prefix())
+        if request is not None:
+            request._uturn_url_state = state
+    return state
+
+
+def _uturn(request, url):
+    if request is None:
+        return url
+    if get_config().placeholders:
+        return placeholders.add_fragment(url)
+    return add_uturn_param(url, request)
+
+
+def _next(request):
+    # The URL rendered by ``defaulturl`` instead of its own, if any
+    if request is not None and get_config().placeholders:
+        return None
+    return get_redirect_url(request) or None
+
+
+def _default(request, url):
+    if request is not None and get_config().placeholders:
+        return placeholders.default(url)
+    return url
+
+
+def _uturn_param(request):
+    if request is not None and get_config().placeholders:
+        return mark_safe(placeholders.INPUT)
+    return uturn_input(request)
+
+
+@pass_context
+def uturn(context, viewname, *args, **kwargs):
+    """
+    Reverses the URL and adds the current request path to it as the next URL.
+
+    """
+    request = _request(context.get('request'))
+    return _uturn(request, reverse_url(request, viewname, args, kwargs))
+
+
+@pass_context
+def defaulturl(context, viewname, *args, **kwargs):
+    """
+    Returns the next URL of the request when there is one, the reversed URL
+    otherwise.
+
+    """
+    request = _request(context.get('request'))
+    next = _next(request)
+    if next is not None:
+        return next
+    return _default(request, reverse_url(request, viewname, args, kwargs))
+
+
+@pass_context
+def uturn_param(context):
+    """
+    Returns the hidden field passing the next URL of the request along.
+
+    """
+    return _uturn_param(_request(context.get('request')))
+
+
+class UturnExtension(Extension):
+    """
+    Adds the ``uturn``, ``defaulturl`` and ``uturn_param`` tags and globals.
+
+    """
+    tags = set(['uturn', 'defaulturl', 'uturn_param'])
+
+    def __init__(self, environment):
+        super(UturnExtension, self).__init__(environment)
+        environment.globals.update({
+            'uturn': uturn,
+            'defaulturl': defaulturl,
+            'uturn_param': uturn_param,
+        })
+        # Folded URLs by view name and arguments, shared by all templates
+        self._folded = {}
+
+    def parse(self, parser):
+        token = next(parser.stream)
+        request = nodes.Name('request', 'load', lineno=token.lineno)
+        if token.value == 'uturn_param':
+            call = self.call_method('_uturn_param', [request])
+            return nodes.Output([call], lineno=token.lineno)
+        viewname = parser.parse_expression()
+        args = []
+        kwargs = []
+        while parser.stream.current.type != 'block_end':
+            parser.stream.expect('comma')
+            if parser.stream.current.type == 'name' and \
+                    parser.stream.look().type == 'assign':
+                key = next(parser.stream).value
+                next(parser.stream)
+                kwargs.append(nodes.Keyword(key, parser.parse_expression()))
+            else:
+                args.append(parser.parse_expression())
+        key = self._fold(viewname, args, kwargs)
+        if key is not None:
+            call = self.call_method('_%s_folded' % token.value,
+                                    [request, nodes.Const(key)])
+        else:
+            call = self.call_method('_' + token.value,
+                                    [request, viewname] + args, kwargs)
+        return nodes.Output([call], lineno=token.lineno)
+
+    def _fold(self, viewname, args, kwargs):
+        """
+        Returns the key of the ``FoldedUrl`` for the given view name and
+        arguments (holding their values) when they're all literals, ``None``
+        otherwise.
+
+        """
+        values = [viewname] + args + [kwarg.value for kwarg in kwargs]
+        if any(not isinstance(value, nodes.Const) for value in values):
+            return None
+        # Namespaced view names depend on the current application
+        if not isinstance(viewname.value, str) or ':' in viewname.value:
+            return None
+        args = tuple(arg.value for arg in args)
+        kwargs = tuple(sorted((kwarg.key, kwarg.value.value)
+                              for kwarg in kwargs))
+        # Types are part of the key: 1, True and 1.0 are equal but render
+        # differently. Their names keep the key a constant of the template.
+        types = tuple(type(value).__name__
+                      for value in args + tuple(v for k, v in kwargs))
+        return (viewname.value, args, kwargs, types)
+
+    def _reverse_folded(self, request, key):
+        folded = self._folded.get(key)
+        if folded is None:
+            # Created on first render: templates loaded from a bytecode cache
+            # aren't parsed again
+            viewname, args, kwargs, types = key
+            folded = self._folded.setdefault(
+                key, FoldedUrl(viewname, args, dict(kwargs), None))
+        return folded.reverse(*_url_state(request))[0]
+
+    def _uturn(self, request, viewname, *args, **kwargs):
+        request = _request(request)
+        return _uturn(request, reverse_url(request, viewname, args, kwargs))
+
+    def _uturn_folded(self, request, key):
+        request = _request(request)
+        return _uturn(request, self._reverse_folded(request, key))
+
+    def _defaulturl(self, request, viewname, *args, **kwargs):
+        request = _request(request)
+        next = _next(request)
+        if next is not None:
+            return next
+        return _default(request, reverse_url(request, viewname, args, kwargs))
+
+    def _defaulturl_folded(self, request, key):
+        request = _request(request)
+        next = _next(request)
+        if next is not None:
+            return next
+        return _default(request, self._reverse_folded(request, key))
+
+    def _uturn_param(self, request):
+        return _uturn_param(_request(request))
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+In-process metrics about the redirect decisions Uturn makes.
+
+Enable the ``UTURN_METRICS`` setting to have Uturn count the redirects it
+overrides or keeps and the next URLs it rejects (by reason), and measure the
+time it spends looking up next URLs and handling responses. Expose the
+numbers to Prometheus with the ``uturn.views.metrics`` view.
+
+Each thread records into its own shard, so recording never takes a lock;
+shards are only combined when the metrics are read. The shards of threads
+that have finished are folded into a single one, so their number is bounded
+by the number of live threads.
+
+"""
+from threading import Lock, current_thread, local
+from time import perf_counter as timer
+
+
+#: Upper bounds (in seconds) of the histogram buckets.
+BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001,
+           0.0025, 0.005, 0.01)
+
+#: Metric name: (type, help, label)
+METRICS = {
+    'uturn_redirects_total': (
+        'counter', 'Temporary redirects handled by Uturn.', 'decision'),
+    'uturn_rejected_total': (
+        'counter', 'Next URLs rejected by Uturn.', 'reason'),
+    'uturn_lookup_seconds': (
+        'histogram', 'Time spent determining the next URL of a request.',
+        None),
+    'uturn_response_seconds': (
+        'histogram', 'Time spent by UturnMiddleware handling a response.',
+        None),
+}
+
+
+class _Shard(object):
+
+    def __init__(self, thread=None):
+        self.thread = thread
+        self.counters = {}
+        self.histograms = {}
+
+    def merge(self, other):
+        for key, value in other.counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+        for name, values in other.histograms.items():
+            total = self.histograms.setdefault(name, [0] * len(values))
+            for index, value in enumerate(values):
+                total[index] += value
+
+
+class Collector(object):
+    """
+    Collects counters and timing histograms without locking.
+
+    """
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._local = local()
+        # The shards of finished threads, folded together
+        self._base = _Shard()
+        self._shards = []
+        self._lock = Lock()
+
+    def increment(self, name, label):
+        counters = self._shard().counters
+        key = (name, label)
+        counters[key] = counters.get(key, 0) + 1
+
+    def observe(self, name, seconds):
+        histograms = self._shard().histograms
+        histogram = histograms.get(name)
+        if histogram is None:
+            # Bucket counts followed by the sum and the count
+            histogram = histograms[name] = [0] * (len(self.buckets) + 2)
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                histogram[index] += 1
+                break
+        histogram[-2] += seconds
+        histogram[-1] += 1
+
+    def counters(self):
+        """
+        Returns the counters as a dictionary mapping ``(name, label)`` tuples
+        to their value.
+
+        """
+        result = {}
+        for shard in self._all_shards():
+            for key, value in dict(shard.counters).items():
+                result[key] = result.get(key, 0) + value
+        return result
+
+    def histograms(self):
+        """
+        Returns the histograms as a dictionary mapping names to a list of
+        cumulative bucket counts, the sum and the count.
+
+        """
+        result = {}
+        for shard in self._all_shards():
+            for name, values in dict(shard.histograms).items():
+                values = list(values)
+                total = result.setdefault(name, [0] * len(values))
+                for index, value in enumerate(values):
+                    total[index] += value
+        for values in result.values():
+            for index in range(1, len(self.buckets)):
+                values[index] += values[index - 1]
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._base = _Shard()
+            self._shards = []
+            self._local = local()
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard(current_thread())
+            with self._lock:
+                self._fold_finished()
+                self._shards.append(shard)
+            return shard
+
+    def _all_shards(self):
+        with self._lock:
+            self._fold_finished()
+            return [self._base] + self._shards
+
+    def _fold_finished(self):
+        # Finished threads don't record anymore: their shards can be merged
+        # without racing them. A new base shard is built so readers holding
+        # the previous shards don't count them twice. Called with the lock
+        # held.
+        finished = [s for s in self._shards if not s.thread.is_alive()]
+        if not finished:
+            return
+        base = _Shard()
+        for shard in [self._base] + finished:
+            base.merge(shard)
+        self._base = base
+        self._shards = [s for s in self._shards if s not in finished]
+
+
+def render_prometheus(collector):
+    """
+    Renders the metrics of ``collector`` in the Prometheus text format.
+
+    """
+    counters = collector.counters()
+    histograms = collector.histograms()
+    lines = []
+    for name in sorted(METRICS):
+        kind, help, label = METRICS[name]
+        lines.append('# HELP %s %s' % (name, help))
+        lines.append('# TYPE %s %s' % (name, kind))
+        if kind == 'counter':
+            for key in sorted(k for k in counters if k[0] == name):
+                lines.append('%s{%s="%s"} %d' % (name, label, key[1],
+                                                 counters[key]))
+            continue
+        values = histograms.get(name)
+        if values is None:
+            continue
+        for bound, value in zip(collector.buckets, values):
+            lines.append('%s_bucket{le="%s"} %d' % (name, repr(bound), value))
+        lines.append('%s_bucket{le="+Inf"} %d' % (name, values[-1]))
+        lines.append('%s_sum %s' % (name, repr(values[-2])))
+        lines.append('%s_count %d' % (name, values[-1]))
+    return '\n'.join(lines) + '\n'
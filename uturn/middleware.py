@@ -1,16 +1,155 @@
 # -*- coding: utf-8 -*-
-from .http import smart_response
+from .compat import iscoroutinefunction, markcoroutinefunction
+from django.http import FileResponse
 
+from .conf import get_config
+from .http import get_redirect_url, smart_response, strip_param
+from .rewrite import LinkRewriter, MARKER
+from . import placeholders
+from .metrics import timer
+
+
+class BaseMiddleware(object):
+    """
+    Base class of the Uturn middleware, handling both synchronous and
+    asynchronous requests: under ASGI it doesn't force Django to switch
+    threads.
+
+    Subclasses override ``process_request`` and ``process_response``, which
+    are called like Django calls them on old-style middleware.
 
-class UturnMiddleware(object):
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None):
+        self.get_response = get_response
+        self.is_async = (get_response is not None and
+                         iscoroutinefunction(get_response))
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        response = self.process_request(request)
+        if response is None:
+            response = self.get_response(request)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        response = self.process_request(request)
+        if response is None:
+            response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_request(self, request):
+        return None
+
+    def process_response(self, request, response):
+        return response
+
+
+class UturnMiddleware(BaseMiddleware):
     """
     Middleware that applies the logic of the ``uturn`` decorator to each
     request.
 
     If you want to enable Uturn redirects on each request, add this middleware
     class to your Django settings. If you prefer to explicitly specify which
-    views can use uturn redirects, use the ``uturn.views.uturn`` decorator.
+    views can use uturn redirects, use the ``uturn.decorators.uturn``
+    decorator.
+
+    Use the ``UTURN_INCLUDE_PATHS``, ``UTURN_EXCLUDE_PATHS``,
+    ``UTURN_INCLUDE_URL_NAMES`` and ``UTURN_EXCLUDE_URL_NAMES`` settings to
+    limit the requests the middleware handles; see ``uturn.conf.Scope``.
+
+    """
+    def process_response(self, request, response):
+        config = get_config()
+        if config.scope is not None and request not in config.scope:
+            return response
+        metrics = config.metrics
+        if metrics is None:
+            return smart_response(request, response)
+        start = timer()
+        response = smart_response(request, response)
+        metrics.observe('uturn_response_seconds', timer() - start)
+        return response
+
+
+class UturnPlaceholderMiddleware(BaseMiddleware):
+    """
+    Middleware substituting the placeholders rendered by the Uturn template
+    tags when the ``UTURN_PLACEHOLDERS`` setting is enabled.
+
+    Put it above Django's cache middleware. The next URL is removed from the
+    query string of ``GET`` and ``HEAD`` requests once it has been read, so
+    the cache key of a page is the same for every next URL; the cached page
+    holds placeholders, which are substituted in HTML responses on their way
+    out. See ``uturn.placeholders``.
+
+    """
+    def process_request(self, request):
+        config = get_config()
+        if not config.placeholders or request.method not in ('GET', 'HEAD'):
+            return
+        query_string = request.META.get('QUERY_STRING', '')
+        if config.param not in query_string:
+            return
+        # Read (and remember) the next URL before it disappears
+        get_redirect_url(request)
+        request.META['QUERY_STRING'] = strip_param(query_string,
+                                                   config.param)
+
+    def process_response(self, request, response):
+        if not get_config().placeholders or \
+                getattr(response, 'streaming', False):
+            return response
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(placeholders.CONTENT_TYPES):
+            return response
+        content = response.content
+        substituted = placeholders.substitute(
+            request, content, getattr(response, 'charset', 'utf-8'))
+        if substituted is not content:
+            response.content = substituted
+            if response.has_header('Content-Length'):
+                response['Content-Length'] = str(len(substituted))
+        return response
+
+
+class UturnLinkMiddleware(BaseMiddleware):
+    """
+    Middleware adding the next URL to the links and forms marked with a
+    ``data-uturn`` attribute in HTML responses, including streaming
+    responses. See ``uturn.rewrite``.
+
+    Put it below middleware compressing responses (like ``GZipMiddleware``):
+    compressed responses are left alone. So are file downloads.
 
     """
     def process_response(self, request, response):
-        return smart_response(request, response)
+        if isinstance(response, FileResponse) or \
+                response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(placeholders.CONTENT_TYPES):
+            return response
+        rewriter = LinkRewriter(request, getattr(response, 'charset', 'utf-8'))
+        if getattr(response, 'streaming', False):
+            if getattr(response, 'is_async', False):
+                response.streaming_content = rewriter.achunks(
+                    response.streaming_content)
+            else:
+                response.streaming_content = rewriter.chunks(
+                    response.streaming_content)
+            if response.has_header('Content-Length'):
+                del response['Content-Length']
+            return response
+        content = response.content
+        if MARKER in content:
+            response.content = rewriter.rewrite(content)
+            if response.has_header('Content-Length'):
+                response['Content-Length'] = str(len(response.content))
+        return response
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Placeholders keeping request specific values out of cached HTML.
+
+When the ``UTURN_PLACEHOLDERS`` setting is enabled, the ``uturn``,
+``defaulturl`` and ``uturn_param`` template tags render stable placeholders
+instead of values derived from the request. ``UturnPlaceholderMiddleware``
+substitutes the actual values into the response body in a single pass, so
+pages and template fragments can be cached once and served for any next URL.
+
+"""
+import re
+
+from django.utils.html import conditional_escape
+
+from .http import get_redirect_url, uturn_fragment, uturn_input
+
+
+#: Stands in for the next URL fragment added by the ``uturn`` tag.
+FRAGMENT = '{{uturn:fragment}}'
+
+#: Stands in for the hidden field rendered by the ``uturn_param`` tag.
+INPUT = '{{uturn:input}}'
+
+#: Matches any placeholder in an encoded response body.
+PLACEHOLDER_RE = re.compile(
+    br'\{\{uturn:(?:(fragment)|(input)|default:([^}]*))\}\}')
+
+#: Content types of responses placeholders are substituted in.
+CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+
+def default(url):
+    """
+    Returns the placeholder for the ``defaulturl`` tag: the next URL of the
+    request when there is one, ``url`` otherwise.
+
+    """
+    return '{{uturn:default:%s}}' % url
+
+
+def add_fragment(url):
+    """
+    Adds the placeholder for the next URL fragment to ``url``.
+
+    """
+    sep = '&' if '?' in url else '?'
+    return url + sep + FRAGMENT
+
+
+def substitute(request, content, charset='utf-8'):
+    """
+    Returns ``content`` (a byte string) with all placeholders replaced by the
+    values for ``request``.
+
+    """
+    if b'{{uturn:' not in content:
+        return content
+
+    def replace(match):
+        fragment, input, url = match.groups()
+        if fragment:
+            value = uturn_fragment(request)
+        elif input:
+            value = uturn_input(request)
+        else:
+            value = get_redirect_url(request)
+            if not value:
+                return url
+            # Rendered like the defaulturl tag does, escaped
+            value = conditional_escape(value)
+        return value.encode(charset)
+    return PLACEHOLDER_RE.sub(replace, content)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Adds the next URL to links and forms marked with a ``data-uturn`` attribute.
+
+``<a data-uturn href="/tickets/new/">`` gets the current request path added
+to its ``href`` like the ``uturn`` template tag would; ``<form data-uturn>``
+gets a hidden field right after its start tag, like the ``uturn_param`` tag
+renders. HTML is rewritten chunk by chunk with regular expressions, without
+building a DOM: only a partial tag at the end of a chunk (at most
+``MAX_TAG_LENGTH`` bytes) is held back until the next chunk arrives. Being
+this simple, it also rewrites marked tags appearing in comments and scripts.
+
+"""
+import re
+
+from django.utils.html import conditional_escape
+
+from .http import param_name, uturn_fragment, uturn_next
+
+
+#: Tags longer than this are passed through without being rewritten when
+#: they're split across chunks.
+MAX_TAG_LENGTH = 4096
+
+#: The marker attribute; responses without it are left alone.
+MARKER = b'data-uturn'
+
+TAG_RE = re.compile(
+    br'<(a|form)(\s(?:[^>"\']|"[^"]*"|\'[^\']*\')*)>', re.IGNORECASE)
+MARKER_RE = re.compile(br'\sdata-uturn(?=[\s=/]|$)', re.IGNORECASE)
+HREF_RE = re.compile(
+    br'(\shref\s*=\s*)(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'=<>`]+))',
+    re.IGNORECASE)
+#: Matches a complete tag (or anything else between angle brackets).
+COMPLETE_RE = re.compile(br'<(?:[^>"\']|"[^"]*"|\'[^\']*\')*>')
+
+
+class LinkRewriter(object):
+    """
+    Rewrites the marked links and forms in the HTML of a response to
+    ``request``.
+
+    Use ``rewrite`` for a complete body, or ``feed`` every chunk of a
+    streaming body followed by a single call to ``close``.
+
+    """
+    def __init__(self, request, charset='utf-8'):
+        self.request = request
+        self.charset = charset
+        self.carry = b''
+        self._fragment = None
+        self._input = None
+
+    def rewrite(self, content):
+        index = content.find(MARKER)
+        if index == -1:
+            return content
+        # Jump from marker to marker rather than matching every tag: most
+        # links in a page aren't marked
+        parts = []
+        end = 0
+        while index != -1:
+            start = content.rfind(b'<', end, index)
+            match = TAG_RE.match(content, start) if start != -1 else None
+            if match is not None and match.end() > index:
+                parts.append(content[end:start])
+                parts.append(self._replace(match))
+                end = match.end()
+                index = content.find(MARKER, end)
+            else:
+                index = content.find(MARKER, index + len(MARKER))
+        parts.append(content[end:])
+        return b''.join(parts)
+
+    def feed(self, chunk):
+        data = self.carry + chunk if self.carry else chunk
+        self.carry = b''
+        start = data.rfind(b'<')
+        if start != -1 and len(data) - start <= MAX_TAG_LENGTH and \
+                COMPLETE_RE.match(data, start) is None:
+            # The chunk ends in a tag: wait for the rest of it
+            self.carry = data[start:]
+            data = data[:start]
+        return self.rewrite(data)
+
+    def close(self):
+        data, self.carry = self.carry, b''
+        return self.rewrite(data)
+
+    def chunks(self, iterable):
+        for chunk in iterable:
+            data = self.feed(chunk)
+            if data:
+                yield data
+        data = self.close()
+        if data:
+            yield data
+
+    async def achunks(self, iterable):
+        async for chunk in iterable:
+            data = self.feed(chunk)
+            if data:
+                yield data
+        data = self.close()
+        if data:
+            yield data
+
+    def _replace(self, match):
+        tag, attrs = match.groups()
+        if MARKER_RE.search(attrs) is None:
+            return match.group(0)
+        if tag.lower() == b'form':
+            return match.group(0) + self.input()
+        return b'<' + tag + HREF_RE.sub(self._replace_href, attrs, 1) + b'>'
+
+    def _replace_href(self, match):
+        prefix, double, single, bare = match.groups()
+        if single is not None:
+            quote, url = b"'", single
+        else:
+            quote, url = b'"', double if double is not None else bare
+        return prefix + quote + self.add_fragment(url) + quote
+
+    def add_fragment(self, url):
+        url, hash, anchor = url.partition(b'#')
+        fragment = self.fragment()
+        path, question, query = url.partition(b'?')
+        if question:
+            # Leave next URLs that were passed explicitly alone
+            param = fragment.split(b'=', 1)[0] + b'='
+            for part in query.replace(b'&amp;', b'&').split(b'&'):
+                if part.startswith(param):
+                    return url + hash + anchor
+        sep = b'&amp;' if question else b'?'
+        return url + sep + fragment + hash + anchor
+
+    def fragment(self):
+        if self._fragment is None:
+            self._fragment = uturn_fragment(self.request).encode(self.charset)
+        return self._fragment
+
+    def input(self):
+        if self._input is None:
+            attr = {
+                'param': conditional_escape(param_name()),
+                'value': conditional_escape(uturn_next(self.request)),
+            }
+            self._input = ("<input type='hidden' name='%(param)s' "
+                           "value='%(value)s'>" % attr).encode(self.charset)
+        return self._input
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from django.dispatch import Signal
+
+
+#: Sent when a temporary redirect is overridden by the next URL. Receivers get
+#: the ``request``, the ``response`` and the new ``location``.
+redirect_overridden = Signal()
+
+#: Sent when a temporary redirect is left alone because the request carries
+#: no valid next URL. Receivers get the ``request`` and the ``response``.
+redirect_kept = Signal()
+
+#: Sent when the next URL of a request is rejected. Receivers get the
+#: ``request``, the rejected ``value`` and the ``reason``: ``'host'`` (an
+#: absolute URL to a host that isn't allowed), ``'path'`` (not an absolute
+#: path or URL), ``'scheme'`` (an absolute URL that isn't ``http`` or
+#: ``https``), ``'token'`` (an unknown or expired token), ``'signature'`` (an
+#: unsigned value while ``UTURN_REQUIRE_SIGNATURE`` is enabled),
+#: ``'unresolvable'`` (a path matching no URL pattern while
+#: ``UTURN_RESOLVE_TARGETS`` is enabled) or ``'loop'`` (redirecting would
+#: loop).
+redirect_rejected = Signal()
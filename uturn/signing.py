@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Signed next URLs.
+
+When the ``UTURN_SIGNED`` setting is enabled, the next URLs Uturn renders
+carry a truncated HMAC-SHA256 signature: ``/tickets/?page=2:Qm9xX2Zp...``.
+Only URLs that passed validation are signed, so ``get_redirect_url`` accepts
+a signed URL after a single constant time comparison of the signature,
+without parsing it or checking its host again.
+
+Signatures are computed with Django's ``salted_hmac``, salted with the
+``UTURN_SIGNING_SALT`` setting. URLs are signed with the first key of
+``UTURN_SIGNING_KEYS`` and verified with each of them, which allows rotating
+keys. The keys default to Django's ``SECRET_KEY`` followed by
+``SECRET_KEY_FALLBACKS``.
+
+"""
+import base64
+
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .conf import get_config
+
+
+#: Separates the URL from its signature.
+SEPARATOR = ':'
+
+#: Number of bytes of the HMAC that are kept.
+SIGNATURE_BYTES = 16
+
+#: Length of the encoded signature.
+SIGNATURE_LENGTH = 22
+
+
+def sign(url):
+    """
+    Returns ``url`` followed by its signature.
+
+    """
+    config = get_config()
+    return url + SEPARATOR + _signature(url, config.signing_keys[0], config)
+
+
+def unsign(value):
+    """
+    Returns the URL signed in ``value`` or ``None`` when ``value`` doesn't
+    carry a valid signature.
+
+    """
+    url, sep, signature = value.rpartition(SEPARATOR)
+    if not sep or len(signature) != SIGNATURE_LENGTH:
+        return None
+    config = get_config()
+    for key in config.signing_keys:
+        if constant_time_compare(signature, _signature(url, key, config)):
+            return url
+    return None
+
+
+def _signature(url, key, config):
+    mac = salted_hmac(config.signing_salt, url, secret=key,
+                      algorithm='sha256')
+    digest = mac.digest()[:SIGNATURE_BYTES]
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
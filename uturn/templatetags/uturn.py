@@ -2,30 +2,179 @@
 from __future__ import absolute_import, unicode_literals
 
 from django import template
+from django.template.base import Variable
 from django.template.defaulttags import URLNode
-from django.utils.http import urlencode
 from django.utils.html import conditional_escape
 from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+from django.urls import NoReverseMatch, get_resolver, get_script_prefix, \
+                        get_urlconf, reverse
 
-from uturn.http import get_redirect_url, param_name
+from uturn import placeholders
+from uturn.cache import MISSING
+from uturn.conf import get_config
+from uturn.http import add_uturn_param, get_redirect_url, \
+                       reverse_cache_info, reverse_url, uturn_input
 
 
 register = template.Library()
 
 
-class DefaultUrlNode(URLNode):
+def render_url(url_node, context):
+    """
+    Renders the URL of ``url_node`` like Django's ``url`` tag would, without
+    storing it in the context. The URL is only escaped when it's output rather
+    than stored with ``as``.
+
+    Reversed URLs are cached when the ``UTURN_REVERSE_CACHE_SIZE`` setting is
+    set; see ``uturn.http.reverse_url``.
+
+    """
+    args = [arg.resolve(context) for arg in url_node.args]
+    kwargs = dict((k, v.resolve(context)) for k, v in url_node.kwargs.items())
+    view_name = url_node.view_name.resolve(context)
+    try:
+        url = reverse_url(getattr(context, 'request', None), view_name, args,
+                          kwargs)
+    except NoReverseMatch:
+        if url_node.asvar is None:
+            raise
+        url = ''
+    if url_node.asvar is None and context.autoescape:
+        url = conditional_escape(url)
+    return url
+
+
+def _literal(expression):
+    """
+    Returns the value of the filter expression ``expression`` when it's a
+    literal without filters, ``MISSING`` otherwise.
+
+    """
+    if expression.filters:
+        return MISSING
+    if not isinstance(expression.var, Variable):
+        # Quoted strings are resolved when the template is compiled
+        return expression.var
+    if expression.var.literal is None or expression.var.translate:
+        return MISSING
+    return expression.var.literal
+
+
+#: Key of the URL configuration state in a template's render context.
+_URL_STATE = object()
+
+
+def _url_state(context):
+    """
+    Returns the resolver and script prefix the URLs in the template being
+    rendered are reversed with, looked up once per template render.
+
+    """
+    state = context.render_context.get(_URL_STATE)
+    if state is None:
+        state = (get_resolver(get_urlconf()), get_script_prefix())
+        context.render_context[_URL_STATE] = state
+    return state
+
+
+class FoldedUrl(object):
+    """
+    The URL of a ``url_node`` whose arguments are all literals, reversed on
+    its first render and reused for the renders after it.
+
+    URLs are kept per active language, as ``i18n_patterns`` and translated
+    patterns reverse differently for each. They're reversed again when
+    Django's URL caches are cleared (the resolver is rebuilt then), the URL
+    configuration of the request differs or the script prefix changes. Use
+    ``fold_url`` to create one.
+
+    """
+    def __init__(self, view_name, args, kwargs, asvar):
+        self.view_name = view_name
+        self.args = args
+        self.kwargs = kwargs
+        self.asvar = asvar
+        self._cached = None
+
+    def render(self, context):
+        try:
+            url, escaped = self.reverse(*_url_state(context))
+        except NoReverseMatch:
+            if self.asvar is None:
+                raise
+            return ''
+        if self.asvar is None and context.autoescape:
+            return escaped
+        return url
+
+    def reverse(self, resolver, prefix):
+        """
+        Returns the URL and its escaped form for the given resolver and
+        script prefix and the active language, reversing it only when they
+        changed.
+
+        """
+        cached = self._cached
+        if cached is None or cached[0] is not resolver or cached[1] != prefix:
+            # A single assignment keeps concurrent renders consistent
+            cached = self._cached = (resolver, prefix, {})
+        urls = cached[2]
+        language = get_language()
+        try:
+            return urls[language]
+        except KeyError:
+            url = reverse(self.view_name, args=self.args, kwargs=self.kwargs)
+            result = urls[language] = (url, conditional_escape(url))
+            return result
+
+
+def fold_url(url_node):
+    """
+    Returns a ``FoldedUrl`` for ``url_node`` when its view name and arguments
+    are all literals, ``None`` otherwise.
+
+    Namespaced view names aren't folded: they're reversed for the current
+    application of the request being rendered.
+
+    """
+    view_name = _literal(url_node.view_name)
+    if not isinstance(view_name, str) or ':' in view_name:
+        return None
+    args = [_literal(arg) for arg in url_node.args]
+    kwargs = dict((k, _literal(v)) for k, v in url_node.kwargs.items())
+    if MISSING in args or MISSING in kwargs.values():
+        return None
+    return FoldedUrl(view_name, args, kwargs, url_node.asvar)
+
+
+class UrlNodeMixin(object):
+    """
+    Renders the URL of the wrapped ``url_node``, folded when possible.
+
+    """
+    def __init__(self, url_node):
+        self.url_node = url_node
+        self.folded = fold_url(url_node)
+
+    def render_url(self, context):
+        if self.folded is not None:
+            return self.folded.render(context)
+        return render_url(self.url_node, context)
+
+
+class DefaultUrlNode(UrlNodeMixin, URLNode):
     """
     Duplicate of the standard Django URL node that will render the "uturn"
     parameter from the request or if no such parameter exists, the URL supplied
     to the tag.
 
     It assumes the Context is a RequestContext. Make sure you've added the
-    following template context processor in your settings as this provides
-    access to the request from within the template tag::
+    following template context processor to the ``context_processors`` option
+    of your ``TEMPLATES`` setting as this provides access to the request from
+    within the template tag::
 
-        TEMPLATE_CONTEXT_PROCESSORS += (
-            'django.core.context_processors.request',
-        )
+        'django.template.context_processors.request',
 
     An example. Usually you'd use the following to render a link::
 
@@ -41,19 +190,25 @@ class DefaultUrlNode(URLNode):
     valid uturn parameter is present, a link to the value of the uturn
     parameter.
     """
-    def __init__(self, url_node):
-        self.url_node = url_node
-
     def render(self, context):
-        next = get_redirect_url(context.get('request', None))
-        url = next if next else self.url_node.render(context)
+        request = context.get('request', None)
+        if request is not None and get_config().placeholders:
+            url = placeholders.default(self.render_url(context))
+        else:
+            next = get_redirect_url(request)
+            if not next:
+                url = self.render_url(context)
+            elif self.url_node.asvar is None and context.autoescape:
+                url = conditional_escape(next)
+            else:
+                url = next
         if self.url_node.asvar:
             context[self.url_node.asvar] = url
             return ''
         return url
 
 
-class UturnUrlNode(URLNode):
+class UturnUrlNode(UrlNodeMixin, URLNode):
     """
     Duplicate of the standard Django URL node that will add the current request
     path to the URL.
@@ -63,12 +218,11 @@ class UturnUrlNode(URLNode):
     containing the uturn template tag, overriding the default redirect.
 
     It assumes the Context is a RequestContext. Make sure you've added the
-    following template context processor in your settings as this provides
-    access to the request from within the template tag::
+    following template context processor to the ``context_processors`` option
+    of your ``TEMPLATES`` setting as this provides access to the request from
+    within the template tag::
 
-        TEMPLATE_CONTEXT_PROCESSORS += (
-            'django.core.context_processors.request',
-        )
+        'django.template.context_processors.request',
 
     An example. Usually you'd use the following to render a link::
 
@@ -85,18 +239,13 @@ class UturnUrlNode(URLNode):
 
         {% defaulturl previousviewname id %}
     """
-    def __init__(self, url_node):
-        self.url_node = url_node
-
     def render(self, context):
-        url = self.url_node.render(context)
+        url = self.render_url(context)
         request = context.get('request', None)
-        if request:
-            next = request.path
-            param = param_name()
-            part = urlencode({param: next})
-            sep = '&' if url.find('?') >= 0 else '?'
-            url = url + sep + part
+        if request and get_config().placeholders:
+            url = placeholders.add_fragment(url)
+        elif request:
+            url = add_uturn_param(url, request)
         if self.url_node.asvar:
             context[self.url_node.asvar] = url
             return ''
@@ -133,15 +282,9 @@ def do_uturn(parser, token):
 
 
 def _do_uturn_param(request):
-    next = get_redirect_url(request)
-    if next:
-        attr = {
-            'param': conditional_escape(param_name()),
-            'value': conditional_escape(next)
-        }
-        f = "<input type='hidden' name='%(param)s' value='%(value)s'>" % attr
-        return mark_safe("<div style='display:none'>%s</div>" % f)
-    return ''
+    if request is not None and get_config().placeholders:
+        return mark_safe(placeholders.INPUT)
+    return uturn_input(request)
 
 
 @register.simple_tag(takes_context=True)
@@ -1,7 +1,28 @@
 # -*- coding: utf-8 -*-
-from .http import (GetRedirectUrlTest, SmartRedirectTest,
-    SmartHttpResponseRedirectTest)
+from .http import (GetRedirectUrlTest, GetRedirectUrlCacheTest,
+    BodyLookupTest, RedirectHeaderTest, SmartRedirectTest,
+    SmartHttpResponseRedirectTest, ClientRedirectTest, RedirectStatusTest,
+    ReturnStackTest, CanonicalRedirectTest, ResolveTargetsTest,
+    LoopDetectionTest, UturnUrlsTest)
 from .tags import (DefaultUrlTemplateTagTest, UturnTemplateTagTest,
-    UturnParamTemplateTagTest)
-from .decorators import UturnDecoratorTest
-from .middleware import UturnMiddlewareTest
\ No newline at end of file
+    UturnParamTemplateTagTest, ReverseCacheTest, FoldedUrlTest,
+    DjangoMatrixTest)
+from .decorators import (UturnDecoratorTest, UturnDecoratorPolicyTest,
+    AsyncUturnDecoratorTest)
+from .middleware import (UturnMiddlewareTest, StreamingResponseTest,
+    AsyncUturnMiddlewareTest, BaseMiddlewareTest)
+from .conf import (AllowedHostsTest, ScopeTest, CanonicalizerTest,
+    UturnConfigTest)
+from .cache import LRUCacheTest, URLCacheTest
+from .tokens import TokenizeTest, TokenRedirectTest, TokenTemplateTagTest
+from .signing import (SignTest, SignedRedirectTest, SignedTemplateTagTest,
+    SigningOracleTest)
+from .metrics import CollectorTest, MetricsTest, SignalsTest
+from .placeholders import (PlaceholderTemplateTagTest, SubstituteTest,
+    StripParamTest, UturnPlaceholderMiddlewareTest, CachedPageTest)
+from .rewrite import LinkRewriterTest, UturnLinkMiddlewareTest
+from .validation import ValidatorTest, DifferentialFuzzTest
+from .jinja2 import (JinjaTagMatrixTest, JinjaGlobalMatrixTest,
+    JinjaFoldedUrlTest, JinjaBackendTest)
+from .forms import UturnFormTest
+from .views import UturnMixinTest
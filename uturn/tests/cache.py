@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from unittest import TestCase
+from django.urls import clear_url_caches
+
+from ..cache import LRUCache, MISSING, URLCache
+
+
+class LRUCacheTest(TestCase):
+
+    def test_get(self):
+        cache = LRUCache(2)
+        self.assertTrue(cache.get('a') is MISSING)
+        self.assertEqual(None, cache.get('a', None))
+        cache.set('a', 1)
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual((1, 2, 2, 1), tuple(cache.info()))
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(2, len(cache))
+        self.assertEqual(1, cache.get('a'))
+        self.assertTrue(cache.get('b') is MISSING)
+        self.assertEqual(3, cache.get('c'))
+
+    def test_clear(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.get('a')
+        cache.clear()
+        self.assertEqual((0, 0, 2, 0), tuple(cache.info()))
+
+
+class URLCacheTest(TestCase):
+
+    def test_cleared_with_url_caches(self):
+        cache = URLCache(2)
+        cache.set('a', 1)
+        self.assertEqual(1, cache.get('a'))
+        clear_url_caches()
+        self.assertTrue(cache.get('a') is MISSING)
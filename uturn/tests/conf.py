@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from unittest import TestCase
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+from django.urls import resolve
+
+from .http import GET
+
+from ..conf import AllowedHosts, Canonicalizer, Scope, get_config
+from ..http import get_redirect_url
+
+
+class AllowedHostsTest(TestCase):
+
+    def test_empty(self):
+        hosts = AllowedHosts(None)
+        self.assertFalse(hosts)
+        self.assertFalse('example.com' in hosts)
+
+    def test_exact(self):
+        hosts = AllowedHosts(['example.com', 'Other.com'])
+        self.assertTrue(hosts)
+        self.assertTrue('example.com' in hosts)
+        self.assertTrue('EXAMPLE.com' in hosts)
+        self.assertTrue('other.com:8000' in hosts)
+        self.assertTrue('example.com.' in hosts)
+        self.assertFalse('user@example.com' in hosts)
+        self.assertFalse('sub.example.com' in hosts)
+        self.assertFalse('anexample.com' in hosts)
+
+    def test_wildcard(self):
+        hosts = AllowedHosts(['.example.com'])
+        self.assertTrue('example.com' in hosts)
+        self.assertTrue('sub.example.com' in hosts)
+        self.assertTrue('a.b.Example.com' in hosts)
+        self.assertTrue('sub.example.com:8000' in hosts)
+        self.assertFalse('evil.com@sub.example.com' in hosts)
+        self.assertFalse('anexample.com' in hosts)
+        self.assertFalse('example.com.evil.com' in hosts)
+        self.assertFalse('sub.example.com@evil.com' in hosts)
+        self.assertFalse('com' in hosts)
+        self.assertFalse('[::1]' in hosts)
+
+    def test_any(self):
+        hosts = AllowedHosts(['*'])
+        self.assertTrue('example.com' in hosts)
+        self.assertTrue('anything.at.all' in hosts)
+        self.assertFalse('user@example.com' in hosts)
+
+    def test_many(self):
+        hosts = AllowedHosts(['.tenant%d.example.com' % i for i in range(500)])
+        self.assertTrue('www.tenant499.example.com' in hosts)
+        self.assertFalse('www.tenant500.example.com' in hosts)
+
+
+def request(path, resolved=True):
+    request = RequestFactory().get(path)
+    if resolved:
+        request.resolver_match = resolve(path)
+    return request
+
+
+class ScopeTest(TestCase):
+
+    def test_empty(self):
+        scope = Scope()
+        self.assertFalse(scope)
+        self.assertTrue(request('/default/') in scope)
+
+    def test_exclude_paths(self):
+        scope = Scope(exclude_paths=['/static/', '/health'])
+        self.assertTrue(scope)
+        self.assertFalse(request('/static/css/site.css', False) in scope)
+        self.assertFalse(request('/health', False) in scope)
+        self.assertFalse(request('/healthz', False) in scope)
+        self.assertTrue(request('/default/') in scope)
+        self.assertTrue(request('/api/static/', False) in scope)
+
+    def test_include_paths(self):
+        scope = Scope(include_paths=['/with-params/', '/other/'],
+                      exclude_paths=['/with-params/skip/'])
+        self.assertTrue(request('/with-params/hi/') in scope)
+        self.assertTrue(request('/other/') in scope)
+        self.assertFalse(request('/default/') in scope)
+        self.assertFalse(request('/with-params/skip/') in scope)
+
+    def test_exclude_names(self):
+        scope = Scope(exclude_names=['default_view'])
+        self.assertFalse(request('/default/') in scope)
+        self.assertTrue(request('/other/') in scope)
+        self.assertTrue(request('/unresolved/', False) in scope)
+
+    def test_include_names(self):
+        scope = Scope(include_paths=['/other/'], include_names=['with_params'])
+        self.assertTrue(request('/with-params/hi/') in scope)
+        self.assertTrue(request('/other/') in scope)
+        self.assertFalse(request('/default/') in scope)
+        self.assertFalse(request('/unresolved/', False) in scope)
+
+    def test_exclude_names_before_include_paths(self):
+        scope = Scope(include_paths=['/'], exclude_names=['default_view'])
+        self.assertFalse(request('/default/') in scope)
+        self.assertTrue(request('/other/') in scope)
+
+
+class CanonicalizerTest(TestCase):
+
+    def test_equivalent_urls_collapse(self):
+        canonicalize = Canonicalizer(drop=['utm_*'])
+        urls = [
+            '/tickets/?status=open&page=2',
+            '/tickets/?page=2&status=open',
+            '/tickets/?page=2&q=&status=open',
+            '/tickets/?status=open&utm_source=mail&page=2#results',
+            '/tickets/?utm_medium=x&page=2&status=open&utm_campaign=',
+        ]
+        self.assertEqual(set(['/tickets/?page=2&status=open']),
+                         set(canonicalize(url) for url in urls))
+
+    def test_no_query(self):
+        canonicalize = Canonicalizer()
+        self.assertEqual('/tickets/', canonicalize('/tickets/'))
+        self.assertEqual('/tickets/', canonicalize('/tickets/?#top'))
+        self.assertEqual('/tickets/', canonicalize('/tickets/?q=&p'))
+
+    def test_repeated_params_keep_order(self):
+        canonicalize = Canonicalizer()
+        self.assertEqual('/a/?a=1&t=2&t=1',
+                         canonicalize('/a/?t=2&a=1&t=1'))
+
+    def test_keep(self):
+        canonicalize = Canonicalizer(keep=['page', 'status'])
+        self.assertEqual('/a/?page=2&status=open',
+                         canonicalize('/a/?status=open&sort=x&page=2'))
+
+    def test_encoded_names(self):
+        canonicalize = Canonicalizer(drop=['utm_*'])
+        self.assertEqual('/a/?b=1', canonicalize('/a/?utm%5Fsource=x&b=1'))
+
+    def test_absolute(self):
+        canonicalize = Canonicalizer()
+        self.assertEqual('https://example.com/a/?a=1&b=2',
+                         canonicalize('https://example.com/a/?b=2&a=1#x'))
+
+    def test_cache(self):
+        canonicalize = Canonicalizer(size=2)
+        canonicalize('/a/?b=1')
+        canonicalize('/a/?b=1')
+        canonicalize('/b/')
+        canonicalize('/c/')
+        info = canonicalize.cache.info()
+        self.assertEqual((1, 3, 2, 2), tuple(info))
+
+    def test_no_cache(self):
+        canonicalize = Canonicalizer(size=0)
+        self.assertTrue(canonicalize.cache is None)
+        self.assertEqual('/a/?a=1&b=2', canonicalize('/a/?b=2&a=1'))
+
+
+class UturnConfigTest(TestCase):
+
+    def test_defaults(self):
+        config = get_config()
+        self.assertEqual('next', config.param)
+        self.assertFalse(config.allowed_hosts)
+
+    def test_built_once(self):
+        self.assertTrue(get_config() is get_config())
+
+    def test_rebuilt_on_setting_changed(self):
+        config = get_config()
+        with override_settings(UTURN_REDIRECT_PARAM='uturn'):
+            self.assertEqual('uturn', get_config().param)
+        self.assertFalse(config is get_config())
+        self.assertEqual('next', get_config().param)
+
+    def test_not_rebuilt_for_other_settings(self):
+        config = get_config()
+        with override_settings(SOME_OTHER_SETTING=True):
+            self.assertTrue(config is get_config())
+
+    def test_scope(self):
+        self.assertTrue(get_config().scope is None)
+        with override_settings(UTURN_EXCLUDE_PATHS=['/static/']):
+            self.assertTrue(request('/default/') in get_config().scope)
+
+    def test_wildcard_redirect(self):
+        with override_settings(UTURN_ALLOWED_HOSTS=['.example.com']):
+            request = GET({'next': 'http://www.example.com/path'})
+            self.assertEqual('http://www.example.com/path',
+                             get_redirect_url(request))
+            request = GET({'next': 'http://example.org/path'})
+            self.assertTrue(get_redirect_url(request) is None)
@@ -4,9 +4,12 @@ from unittest import TestCase
 from django.http import HttpResponse, HttpResponseRedirect, \
                         HttpResponsePermanentRedirect
 from django.views.generic import View
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
 
-from .http import GET
+from .http import GET, POST
 
+from ..compat import iscoroutinefunction
 from ..decorators import uturn
 
 
@@ -32,6 +35,13 @@ class OptionalRedirect(View):
 cbv_optional_redirect = uturn(OptionalRedirect.as_view())
 
 
+@uturn(statuses=(302, 307), see_other=True)
+def policy_redirect(request, status=302):
+    response = HttpResponseRedirect('/to-here')
+    response.status_code = status
+    return response
+
+
 class UturnDecoratorTest(TestCase):
 
     def test_normal_response(self):
@@ -65,3 +75,52 @@ class UturnDecoratorTest(TestCase):
     def test_redirect_no_uturn_when_permanent_cbv(self):
         response = cbv_optional_redirect(GET({'next': '/no-here'}), redirect='/permanent')
         self.assertEqual('/permanent', response.get('Location', None))
+
+
+class UturnDecoratorPolicyTest(TestCase):
+
+    def test_statuses(self):
+        response = policy_redirect(GET({'next': '/no-here'}), 307)
+        self.assertEqual('/no-here', response.get('Location', None))
+        self.assertEqual(307, response.status_code)
+
+    def test_other_statuses(self):
+        response = policy_redirect(GET({'next': '/no-here'}), 303)
+        self.assertEqual('/to-here', response.get('Location', None))
+
+    def test_see_other(self):
+        response = policy_redirect(POST({'next': '/no-here'}), 307)
+        self.assertEqual('/no-here', response.get('Location', None))
+        self.assertEqual(303, response.status_code)
+
+    def test_keeps_name(self):
+        self.assertEqual('policy_redirect', policy_redirect.__name__)
+
+
+class AsyncUturnDecoratorTest(TestCase):
+
+    def get(self, path, data=None):
+        return async_to_sync(AsyncClient().get)(path, data or {})
+
+    def test_coroutine_view(self):
+        async def view(request):
+            return HttpResponseRedirect('/to-here')
+        wrapped = uturn(view)
+        self.assertTrue(iscoroutinefunction(wrapped))
+        response = async_to_sync(wrapped)(GET({'next': '/no-here'}))
+        self.assertEqual('/no-here', response.get('Location', None))
+
+    def test_sync_view(self):
+        self.assertFalse(iscoroutinefunction(optional_redirect))
+
+    def test_redirect_no_uturn(self):
+        response = self.get('/async-uturn-redirect/')
+        self.assertEqual('/to-here', response.get('Location', None))
+
+    def test_redirect_uturn(self):
+        response = self.get('/async-uturn-redirect/', {'next': '/no-here'})
+        self.assertEqual('/no-here', response.get('Location', None))
+
+    def test_redirect_uturn_sync_view(self):
+        response = self.get('/uturn-redirect/', {'next': '/no-here'})
+        self.assertEqual('/no-here', response.get('Location', None))
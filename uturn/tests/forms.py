@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+from django import forms
+from django.template import Context, Template
+
+from .http import GET, POST, SettingsTestCase
+
+from ..forms import UturnField, UturnFormMixin
+
+
+INPUT = ("<div style='display:none'><input type='hidden' name='next' "
+         "value='/okay-then'></div>")
+
+
+class TicketForm(UturnFormMixin, forms.Form):
+    title = forms.CharField()
+
+
+class UturnFormTest(SettingsTestCase):
+
+    def test_field_added(self):
+        form = TicketForm(uturn_request=GET())
+        self.assertTrue(isinstance(form.fields['next'], UturnField))
+        self.assertEqual(['title', 'next'], list(form.fields))
+
+    def test_param_name(self):
+        self.use_settings(UTURN_REDIRECT_PARAM='back')
+        form = TicketForm(uturn_request=GET())
+        self.assertTrue('back' in form.fields)
+
+    def test_render(self):
+        request = GET({'next': '/okay-then'})
+        form = TicketForm(uturn_request=request)
+        self.assertEqual(INPUT, str(form['next']))
+        self.assertTrue(INPUT in str(form))
+        t = Template('{% load uturn %}{% uturn_param %}')
+        self.assertEqual(INPUT, t.render(Context({'request': request})))
+
+    def test_render_prefixed(self):
+        form = TicketForm(prefix='ticket',
+                          uturn_request=GET({'next': '/okay-then'}))
+        self.assertEqual(INPUT, str(form['next']))
+
+    def test_render_without_next(self):
+        self.assertEqual('', str(TicketForm(uturn_request=GET())['next']))
+        self.assertEqual('', str(TicketForm()['next']))
+
+    def test_placeholders(self):
+        self.use_settings(UTURN_PLACEHOLDERS=True)
+        form = TicketForm(uturn_request=GET({'next': '/okay-then'}))
+        self.assertEqual('{{uturn:input}}', str(form['next']))
+
+    def test_cleaned(self):
+        request = POST({'title': 'Fish', 'next': '/okay-then'})
+        form = TicketForm(request.POST, uturn_request=request)
+        self.assertTrue(form.is_valid())
+        self.assertEqual('/okay-then', form.cleaned_data['next'])
+        self.assertEqual(['title'], form.changed_data)
+
+    def test_cleaned_invalid(self):
+        request = POST({'title': 'Fish', 'next': 'http://evil.com/'})
+        form = TicketForm(request.POST, uturn_request=request)
+        self.assertTrue(form.is_valid())
+        self.assertTrue(form.cleaned_data['next'] is None)
@@ -1,10 +1,20 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
+import json
 from unittest import TestCase
-from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse, HttpResponseRedirect, QueryDict
 from django.test.client import RequestFactory
+from django.test.utils import override_settings
+from django.utils import translation
+from django.urls import clear_url_caches, set_script_prefix
 
-from ..http import get_redirect_url, smart_redirect, SmartHttpResponseRedirect
+from .. import http, signals
+from ..conf import get_config
+from ..http import add_uturn_param, build_uturn_urls, get_redirect_url, \
+                   get_redirect_target, invalidate_redirect_url, \
+                   smart_redirect, smart_response, reverse_cache_info, \
+                   uturn_fragment, SmartHttpResponseRedirect
 
 
 def GET(data=None):
@@ -17,18 +27,33 @@ def POST(data=None):
     return RequestFactory().post('/path', data)
 
 
-class GetRedirectUrlTest(TestCase):
+class SettingsTestCase(TestCase):
+    """
+    Allows tests to override settings until the end of the test.
+
+    """
+    def setUp(self):
+        super(SettingsTestCase, self).setUp()
+        self._overrides = []
 
     def tearDown(self):
-        setattr(settings, 'UTURN_REDIRECT_PARAM', 'next')
-        setattr(settings, 'UTURN_ALLOWED_HOSTS', None)
-        super(GetRedirectUrlTest, self).tearDown()
+        while self._overrides:
+            self._overrides.pop().disable()
+        super(SettingsTestCase, self).tearDown()
+
+    def use_settings(self, **kwargs):
+        override = override_settings(**kwargs)
+        override.enable()
+        self._overrides.append(override)
+
+
+class GetRedirectUrlTest(SettingsTestCase):
 
     def test_none(self):
         self.assertTrue(get_redirect_url(GET()) is None)
 
     def test_none_param_changed(self):
-        setattr(settings, 'UTURN_REDIRECT_PARAM', 'uturn')
+        self.use_settings(UTURN_REDIRECT_PARAM='uturn')
         self.assertTrue(get_redirect_url(GET()) is None)
 
     def test_ok(self):
@@ -36,7 +61,7 @@ class GetRedirectUrlTest(TestCase):
         self.assertEqual('/nextone', get_redirect_url(request))
 
     def test_ok_param_changed(self):
-        setattr(settings, 'UTURN_REDIRECT_PARAM', 'uturn')
+        self.use_settings(UTURN_REDIRECT_PARAM='uturn')
         request = GET({'uturn': '/nextone'})
         self.assertEqual('/nextone', get_redirect_url(request))
 
@@ -47,7 +72,7 @@ class GetRedirectUrlTest(TestCase):
         self.assertTrue(get_redirect_url(request) is None)
 
     def test_whitelisted_domain(self):
-        setattr(settings, 'UTURN_ALLOWED_HOSTS', ['google.com'])
+        self.use_settings(UTURN_ALLOWED_HOSTS=['google.com'])
         request = GET({'next': 'http://google.com'})
         self.assertEqual('http://google.com', get_redirect_url(request))
         # No prefix means google.com is interpreted as a path, not a domain
@@ -63,7 +88,7 @@ class GetRedirectUrlTest(TestCase):
         self.assertTrue(get_redirect_url(request) is None)
 
     def test_relative_only_param_changed(self):
-        setattr(settings, 'UTURN_REDIRECT_PARAM', 'uturn')
+        self.use_settings(UTURN_REDIRECT_PARAM='uturn')
         request = GET({'uturn': 'http://google.com'})
         self.assertTrue(get_redirect_url(request) is None)
         request = GET({'uturn': 'google.com'})
@@ -83,17 +108,185 @@ class GetRedirectUrlTest(TestCase):
         self.assertTrue(get_redirect_url(request) is None)
 
     def test_mailto_url_whitelisted_domain(self):
-        setattr(settings, 'UTURN_ALLOWED_HOSTS', ['example.com'])
+        self.use_settings(UTURN_ALLOWED_HOSTS=['example.com'])
         request = GET({'next': 'mailto:test@example.com'})
         self.assertTrue(get_redirect_url(request) is None)
 
 
-class RedirectTestCase(TestCase):
+class CountingUrlparse(object):
+    """
+    Stands in for the ``urlparse`` module, counting the calls to ``urlparse``
+    and ``urlsplit``.
+
+    """
+    def __init__(self, module):
+        self.module = module
+        self.calls = 0
+
+    def __getattr__(self, name):
+        return getattr(self.module, name)
+
+    def urlparse(self, url):
+        self.calls += 1
+        return self.module.urlparse(url)
+
+    def urlsplit(self, url):
+        self.calls += 1
+        return self.module.urlsplit(url)
+
+
+class GetRedirectUrlCacheTest(TestCase):
+
+    def setUp(self):
+        super(GetRedirectUrlCacheTest, self).setUp()
+        self.urlparse = CountingUrlparse(http.urlparse)
+        http.urlparse = self.urlparse
 
     def tearDown(self):
-        setattr(settings, 'UTURN_REDIRECT_PARAM', 'next')
-        setattr(settings, 'UTURN_ALLOWED_HOSTS', None)
-        super(RedirectTestCase, self).tearDown()
+        http.urlparse = self.urlparse.module
+        super(GetRedirectUrlCacheTest, self).tearDown()
+
+    def test_parsed_once(self):
+        request = GET({'next': 'http://testserver/nextone'})
+        for i in range(10):
+            self.assertEqual('http://testserver/nextone',
+                             get_redirect_url(request))
+        self.assertEqual(1, self.urlparse.calls)
+
+    def test_plain_path_not_parsed(self):
+        request = GET({'next': '/nextone?a=1'})
+        self.assertEqual('/nextone?a=1', get_redirect_url(request))
+        self.assertEqual(0, self.urlparse.calls)
+
+    def test_parsed_once_when_rejected(self):
+        request = GET({'next': 'http://google.com'})
+        for i in range(10):
+            self.assertTrue(get_redirect_url(request) is None)
+        self.assertEqual(1, self.urlparse.calls)
+
+    def test_parsed_once_through_smart_redirect(self):
+        request = POST({'next': 'http://testserver/other'})
+        for i in range(10):
+            response = smart_redirect(request, '/default')
+            self.assertEqual('http://testserver/other', response['Location'])
+        self.assertEqual(1, self.urlparse.calls)
+
+    def test_no_request(self):
+        self.assertTrue(get_redirect_url(None) is None)
+        self.assertEqual(0, self.urlparse.calls)
+
+    def test_invalidate(self):
+        request = GET({'next': 'http://testserver/nextone'})
+        self.assertEqual('http://testserver/nextone',
+                         get_redirect_url(request))
+        request.GET = QueryDict('next=//testserver/other')
+        self.assertEqual('http://testserver/nextone',
+                         get_redirect_url(request))
+        invalidate_redirect_url(request)
+        self.assertEqual('//testserver/other', get_redirect_url(request))
+        self.assertEqual(2, self.urlparse.calls)
+
+    def test_invalidate_unused_request(self):
+        request = GET({'next': '/nextone'})
+        invalidate_redirect_url(request)
+        invalidate_redirect_url(None)
+        self.assertEqual('/nextone', get_redirect_url(request))
+
+
+class BodyLookupTest(SettingsTestCase):
+
+    def json(self, path='/path'):
+        return RequestFactory().post(path, '{"next": "/body"}',
+                                     content_type='application/json')
+
+    def assertBodyUnread(self, request):
+        self.assertFalse(hasattr(request, '_post'))
+        self.assertFalse(hasattr(request, '_body'))
+
+    def test_always(self):
+        self.assertEqual('/body', get_redirect_url(POST({'next': '/body'})))
+        request = RequestFactory().post('/path?next=/query', {})
+        self.assertTrue(get_redirect_url(request) is None)
+
+    def test_invalid(self):
+        self.use_settings(UTURN_BODY_LOOKUP='sometimes')
+        self.assertRaises(ImproperlyConfigured, get_config)
+
+    def test_form(self):
+        self.use_settings(UTURN_BODY_LOOKUP='form')
+        self.assertEqual('/body', get_redirect_url(POST({'next': '/body'})))
+        request = RequestFactory().post('/path?next=/query',
+                                        {'next': '/body'})
+        self.assertEqual('/query', get_redirect_url(request))
+        self.assertBodyUnread(request)
+
+    def test_form_ignores_other_content_types(self):
+        self.use_settings(UTURN_BODY_LOOKUP='form')
+        request = self.json()
+        self.assertTrue(get_redirect_url(request) is None)
+        self.assertBodyUnread(request)
+        request = self.json('/path?next=/query')
+        self.assertEqual('/query', get_redirect_url(request))
+        self.assertBodyUnread(request)
+
+    def test_parsed(self):
+        self.use_settings(UTURN_BODY_LOOKUP='parsed')
+        request = POST({'next': '/body'})
+        self.assertTrue(get_redirect_url(request) is None)
+        self.assertBodyUnread(request)
+        request = POST({'next': '/body'})
+        request.POST
+        self.assertEqual('/body', get_redirect_url(request))
+
+    def test_parsed_query_string(self):
+        self.use_settings(UTURN_BODY_LOOKUP='parsed')
+        request = RequestFactory().post('/path?next=/query',
+                                        {'next': '/body'})
+        self.assertEqual('/query', get_redirect_url(request))
+        self.assertBodyUnread(request)
+
+
+class RedirectHeaderTest(SettingsTestCase):
+
+    def request(self, method, next, data=None):
+        factory = getattr(RequestFactory(), method)
+        return factory('/path', data or {}, HTTP_X_UTURN_NEXT=next)
+
+    def test_disabled(self):
+        request = self.request('get', '/header')
+        self.assertTrue(get_redirect_url(request) is None)
+
+    def test_methods(self):
+        self.use_settings(UTURN_REDIRECT_HEADER='X-Uturn-Next')
+        for method in ('get', 'post', 'put', 'patch', 'delete'):
+            request = self.request(method, '/header')
+            self.assertEqual('/header', get_redirect_url(request))
+
+    def test_precedence(self):
+        self.use_settings(UTURN_REDIRECT_HEADER='X-Uturn-Next')
+        request = self.request('get', '/header', {'next': '/param'})
+        self.assertEqual('/header', get_redirect_url(request))
+        request = self.request('post', '', {'next': '/param'})
+        self.assertEqual('/param', get_redirect_url(request))
+
+    def test_body_not_parsed(self):
+        self.use_settings(UTURN_REDIRECT_HEADER='X-Uturn-Next')
+        request = self.request('post', '/header', {'next': '/param'})
+        self.assertEqual('/header', get_redirect_url(request))
+        self.assertFalse(hasattr(request, '_post'))
+
+    def test_validated(self):
+        self.use_settings(UTURN_REDIRECT_HEADER='X-Uturn-Next')
+        request = self.request('put', 'http://google.com')
+        self.assertTrue(get_redirect_url(request) is None)
+        request = self.request('put', 'google.com')
+        self.assertTrue(get_redirect_url(request) is None)
+        self.use_settings(UTURN_ALLOWED_HOSTS=['google.com'])
+        request = self.request('put', 'http://google.com')
+        self.assertEqual('http://google.com', get_redirect_url(request))
+
+
+class RedirectTestCase(SettingsTestCase):
 
     def redirect(self, request, to):
         response = smart_redirect(request, to)
@@ -104,7 +297,7 @@ class RedirectTestCase(TestCase):
         self.assertEqual('/default', self.redirect(request, '/default'))
 
     def normal_param_change(self, method=GET):
-        setattr(settings, 'UTURN_REDIRECT_PARAM', 'uturn')
+        self.use_settings(UTURN_REDIRECT_PARAM='uturn')
         self.normal(method)
 
     def override(self, param='next', method=GET):
@@ -112,7 +305,7 @@ class RedirectTestCase(TestCase):
         self.assertEqual('/other', self.redirect(request, '/default'))
 
     def override_param_change(self, method=GET):
-        setattr(settings, 'UTURN_REDIRECT_PARAM', 'uturn')
+        self.use_settings(UTURN_REDIRECT_PARAM='uturn')
         self.override('uturn', method)
 
     def relative_only(self, param='next', method=GET):
@@ -122,12 +315,12 @@ class RedirectTestCase(TestCase):
         self.assertEqual('/default', self.redirect(request, '/default'))
 
     def relative_only_param_changed(self, method=GET):
-        setattr(settings, 'UTURN_REDIRECT_PARAM', 'uturn')
+        self.use_settings(UTURN_REDIRECT_PARAM='uturn')
         self.relative_only('uturn', method)
 
     def whitelisted_domain(self, method=GET):
         domains = ['google.com', 'twitter.com']
-        setattr(settings, 'UTURN_ALLOWED_HOSTS', domains)
+        self.use_settings(UTURN_ALLOWED_HOSTS=domains)
         for domain in domains:
             request = method({'next': 'http://' + domain})
             self.assertEqual('http://' + domain, get_redirect_url(request))
@@ -236,3 +429,471 @@ class SmartHttpResponseRedirectTest(RedirectTestCase):
 
     def test_whitelisted_domain_post(self):
         self.whitelisted_domain(method=POST)
+
+
+class ClientRedirectTest(SettingsTestCase):
+
+    def setUp(self):
+        super(ClientRedirectTest, self).setUp()
+        self.use_settings(UTURN_CLIENT_REDIRECTS=True)
+
+    def respond(self, data=None, **headers):
+        request = RequestFactory().post('/path', data or {}, **headers)
+        response = HttpResponseRedirect('/to-here')
+        response.set_cookie('kept', 'yes')
+        return smart_response(request, response)
+
+    def test_disabled(self):
+        self.use_settings(UTURN_CLIENT_REDIRECTS=False)
+        response = self.respond({'next': '/no-here'}, HTTP_HX_REQUEST='true')
+        self.assertEqual(302, response.status_code)
+        self.assertEqual('/no-here', response['Location'])
+        self.assertFalse(response.has_header('HX-Location'))
+
+    def test_regular_request(self):
+        response = self.respond({'next': '/no-here'})
+        self.assertEqual(302, response.status_code)
+        self.assertEqual('/no-here', response['Location'])
+
+    def test_htmx(self):
+        response = self.respond({'next': '/no-here'}, HTTP_HX_REQUEST='true')
+        self.assertEqual(200, response.status_code)
+        self.assertFalse(response.has_header('Location'))
+        self.assertEqual('/no-here', response['HX-Location'])
+        self.assertEqual('yes', response.cookies['kept'].value)
+
+    def test_htmx_without_next(self):
+        response = self.respond(HTTP_HX_REQUEST='true')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('/to-here', response['HX-Location'])
+
+    def test_htmx_redirect_header(self):
+        self.use_settings(UTURN_HTMX_REDIRECT_HEADER='HX-Redirect')
+        response = self.respond({'next': '/no-here'}, HTTP_HX_REQUEST='true')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('/no-here', response['HX-Redirect'])
+        self.assertFalse(response.has_header('HX-Location'))
+
+    def test_json(self):
+        response = self.respond({'next': '/no-here'}, HTTP_X_UTURN_CLIENT='1')
+        self.assertEqual(200, response.status_code)
+        self.assertFalse(response.has_header('Location'))
+        self.assertEqual('application/json', response['Content-Type'])
+        self.assertEqual({'location': '/no-here'},
+                         json.loads(response.content.decode('utf-8')))
+        self.assertEqual('yes', response.cookies['kept'].value)
+
+    def test_json_header_changed(self):
+        self.use_settings(UTURN_CLIENT_HEADER='X-Requested-With')
+        response = self.respond({'next': '/no-here'}, HTTP_X_UTURN_CLIENT='1')
+        self.assertEqual(302, response.status_code)
+        response = self.respond({'next': '/no-here'},
+                                HTTP_X_REQUESTED_WITH='fetch')
+        self.assertEqual(200, response.status_code)
+
+    def test_not_a_redirect(self):
+        request = RequestFactory().get('/path', HTTP_HX_REQUEST='true')
+        response = smart_response(request, HttpResponse(b'hi'))
+        self.assertEqual(b'hi', response.content)
+        self.assertFalse(response.has_header('HX-Location'))
+
+
+class RedirectStatusTest(SettingsTestCase):
+
+    def respond(self, status, request=None, **kwargs):
+        request = request or GET({'next': '/no-here'})
+        response = HttpResponseRedirect('/to-here')
+        response.status_code = status
+        return smart_response(request, response, **kwargs)
+
+    def test_default_statuses(self):
+        self.assertEqual(frozenset([302]), get_config().rewrite_statuses)
+        self.assertEqual('/no-here', self.respond(302)['Location'])
+        for status in (301, 303, 307, 308):
+            self.assertEqual('/to-here', self.respond(status)['Location'])
+
+    def test_setting(self):
+        self.use_settings(UTURN_REWRITE_STATUSES=[302, 303, 307])
+        self.assertEqual(frozenset([302, 303, 307]),
+                         get_config().rewrite_statuses)
+        for status in (302, 303, 307):
+            response = self.respond(status)
+            self.assertEqual('/no-here', response['Location'])
+            self.assertEqual(status, response.status_code)
+        self.assertEqual('/to-here', self.respond(301)['Location'])
+
+    def test_statuses_argument(self):
+        response = self.respond(307, statuses=frozenset([307]))
+        self.assertEqual('/no-here', response['Location'])
+        response = self.respond(302, statuses=frozenset([307]))
+        self.assertEqual('/to-here', response['Location'])
+
+    def test_see_other_after_post(self):
+        self.use_settings(UTURN_SEE_OTHER_AFTER_POST=True)
+        response = self.respond(302, POST({'next': '/no-here'}))
+        self.assertEqual(303, response.status_code)
+        self.assertEqual('/no-here', response['Location'])
+
+    def test_see_other_only_after_post(self):
+        self.use_settings(UTURN_SEE_OTHER_AFTER_POST=True)
+        self.assertEqual(302, self.respond(302).status_code)
+
+    def test_see_other_only_when_rewritten(self):
+        self.use_settings(UTURN_SEE_OTHER_AFTER_POST=True)
+        response = self.respond(302, POST())
+        self.assertEqual(302, response.status_code)
+        self.assertEqual('/to-here', response['Location'])
+
+    def test_see_other_disabled(self):
+        response = self.respond(302, POST({'next': '/no-here'}))
+        self.assertEqual(302, response.status_code)
+
+    def test_see_other_argument(self):
+        self.use_settings(UTURN_SEE_OTHER_AFTER_POST=True)
+        response = self.respond(302, POST({'next': '/no-here'}),
+                                see_other=False)
+        self.assertEqual(302, response.status_code)
+        self.use_settings(UTURN_SEE_OTHER_AFTER_POST=False)
+        response = self.respond(302, POST({'next': '/no-here'}),
+                                see_other=True)
+        self.assertEqual(303, response.status_code)
+
+
+class ReturnStackTest(SettingsTestCase):
+
+    def setUp(self):
+        super(ReturnStackTest, self).setUp()
+        self.use_settings(UTURN_RETURN_STACK=True)
+
+    def request(self, path='/tickets/', **data):
+        return RequestFactory().get(path, data)
+
+    def pushed(self, request):
+        return QueryDict(uturn_fragment(request))['next']
+
+    def test_push(self):
+        request = self.request(status='open', next='/projects/')
+        self.assertEqual('/tickets/?status=open /projects/',
+                         self.pushed(request))
+
+    def test_push_empty(self):
+        self.assertEqual('/tickets/', self.pushed(self.request()))
+
+    def test_pop(self):
+        request = self.request(next='/tickets/?status=open /projects/ /')
+        self.assertEqual('/tickets/?status=open&next=%2Fprojects%2F+%2F',
+                         get_redirect_url(request))
+
+    def test_pop_last(self):
+        self.assertEqual('/projects/',
+                         get_redirect_url(self.request(next='/projects/')))
+
+    def test_navigation(self):
+        # Each page links to the next one, passing itself along
+        request = self.request('/0/')
+        for page in range(1, 4):
+            request = RequestFactory().get(
+                '/%d/' % page, QueryDict(uturn_fragment(request)))
+        # Then each page redirects back
+        for page in (2, 1, 0):
+            next = get_redirect_url(request)
+            path, sep, query = next.partition('?')
+            self.assertEqual('/%d/' % page, path)
+            request = RequestFactory().get(path, QueryDict(query))
+        self.assertEqual(None, get_redirect_url(request))
+
+    def test_no_nested_encoding(self):
+        request = self.request('/0/')
+        for page in range(1, 20):
+            request = RequestFactory().get(
+                '/%d/' % page, QueryDict(uturn_fragment(request)))
+            self.assertFalse('%25' in uturn_fragment(request))
+
+    def test_depth(self):
+        self.use_settings(UTURN_RETURN_STACK_DEPTH=3)
+        request = self.request(next='/a/ /b/ /c/ /d/')
+        self.assertEqual('/tickets/ /a/ /b/', self.pushed(request))
+
+    def test_bytes(self):
+        self.use_settings(UTURN_RETURN_STACK_BYTES=15)
+        request = self.request(next='/a/ /b/ /c/ /d/')
+        self.assertEqual('/tickets/ /a/', self.pushed(request))
+        self.use_settings(UTURN_RETURN_STACK_BYTES=5)
+        self.assertEqual('/tickets/', self.pushed(self.request(next='/a/')))
+
+    def test_invalid_top(self):
+        request = self.request(next='//evil.com/ /projects/')
+        self.assertEqual(None, get_redirect_url(request))
+        self.assertEqual('/tickets/', self.pushed(request))
+
+    def test_invalid_entry_checked_on_top(self):
+        request = self.request(next='/projects/ //evil.com/')
+        next = get_redirect_url(request)
+        self.assertEqual('/projects/?next=%2F%2Fevil.com%2F', next)
+        path, sep, query = next.partition('?')
+        request = RequestFactory().get(path, QueryDict(query))
+        self.assertEqual(None, get_redirect_url(request))
+
+    def test_signed(self):
+        self.use_settings(UTURN_SIGNED=True, UTURN_REQUIRE_SIGNATURE=True)
+        request = self.request(status='open')
+        request = RequestFactory().get('/projects/',
+                                       QueryDict(uturn_fragment(request)))
+        request = RequestFactory().get('/tickets/new/',
+                                       QueryDict(uturn_fragment(request)))
+        path, sep, query = get_redirect_url(request).partition('?')
+        self.assertEqual('/projects/', path)
+        request = RequestFactory().get(path, QueryDict(query))
+        self.assertEqual('/tickets/?status=open', get_redirect_url(request))
+
+    def test_disabled(self):
+        self.use_settings(UTURN_RETURN_STACK=False)
+        request = self.request(status='open', next='/projects/')
+        self.assertEqual('/tickets/', self.pushed(request))
+        request = self.request(next='/projects/ /')
+        self.assertEqual('/projects/ /', get_redirect_url(request))
+
+
+class CanonicalRedirectTest(SettingsTestCase):
+
+    def setUp(self):
+        super(CanonicalRedirectTest, self).setUp()
+        self.use_settings(UTURN_CANONICALIZE=True)
+
+    def test_disabled(self):
+        self.use_settings(UTURN_CANONICALIZE=False)
+        self.assertTrue(get_config().canonicalize is None)
+        request = GET({'next': '/tickets/?utm_source=x&b=1&a=#top'})
+        self.assertEqual('/tickets/?utm_source=x&b=1&a=#top',
+                         get_redirect_url(request))
+
+    def test_redirect_url(self):
+        for next in ('/tickets/?b=1&a=2', '/tickets/?a=2&b=1&utm_source=x',
+                     '/tickets/?c=&a=2&b=1#top'):
+            self.assertEqual('/tickets/?a=2&b=1',
+                             get_redirect_url(GET({'next': next})))
+
+    def test_settings(self):
+        self.use_settings(UTURN_CANONICAL_KEEP_PARAMS=['a'],
+                          UTURN_CANONICAL_DROP_PARAMS=None)
+        request = GET({'next': '/tickets/?utm_source=x&b=1&a=2'})
+        self.assertEqual('/tickets/?a=2', get_redirect_url(request))
+
+    def test_signed(self):
+        self.use_settings(UTURN_SIGNED=True)
+        request = GET({'next': http.encode_redirect_url('/a/?b=1&a=2')})
+        self.assertEqual('/a/?a=2&b=1', get_redirect_url(request))
+
+    def test_rejected(self):
+        request = GET({'next': '//evil.com/?b=1'})
+        self.assertEqual(None, get_redirect_url(request))
+
+    def test_return_stack(self):
+        self.use_settings(UTURN_RETURN_STACK=True)
+        request = RequestFactory().get('/tickets/', {
+            'utm_source': 'x', 'status': 'open', 'q': '',
+            'next': '/tickets/?status=open&utm_source=y /projects/?b=1&a=2'})
+        self.assertEqual('next=%2Ftickets%2F%3Fstatus%3Dopen+'
+                         '%2Fprojects%2F%3Fa%3D2%26b%3D1',
+                         uturn_fragment(request))
+
+
+class ResolveTargetsTest(SettingsTestCase):
+
+    def setUp(self):
+        super(ResolveTargetsTest, self).setUp()
+        self.use_settings(UTURN_RESOLVE_TARGETS=True)
+        self.rejected = []
+        signals.redirect_rejected.connect(self.receiver)
+
+    def tearDown(self):
+        signals.redirect_rejected.disconnect(self.receiver)
+        super(ResolveTargetsTest, self).tearDown()
+
+    def receiver(self, sender, request, value, reason, **kwargs):
+        self.rejected.append((value, reason))
+
+    def next(self, next):
+        return get_redirect_url(GET({'next': next}))
+
+    def test_disabled(self):
+        self.use_settings(UTURN_RESOLVE_TARGETS=False)
+        self.assertEqual('/nowhere/', self.next('/nowhere/'))
+        self.assertTrue(get_config().resolve_cache is None)
+
+    def test_resolvable(self):
+        self.assertEqual('/default/?a=1#b', self.next('/default/?a=1#b'))
+        self.assertEqual('/with-params/h%69/', self.next('/with-params/h%69/'))
+
+    def test_unresolvable(self):
+        self.assertEqual(None, self.next('/nowhere/'))
+        self.assertEqual([('/nowhere/', 'unresolvable')], self.rejected)
+
+    def test_append_slash(self):
+        self.assertEqual('/default', self.next('/default'))
+        self.use_settings(APPEND_SLASH=False)
+        self.assertEqual(None, self.next('/default'))
+
+    def test_absolute(self):
+        self.use_settings(UTURN_ALLOWED_HOSTS=['example.com'])
+        self.assertEqual('http://example.com/nowhere/',
+                         self.next('http://example.com/nowhere/'))
+
+    def test_script_prefix(self):
+        set_script_prefix('/app/')
+        try:
+            self.assertEqual('/app/default/', self.next('/app/default/'))
+            self.assertEqual(None, self.next('/default/'))
+        finally:
+            set_script_prefix('/')
+
+    def test_script_prefix_cached(self):
+        self.assertEqual(None, self.next('/app/default/'))
+        set_script_prefix('/app/')
+        try:
+            self.assertEqual('/app/default/', self.next('/app/default/'))
+        finally:
+            set_script_prefix('/')
+
+    def test_language(self):
+        with translation.override('en'):
+            self.assertEqual(None, self.next('/fr/tickets/add/'))
+        with translation.override('fr'):
+            self.assertEqual('/fr/tickets/add/',
+                             self.next('/fr/tickets/add/'))
+
+    def test_cached(self):
+        cache = get_config().resolve_cache
+        for i in range(3):
+            self.next('/default/?page=%d' % i)
+            self.next('/nowhere/')
+        self.assertEqual((4, 2, 1024, 2), tuple(cache.info()))
+
+    def test_cache_size(self):
+        self.use_settings(UTURN_RESOLVE_CACHE_SIZE=0)
+        self.assertTrue(get_config().resolve_cache is None)
+        self.assertEqual(None, self.next('/nowhere/'))
+        self.assertEqual('/default/', self.next('/default/'))
+
+    def test_cleared_with_url_caches(self):
+        cache = get_config().resolve_cache
+        self.next('/default/')
+        self.assertEqual(1, len(cache))
+        clear_url_caches()
+        self.next('/other/')
+        self.assertEqual((0, 1, 1024, 1), tuple(cache.info()))
+
+
+class LoopDetectionTest(SettingsTestCase):
+
+    def setUp(self):
+        super(LoopDetectionTest, self).setUp()
+        self.rejected = []
+        signals.redirect_rejected.connect(self.receiver)
+
+    def tearDown(self):
+        signals.redirect_rejected.disconnect(self.receiver)
+        super(LoopDetectionTest, self).tearDown()
+
+    def receiver(self, sender, request, value, reason, **kwargs):
+        self.rejected.append((value, reason))
+
+    def location(self, request):
+        response = smart_response(request, HttpResponseRedirect('/to-here'))
+        return response['Location']
+
+    def test_self_target(self):
+        self.assertEqual('/to-here', self.location(GET({'next': '/path'})))
+        self.assertEqual([('/path', 'loop')], self.rejected)
+
+    def test_self_target_normalized(self):
+        request = RequestFactory().get('/path?b=2&a=1+2&c=&next=%2Fpa%74h%3F'
+                                       'a%3D1%25202%26b%3D2%23top')
+        self.assertEqual('/to-here', self.location(request))
+        request = RequestFactory().get(
+            'http://testserver/path?next=http%3A%2F%2Ftestserver%2Fpath')
+        self.assertEqual('/to-here', self.location(request))
+
+    def test_other_target(self):
+        request = RequestFactory().get('/path', {'a': 1,
+                                                 'next': '/path?a=2'})
+        self.assertEqual('/path?a=2', self.location(request))
+        self.assertEqual([], self.rejected)
+
+    def test_post_to_self(self):
+        self.assertEqual('/path', self.location(POST({'next': '/path'})))
+
+    def test_smart_redirect(self):
+        response = smart_redirect(GET({'next': '/path'}), '/to-here')
+        self.assertEqual('/to-here', response['Location'])
+        response = SmartHttpResponseRedirect(GET({'next': '/path'}),
+                                             '/to-here')
+        self.assertEqual('/to-here', response['Location'])
+
+    def test_get_redirect_target(self):
+        self.assertEqual(None, get_redirect_target(GET({'next': '/path'})))
+        self.assertEqual('/no-here',
+                         get_redirect_target(GET({'next': '/no-here'})))
+        self.assertEqual(None, get_redirect_target(GET()))
+        self.assertEqual([('/path', 'loop')], self.rejected)
+
+    def test_hops(self):
+        self.use_settings(UTURN_MAX_HOPS=2)
+        request = GET({'next': '/no-here'})
+        self.assertEqual('/no-here?uturn_hops=1', self.location(request))
+        request = GET({'next': '/no-here?a=1', 'uturn_hops': '1'})
+        self.assertEqual('/no-here?a=1&uturn_hops=2', self.location(request))
+        request = GET({'next': '/no-here', 'uturn_hops': '2'})
+        self.assertEqual('/to-here', self.location(request))
+        self.assertEqual([('/no-here', 'loop')], self.rejected)
+
+    def test_hop_param(self):
+        self.use_settings(UTURN_MAX_HOPS=1, UTURN_HOP_PARAM='h')
+        self.assertEqual('/no-here?h=1',
+                         self.location(GET({'next': '/no-here', 'h': 'x'})))
+        self.assertEqual('/to-here',
+                         self.location(GET({'next': '/no-here', 'h': '1'})))
+
+    def test_hops_ignored_for_self_target(self):
+        self.use_settings(UTURN_MAX_HOPS=3)
+        request = GET({'next': '/path?uturn_hops=1', 'uturn_hops': 2})
+        self.assertEqual('/to-here', self.location(request))
+
+
+class UturnUrlsTest(SettingsTestCase):
+
+    def test_fragment(self):
+        request = GET({'next': '/other'})
+        self.assertEqual('next=%2Fpath', uturn_fragment(request))
+
+    def test_fragment_param_changed(self):
+        self.use_settings(UTURN_REDIRECT_PARAM='uturn')
+        self.assertEqual('uturn=%2Fpath', uturn_fragment(GET()))
+
+    def test_fragment_encoded_once(self):
+        request = GET()
+        fragment = uturn_fragment(request)
+        self.assertTrue(fragment is uturn_fragment(request))
+
+    def test_add_uturn_param(self):
+        request = GET()
+        self.assertEqual('/a/?next=%2Fpath', add_uturn_param('/a/', request))
+        self.assertEqual('/a/?b=c&next=%2Fpath',
+                         add_uturn_param('/a/?b=c', request))
+
+    def test_build_uturn_urls(self):
+        urls = build_uturn_urls(GET(), [
+            ('default_view', None, None),
+            ('with_params', ['hi'], None),
+            ('with_params', None, {'name': 'ho'}),
+        ])
+        self.assertEqual(['/default/?next=%2Fpath',
+                          '/with-params/hi/?next=%2Fpath',
+                          '/with-params/ho/?next=%2Fpath'], urls)
+
+    def test_build_uturn_urls_cached(self):
+        self.use_settings(UTURN_REVERSE_CACHE_SIZE=10)
+        targets = [('with_params', [name], None) for name in 'abab']
+        urls = build_uturn_urls(GET(), targets)
+        self.assertEqual('/with-params/b/?next=%2Fpath', urls[3])
+        self.assertEqual(2, reverse_cache_info().hits)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import unittest
+from unittest import TestCase
+try:
+    import jinja2
+except ImportError:
+    jinja2 = None
+from django.urls import clear_url_caches
+from django.utils import translation
+
+from .http import GET
+from .tags import MatrixTests, literal, tag_source
+
+from ..templatetags import uturn as tags
+
+
+def environment():
+    return jinja2.Environment(autoescape=True,
+                              extensions=['uturn.jinja2.UturnExtension'])
+
+
+@unittest.skipIf(jinja2 is None, 'requires Jinja2')
+class JinjaTagMatrixTest(MatrixTests, TestCase):
+
+    def setUp(self):
+        super(JinjaTagMatrixTest, self).setUp()
+        self.env = environment()
+
+    def render(self, tag, args, kwargs, request):
+        t = self.env.from_string(tag_source(tag, args, kwargs, ', '))
+        return t.render() if request is None else t.render(request=request)
+
+
+@unittest.skipIf(jinja2 is None, 'requires Jinja2')
+class JinjaGlobalMatrixTest(JinjaTagMatrixTest):
+
+    def render(self, tag, args, kwargs, request):
+        bits = [literal(arg) for arg in args]
+        bits += ['%s=%s' % (k, literal(v)) for k, v in kwargs.items()]
+        t = self.env.from_string('{{ %s(%s) }}' % (tag, ', '.join(bits)))
+        return t.render() if request is None else t.render(request=request)
+
+
+@unittest.skipIf(jinja2 is None, 'requires Jinja2')
+class JinjaFoldedUrlTest(TestCase):
+
+    def setUp(self):
+        super(JinjaFoldedUrlTest, self).setUp()
+        self.env = environment()
+        self.reversed = []
+        self.reverse = tags.reverse
+
+        def reverse(*args, **kwargs):
+            self.reversed.append(args)
+            return self.reverse(*args, **kwargs)
+        tags.reverse = reverse
+
+    def tearDown(self):
+        tags.reverse = self.reverse
+        super(JinjaFoldedUrlTest, self).tearDown()
+
+    def test_reversed_once(self):
+        t = self.env.from_string("{% uturn 'with_params', 'hi' %}|"
+                                 "{% defaulturl 'with_params', name='hi' %}")
+        u = self.env.from_string("{% uturn 'with_params', 'hi' %}")
+        for i in range(3):
+            self.assertEqual('/with-params/hi/?next=%2Fpath|/with-params/hi/',
+                             t.render(request=GET()))
+            self.assertEqual('/with-params/hi/?next=%2Fpath',
+                             u.render(request=GET()))
+        self.assertEqual(2, len(self.reversed))
+
+    def test_language(self):
+        t = self.env.from_string("{% uturn 'ticket-add' %}")
+        for language in ('en', 'fr', 'en'):
+            with translation.override(language):
+                self.assertEqual('/%s/tickets/add/?next=%%2Fpath' % language,
+                                 t.render(request=GET()))
+        self.assertEqual(2, len(self.reversed))
+
+    def test_types(self):
+        for source, expected in (("{% uturn 'text', 1 %}", '/text/1/'),
+                                 ("{% uturn 'text', True %}", '/text/True/'),
+                                 ("{% uturn 'text', 1.0 %}", '/text/1.0/')):
+            t = self.env.from_string(source)
+            self.assertEqual(expected, t.render())
+        self.assertEqual(3, len(self.reversed))
+
+    def test_variables_not_folded(self):
+        t = self.env.from_string("{% uturn 'with_params', name %}")
+        self.assertEqual('/with-params/ho/?next=%2Fpath',
+                         t.render(request=GET(), name='ho'))
+        self.assertEqual('/with-params/hi/?next=%2Fpath',
+                         t.render(request=GET(), name='hi'))
+        self.assertEqual(0, len(self.reversed))
+
+    def test_cleared_with_url_caches(self):
+        t = self.env.from_string("{% uturn 'with_params', 'hi' %}")
+        t.render(request=GET())
+        clear_url_caches()
+        t.render(request=GET())
+        self.assertEqual(2, len(self.reversed))
+
+    def test_escaped(self):
+        t = self.env.from_string("{% defaulturl 'with_params', 'hi' %}")
+        self.assertEqual('/a/?b=1&amp;c=%3C2%3E',
+                         t.render(request=GET({'next': '/a/?b=1&c=%3C2%3E'})))
+
+
+@unittest.skipIf(jinja2 is None, 'requires Jinja2')
+class JinjaBackendTest(TestCase):
+
+    def test_request(self):
+        from django.template.backends.jinja2 import Jinja2
+        engine = Jinja2({
+            'NAME': 'jinja2', 'DIRS': [], 'APP_DIRS': False,
+            'OPTIONS': {'extensions': ['uturn.jinja2.UturnExtension']},
+        })
+        t = engine.from_string(
+            "<a href='{% uturn 'with_params', name %}'>"
+            "<a href='{{ defaulturl('with_params', 'hi') }}'>"
+            "{% uturn_param %}")
+        html = t.render({'name': 'ho'}, GET({'next': '/okay-then'}))
+        self.assertEqual("<a href='/with-params/ho/?next=%2Fpath'>"
+                         "<a href='/okay-then'>"
+                         "<div style='display:none'><input type='hidden' "
+                         "name='next' value='/okay-then'></div>", html)
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import threading
+from unittest import TestCase
+from django.http import Http404, HttpResponseRedirect
+
+from .http import GET, SettingsTestCase
+
+from ..conf import get_config
+from ..http import get_redirect_url, smart_response
+from ..metrics import BUCKETS, Collector, render_prometheus
+from ..middleware import UturnMiddleware
+from ..signals import redirect_kept, redirect_overridden, redirect_rejected
+from ..views import metrics
+
+
+class CollectorTest(TestCase):
+
+    def test_counters(self):
+        collector = Collector()
+        collector.increment('uturn_rejected_total', 'host')
+        collector.increment('uturn_rejected_total', 'host')
+        collector.increment('uturn_rejected_total', 'path')
+        self.assertEqual({('uturn_rejected_total', 'host'): 2,
+                          ('uturn_rejected_total', 'path'): 1},
+                         collector.counters())
+
+    def test_threads(self):
+        collector = Collector()
+
+        def record():
+            for i in range(1000):
+                collector.increment('uturn_redirects_total', 'kept')
+                collector.observe('uturn_lookup_seconds', 0.001)
+        threads = [threading.Thread(target=record) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(4000, collector.counters()[
+            ('uturn_redirects_total', 'kept')])
+        self.assertEqual(4000, collector.histograms()[
+            'uturn_lookup_seconds'][-1])
+
+    def test_finished_threads_folded(self):
+        collector = Collector()
+
+        def record():
+            collector.increment('uturn_redirects_total', 'kept')
+            collector.observe('uturn_lookup_seconds', 0.001)
+        for i in range(10):
+            thread = threading.Thread(target=record)
+            thread.start()
+            thread.join()
+        # Folded when shards are added or the metrics are read
+        self.assertEqual(1, len(collector._shards))
+        self.assertEqual(10, collector.counters()[
+            ('uturn_redirects_total', 'kept')])
+        self.assertEqual(0, len(collector._shards))
+        record()
+        self.assertEqual(11, collector.counters()[
+            ('uturn_redirects_total', 'kept')])
+        self.assertEqual(11, collector.histograms()[
+            'uturn_lookup_seconds'][-1])
+
+    def test_histograms(self):
+        collector = Collector(buckets=(0.1, 1))
+        collector.observe('uturn_lookup_seconds', 0.05)
+        collector.observe('uturn_lookup_seconds', 0.5)
+        collector.observe('uturn_lookup_seconds', 5)
+        self.assertEqual([1, 2, 5.55, 3],
+                         collector.histograms()['uturn_lookup_seconds'])
+
+    def test_reset(self):
+        collector = Collector()
+        collector.increment('uturn_redirects_total', 'kept')
+        collector.reset()
+        self.assertEqual({}, collector.counters())
+        collector.increment('uturn_redirects_total', 'kept')
+        self.assertEqual(1, len(collector.counters()))
+
+    def test_render_prometheus(self):
+        collector = Collector(buckets=(0.1, 1))
+        collector.increment('uturn_rejected_total', 'host')
+        collector.observe('uturn_lookup_seconds', 0.5)
+        text = render_prometheus(collector)
+        self.assertTrue('# TYPE uturn_rejected_total counter\n' in text)
+        self.assertTrue('uturn_rejected_total{reason="host"} 1\n' in text)
+        self.assertTrue('# TYPE uturn_lookup_seconds histogram\n' in text)
+        self.assertTrue('uturn_lookup_seconds_bucket{le="0.1"} 0\n' in text)
+        self.assertTrue('uturn_lookup_seconds_bucket{le="1"} 1\n' in text)
+        self.assertTrue('uturn_lookup_seconds_bucket{le="+Inf"} 1\n' in text)
+        self.assertTrue('uturn_lookup_seconds_sum 0.5\n' in text)
+        self.assertTrue('uturn_lookup_seconds_count 1\n' in text)
+
+
+class MetricsTest(SettingsTestCase):
+
+    def setUp(self):
+        super(MetricsTest, self).setUp()
+        self.use_settings(UTURN_METRICS=True)
+        self.collector = get_config().metrics
+        self.collector.reset()
+
+    def counter(self, name, label):
+        return self.collector.counters().get((name, label), 0)
+
+    def test_disabled(self):
+        self.use_settings(UTURN_METRICS=False)
+        self.assertTrue(get_config().metrics is None)
+        self.assertRaises(Http404, metrics, GET())
+
+    def test_kept_across_setting_changes(self):
+        self.use_settings(UTURN_REDIRECT_PARAM='uturn')
+        self.assertTrue(self.collector is get_config().metrics)
+
+    def test_rejected(self):
+        get_redirect_url(GET({'next': 'http://google.com'}))
+        get_redirect_url(GET({'next': 'google.com'}))
+        get_redirect_url(GET({'next': '/ok'}))
+        self.assertEqual(1, self.counter('uturn_rejected_total', 'host'))
+        self.assertEqual(1, self.counter('uturn_rejected_total', 'path'))
+        lookups = self.collector.histograms()['uturn_lookup_seconds']
+        self.assertEqual(3, lookups[-1])
+
+    def test_decisions(self):
+        smart_response(GET({'next': '/ok'}), HttpResponseRedirect('/to-here'))
+        smart_response(GET(), HttpResponseRedirect('/to-here'))
+        smart_response(GET(), HttpResponseRedirect('/to-here'))
+        self.assertEqual(1, self.counter('uturn_redirects_total',
+                                         'overridden'))
+        self.assertEqual(2, self.counter('uturn_redirects_total', 'kept'))
+
+    def test_middleware(self):
+        middleware = UturnMiddleware()
+        middleware.process_response(GET(), HttpResponseRedirect('/to-here'))
+        responses = self.collector.histograms()['uturn_response_seconds']
+        self.assertEqual(1, responses[-1])
+        self.assertEqual(len(BUCKETS) + 2, len(responses))
+
+    def test_view(self):
+        get_redirect_url(GET({'next': 'http://google.com'}))
+        response = metrics(GET())
+        self.assertEqual('text/plain; version=0.0.4; charset=utf-8',
+                         response['Content-Type'])
+        self.assertTrue(b'uturn_rejected_total{reason="host"} 1\n' in
+                        response.content)
+
+
+class SignalsTest(TestCase):
+
+    def setUp(self):
+        super(SignalsTest, self).setUp()
+        self.received = []
+
+    def receiver(self, signal, **kwargs):
+        self.received.append((signal, kwargs))
+
+    def connect(self, signal):
+        signal.connect(self.receiver)
+        self.addCleanup(signal.disconnect, self.receiver)
+
+    def test_rejected(self):
+        self.connect(redirect_rejected)
+        request = GET({'next': 'http://google.com'})
+        get_redirect_url(request)
+        self.assertEqual(1, len(self.received))
+        kwargs = self.received[0][1]
+        self.assertTrue(kwargs['request'] is request)
+        self.assertEqual('http://google.com', kwargs['value'])
+        self.assertEqual('host', kwargs['reason'])
+
+    def test_overridden(self):
+        self.connect(redirect_overridden)
+        self.connect(redirect_kept)
+        response = smart_response(GET({'next': '/ok'}),
+                                  HttpResponseRedirect('/to-here'))
+        self.assertEqual(1, len(self.received))
+        signal, kwargs = self.received[0]
+        self.assertTrue(signal is redirect_overridden)
+        self.assertTrue(kwargs['response'] is response)
+        self.assertEqual('/ok', kwargs['location'])
+
+    def test_kept(self):
+        self.connect(redirect_overridden)
+        self.connect(redirect_kept)
+        smart_response(GET(), HttpResponseRedirect('/to-here'))
+        self.assertEqual(1, len(self.received))
+        self.assertTrue(self.received[0][0] is redirect_kept)
@@ -1,12 +1,20 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 from unittest import TestCase
-from django.http import HttpResponse, HttpResponseRedirect, \
-                        HttpResponsePermanentRedirect
+import tempfile
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect, \
+                        HttpResponsePermanentRedirect, StreamingHttpResponse
+from django.test.client import Client
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
 
-from .http import GET
+from .http import GET, SettingsTestCase
+from . import urls
 
-from ..middleware import UturnMiddleware
+from ..compat import iscoroutinefunction
+from ..middleware import BaseMiddleware, UturnMiddleware
 
 
 def optional_redirect(request, redirect=None):
@@ -42,3 +50,148 @@ class UturnMiddlewareTest(TestCase):
     def test_redirect_no_uturn_when_permanent(self):
         response = self.request(GET({'next': '/no-here'}), '/permanent')
         self.assertEqual('/permanent', response.get('Location', None))
+
+    def test_call(self):
+        middleware = UturnMiddleware(
+            lambda request: HttpResponseRedirect('/to-here'))
+        self.assertFalse(iscoroutinefunction(middleware))
+        response = middleware(GET({'next': '/no-here'}))
+        self.assertEqual('/no-here', response.get('Location', None))
+
+    def test_excluded_path(self):
+        request = RequestFactory().get('/static/x.css', {'next': '/no-here'})
+        with override_settings(UTURN_EXCLUDE_PATHS=['/static/']):
+            response = self.request(request, '/to-here')
+        self.assertEqual('/to-here', response.get('Location', None))
+        self.assertFalse(hasattr(request, '_uturn_redirect_url'))
+
+    def test_included_path(self):
+        request = RequestFactory().get('/edit/', {'next': '/no-here'})
+        with override_settings(UTURN_INCLUDE_PATHS=['/edit/']):
+            response = self.request(request, '/to-here')
+        self.assertEqual('/no-here', response.get('Location', None))
+
+    def test_client_redirect(self):
+        request = RequestFactory().get('/path', {'next': '/no-here'},
+                                       HTTP_HX_REQUEST='true')
+        with override_settings(UTURN_CLIENT_REDIRECTS=True):
+            response = self.request(request, '/to-here')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('/no-here', response['HX-Location'])
+
+
+class StreamingResponseTest(SettingsTestCase):
+
+    def setUp(self):
+        super(StreamingResponseTest, self).setUp()
+        self.consumed = []
+
+    def body(self):
+        self.consumed.append(True)
+        yield b'streamed'
+
+    def process(self, response, data=None):
+        request = GET(data or {'next': '/no-here'})
+        response = UturnMiddleware().process_response(request, response)
+        self.assertFalse(hasattr(request, '_uturn_redirect_url'))
+        return response
+
+    def test_streaming(self):
+        response = self.process(StreamingHttpResponse(self.body()))
+        self.assertEqual([], self.consumed)
+        self.assertEqual([b'streamed'], list(response.streaming_content))
+
+    def test_streaming_redirect(self):
+        response = StreamingHttpResponse(self.body(), status=302)
+        response['Location'] = '/to-here'
+        response = self.process(response)
+        self.assertEqual('/to-here', response['Location'])
+        self.assertEqual([], self.consumed)
+
+    def test_file(self):
+        f = tempfile.TemporaryFile()
+        self.addCleanup(f.close)
+        f.write(b'file contents')
+        f.seek(0)
+        self.process(FileResponse(f))
+        self.assertEqual(0, f.tell())
+        self.assertFalse(f.closed)
+
+    def test_installed_globally(self):
+        self.use_settings(MIDDLEWARE=['uturn.middleware.UturnMiddleware'])
+        del urls.streamed[:]
+        response = Client().get('/streaming/', {'next': '/no-here'})
+        self.assertTrue(response.streaming)
+        self.assertEqual([], urls.streamed)
+        self.assertEqual(b'streamed', b''.join(response.streaming_content))
+        self.assertEqual([True], urls.streamed)
+
+
+class AsyncUturnMiddlewareTest(SettingsTestCase):
+
+    def setUp(self):
+        super(AsyncUturnMiddlewareTest, self).setUp()
+        self.use_settings(MIDDLEWARE=['uturn.middleware.UturnMiddleware'])
+
+    def get(self, path, data=None):
+        return async_to_sync(AsyncClient().get)(path, data or {})
+
+    def test_async(self):
+        async def get_response(request):
+            return HttpResponseRedirect('/to-here')
+        middleware = UturnMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = async_to_sync(middleware)(GET({'next': '/no-here'}))
+        self.assertEqual('/no-here', response.get('Location', None))
+
+    def test_normal_response(self):
+        response = self.get('/async/')
+        self.assertEqual(b'hi', response.content)
+
+    def test_redirect_no_uturn(self):
+        response = self.get('/async-redirect/')
+        self.assertEqual('/to-here', response.get('Location', None))
+
+    def test_redirect_uturn(self):
+        response = self.get('/async-redirect/', {'next': '/no-here'})
+        self.assertEqual('/no-here', response.get('Location', None))
+
+    def test_redirect_uturn_sync_view(self):
+        response = self.get('/redirect/', {'next': '/no-here'})
+        self.assertEqual('/no-here', response.get('Location', None))
+
+
+class ShortCircuitMiddleware(BaseMiddleware):
+
+    def process_request(self, request):
+        if request.GET.get('short'):
+            return HttpResponse(b'short')
+
+    def process_response(self, request, response):
+        response['X-Processed'] = 'yes'
+        return response
+
+
+class BaseMiddlewareTest(TestCase):
+
+    def test_sync(self):
+        middleware = ShortCircuitMiddleware(lambda request: HttpResponse())
+        self.assertFalse(iscoroutinefunction(middleware))
+        response = middleware(GET())
+        self.assertEqual((b'', 'yes'),
+                         (response.content, response['X-Processed']))
+        response = middleware(GET({'short': '1'}))
+        self.assertEqual((b'short', 'yes'),
+                         (response.content, response['X-Processed']))
+
+    def test_async(self):
+        async def get_response(request):
+            return HttpResponse()
+        middleware = ShortCircuitMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = async_to_sync(middleware)(GET())
+        self.assertEqual((b'', 'yes'),
+                         (response.content, response['X-Processed']))
+        response = async_to_sync(middleware)(GET({'short': '1'}))
+        self.assertEqual((b'short', 'yes'),
+                         (response.content, response['X-Processed']))
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.template import Context, RequestContext, Template
+from django.test.client import Client, RequestFactory
+
+from .http import GET, POST, SettingsTestCase
+from . import urls
+
+from ..http import get_redirect_url, strip_param
+from ..middleware import UturnPlaceholderMiddleware
+from ..placeholders import substitute
+
+
+TEMPLATE = Template("{% load uturn %}"
+                    "<a href='{% uturn 'default_view' %}'>edit</a>"
+                    "<a href='{% uturn 'default_view' as edit %}{{ edit }}'>"
+                    "<a href='{% defaulturl 'other_view' %}'>back</a>"
+                    "<form>{% uturn_param %}</form>")
+
+
+class PlaceholderTemplateTagTest(SettingsTestCase):
+
+    def setUp(self):
+        super(PlaceholderTemplateTagTest, self).setUp()
+        self.use_settings(UTURN_PLACEHOLDERS=True)
+
+    def render(self, template, request):
+        return Template('{% load uturn %}' + template).render(
+            RequestContext(request))
+
+    def test_uturn(self):
+        self.assertEqual('/default/?{{uturn:fragment}}',
+                         self.render("{% uturn 'default_view' %}", GET()))
+
+    def test_defaulturl(self):
+        rendered = self.render("{% defaulturl 'other_view' %}",
+                               GET({'next': '/no-here'}))
+        self.assertEqual('{{uturn:default:/other/}}', rendered)
+
+    def test_uturn_param(self):
+        rendered = self.render("{% uturn_param %}", GET({'next': '/no-here'}))
+        self.assertEqual('{{uturn:input}}', rendered)
+
+    def test_no_request(self):
+        template = Template("{% load uturn %}{% uturn 'default_view' %}"
+                            "{% uturn_param %}")
+        self.assertEqual('/default/', template.render(Context()))
+
+    def test_same_output(self):
+        for request in (GET(), GET({'next': '/no-here'}),
+                        POST({'next': '/tickets/?status=open&page=2'}),
+                        GET({'next': '/"><script>x</script>'})):
+            self.use_settings(UTURN_PLACEHOLDERS=False)
+            expected = TEMPLATE.render(RequestContext(request))
+            self.use_settings(UTURN_PLACEHOLDERS=True)
+            rendered = TEMPLATE.render(RequestContext(request))
+            self.assertNotEqual(expected, rendered)
+            content = substitute(request, rendered.encode('utf-8'))
+            self.assertEqual(expected, content.decode('utf-8'))
+
+
+class SubstituteTest(SettingsTestCase):
+
+    def test_nothing_to_substitute(self):
+        content = b'<p>{{ not ours }}</p>'
+        self.assertTrue(substitute(GET(), content) is content)
+
+    def test_fragment(self):
+        self.assertEqual(b'/a/?next=%2Fpath',
+                         substitute(GET(), b'/a/?{{uturn:fragment}}'))
+
+    def test_default(self):
+        content = b'<a href="{{uturn:default:/a/?b=1&amp;c=2}}">'
+        self.assertEqual(b'<a href="/a/?b=1&amp;c=2">',
+                         substitute(GET(), content))
+        self.assertEqual(b'<a href="/no-here">',
+                         substitute(GET({'next': '/no-here'}), content))
+
+    def test_default_escaped(self):
+        content = b'<a href="{{uturn:default:/a/}}">'
+        request = GET({'next': '/"><script>x</script>'})
+        self.assertEqual(
+            b'<a href="/&quot;&gt;&lt;script&gt;x&lt;/script&gt;">',
+            substitute(request, content))
+
+    def test_input(self):
+        self.assertEqual(b'<form></form>',
+                         substitute(GET(), b'<form>{{uturn:input}}</form>'))
+        content = substitute(GET({'next': '/no-here'}),
+                             b'<form>{{uturn:input}}</form>')
+        self.assertTrue(b"value='/no-here'" in content)
+
+    def test_charset(self):
+        content = substitute(GET({'next': '/caf\xe9'}),
+                             '{{uturn:default:/}}'.encode('latin-1'),
+                             'latin-1')
+        self.assertEqual('/caf\xe9'.encode('latin-1'), content)
+
+
+class StripParamTest(SettingsTestCase):
+
+    def test_strip(self):
+        self.assertEqual('a=1&b=2', strip_param('a=1&next=%2Fx&b=2', 'next'))
+        self.assertEqual('', strip_param('next=%2Fx&next=', 'next'))
+        self.assertEqual('nextpage=2', strip_param('nextpage=2', 'next'))
+
+
+class UturnPlaceholderMiddlewareTest(SettingsTestCase):
+
+    def setUp(self):
+        super(UturnPlaceholderMiddlewareTest, self).setUp()
+        self.use_settings(UTURN_PLACEHOLDERS=True)
+
+    def respond(self, request, response):
+        middleware = UturnPlaceholderMiddleware(lambda request: response)
+        return middleware(request)
+
+    def test_strips_next(self):
+        request = RequestFactory().get('/path', {'next': '/no-here', 'a': 1})
+        self.respond(request, HttpResponse())
+        self.assertEqual('a=1', request.META['QUERY_STRING'])
+        self.assertEqual('/path?a=1', request.get_full_path())
+        self.assertEqual('/no-here', get_redirect_url(request))
+
+    def test_keeps_post(self):
+        request = RequestFactory().post('/path?next=%2Fno-here')
+        self.respond(request, HttpResponse())
+        self.assertEqual('next=%2Fno-here', request.META['QUERY_STRING'])
+
+    def test_disabled(self):
+        self.use_settings(UTURN_PLACEHOLDERS=False)
+        request = GET({'next': '/no-here'})
+        response = self.respond(request,
+                                HttpResponse(b'{{uturn:default:/a/}}'))
+        self.assertEqual('next=%2Fno-here', request.META['QUERY_STRING'])
+        self.assertEqual(b'{{uturn:default:/a/}}', response.content)
+
+    def test_substitutes(self):
+        response = HttpResponse(b'{{uturn:default:/a/}}')
+        response['Content-Length'] = '21'
+        response = self.respond(GET({'next': '/no-here'}), response)
+        self.assertEqual(b'/no-here', response.content)
+        self.assertEqual('8', response['Content-Length'])
+
+    def test_html_only(self):
+        response = self.respond(GET({'next': '/no-here'}),
+                                JsonResponse({'a': '{{uturn:default:/a/}}'}))
+        self.assertTrue(b'{{uturn:default:/a/}}' in response.content)
+
+
+class CachedPageTest(SettingsTestCase):
+
+    def setUp(self):
+        super(CachedPageTest, self).setUp()
+        self.use_settings(UTURN_PLACEHOLDERS=True, MIDDLEWARE=[
+            'uturn.middleware.UturnPlaceholderMiddleware'])
+        cache.clear()
+        del urls.rendered[:]
+
+    def test_one_page_for_every_origin(self):
+        client = Client()
+        first = client.get('/cached/', {'next': '/one/'}).content
+        second = client.get('/cached/', {'next': '/two/'}).content
+        plain = client.get('/cached/').content
+        self.assertEqual(1, len(urls.rendered))
+        self.assertTrue(b"href='/one/'" in first)
+        self.assertTrue(b"value='/one/'" in first)
+        self.assertTrue(b"href='/two/'" in second)
+        self.assertTrue(b"href='/other/'" in plain)
+        self.assertFalse(b'hidden' in plain)
+        for content in (first, second, plain):
+            self.assertTrue(b"href='/default/?next=%2Fcached%2F'" in content)
+            self.assertFalse(b'{{uturn:' in content)
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from unittest import TestCase
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test.utils import override_settings
+from asgiref.sync import async_to_sync
+
+from .http import GET
+
+from ..middleware import UturnLinkMiddleware
+from ..rewrite import LinkRewriter, MAX_TAG_LENGTH
+
+
+INPUT = b"<input type='hidden' name='next' value='/path'>"
+
+PAGE = (b'<html><body>'
+        b'<a href="/one/">one</a>'
+        b'<a data-uturn href="/two/">two</a>'
+        b"<a class='x' href='/three/?a=1#top' data-uturn>three</a>"
+        b'<form method="post" data-uturn action="/four/"><input name="a">'
+        b'</form><a title="a > b" data-uturn href="/five/">five</a>'
+        b'</body></html>')
+
+REWRITTEN = (b'<html><body>'
+             b'<a href="/one/">one</a>'
+             b'<a data-uturn href="/two/?next=%2Fpath">two</a>'
+             b"<a class='x' href='/three/?a=1&amp;next=%2Fpath#top' "
+             b"data-uturn>three</a>"
+             b'<form method="post" data-uturn action="/four/">' + INPUT +
+             b'<input name="a"></form>'
+             b'<a title="a > b" data-uturn href="/five/?next=%2Fpath">'
+             b'five</a></body></html>')
+
+
+def rewrite(content):
+    return LinkRewriter(GET()).rewrite(content)
+
+
+class LinkRewriterTest(TestCase):
+
+    def test_rewrite(self):
+        self.assertEqual(REWRITTEN, rewrite(PAGE))
+
+    def test_unmarked(self):
+        content = b'<a href="/a/">a</a><form action="/b/"></form>'
+        self.assertTrue(rewrite(content) is content)
+
+    def test_bare_href(self):
+        self.assertEqual(b'<a href="/a/?next=%2Fpath" data-uturn>',
+                         rewrite(b'<a href=/a/ data-uturn>'))
+
+    def test_other_attributes(self):
+        content = (b'<a data-uturn-x href="/a/"><abbr data-uturn>'
+                   b'<a data-uturn>')
+        self.assertEqual(content, rewrite(content))
+
+    def test_case_insensitive(self):
+        self.assertEqual(b'<A data-uturn HREF="/a/?next=%2Fpath">',
+                         rewrite(b'<A data-uturn HREF="/a/">'))
+
+    def test_explicit_next(self):
+        content = b'<a data-uturn href="/a/?b=1&amp;next=%2Fb%2F">'
+        self.assertEqual(content, rewrite(content))
+
+    @override_settings(UTURN_RETURN_STACK=True)
+    def test_return_stack(self):
+        content = (b'<a data-uturn href="/a/">'
+                   b'<form data-uturn action="/b/"></form>')
+        rewriter = LinkRewriter(GET({'page': '2', 'next': '/home/'}))
+        self.assertEqual(b'<a data-uturn href="/a/?next=%2Fpath%3Fpage%3D2'
+                         b'+%2Fhome%2F">'
+                         b'<form data-uturn action="/b/"><input '
+                         b"type='hidden' name='next' "
+                         b"value='/path?page=2 /home/'></form>",
+                         rewriter.rewrite(content))
+
+    def test_chunks(self):
+        for size in range(1, len(PAGE) + 1):
+            chunks = [PAGE[i:i + size] for i in range(0, len(PAGE), size)]
+            rewriter = LinkRewriter(GET())
+            self.assertEqual(REWRITTEN, b''.join(rewriter.chunks(chunks)))
+
+    def test_bounded_carry(self):
+        tag = (b'<a data-uturn title="' + b'x' * MAX_TAG_LENGTH +
+               b'" href="/a/">')
+        rewriter = LinkRewriter(GET())
+        output = rewriter.feed(b'<p>' + tag[:MAX_TAG_LENGTH + 10])
+        self.assertEqual(b'', rewriter.carry)
+        output += rewriter.feed(tag[MAX_TAG_LENGTH + 10:]) + rewriter.close()
+        self.assertEqual(b'<p>' + tag, output)
+
+    def test_partial_tag_carried(self):
+        rewriter = LinkRewriter(GET())
+        self.assertEqual(b'<p>', rewriter.feed(b'<p><a data-ut'))
+        self.assertEqual(b'<a data-ut', rewriter.carry)
+        self.assertEqual(b'<a data-uturn href="/a/?next=%2Fpath">',
+                         rewriter.feed(b'urn href="/a/">'))
+
+
+class UturnLinkMiddlewareTest(TestCase):
+
+    def respond(self, response):
+        return UturnLinkMiddleware(lambda request: response)(GET())
+
+    def test_response(self):
+        response = HttpResponse(PAGE)
+        response['Content-Length'] = str(len(PAGE))
+        response = self.respond(response)
+        self.assertEqual(REWRITTEN, response.content)
+        self.assertEqual(str(len(REWRITTEN)), response['Content-Length'])
+
+    def test_streaming_response(self):
+        consumed = []
+
+        def content():
+            for i in range(0, len(PAGE), 7):
+                consumed.append(i)
+                yield PAGE[i:i + 7]
+        response = StreamingHttpResponse(content())
+        response['Content-Length'] = str(len(PAGE))
+        response = self.respond(response)
+        self.assertEqual([], consumed)
+        self.assertFalse(response.has_header('Content-Length'))
+        self.assertEqual(REWRITTEN, b''.join(response.streaming_content))
+
+    def test_async_streaming_response(self):
+        async def content():
+            for i in range(0, len(PAGE), 7):
+                yield PAGE[i:i + 7]
+        response = self.respond(StreamingHttpResponse(content()))
+
+        async def consume():
+            return b''.join([chunk async for chunk in
+                             response.streaming_content])
+        self.assertEqual(REWRITTEN, async_to_sync(consume)())
+
+    def test_not_html(self):
+        response = self.respond(JsonResponse({'a': PAGE.decode('utf-8')}))
+        self.assertFalse(b'next=' in response.content)
+
+    def test_compressed(self):
+        response = HttpResponse(PAGE)
+        response['Content-Encoding'] = 'gzip'
+        self.assertEqual(PAGE, self.respond(response).content)
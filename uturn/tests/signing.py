@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from django.template import RequestContext, Template
+
+from .http import GET, SettingsTestCase
+
+from ..http import encode_redirect_url, get_redirect_url, uturn_fragment, \
+                    uturn_input
+from ..rewrite import LinkRewriter
+from ..signing import sign, unsign
+
+
+class SigningTestCase(SettingsTestCase):
+
+    def setUp(self):
+        super(SigningTestCase, self).setUp()
+        self.use_settings(UTURN_SIGNED=True, SECRET_KEY='secret',
+                          SECRET_KEY_FALLBACKS=[])
+
+
+class SignTest(SigningTestCase):
+
+    def test_roundtrip(self):
+        value = sign('/tickets/?status=open')
+        self.assertTrue(value.startswith('/tickets/?status=open:'))
+        self.assertEqual('/tickets/?status=open', unsign(value))
+
+    def test_compact(self):
+        self.assertEqual(len('/a') + 1 + 22, len(sign('/a')))
+
+    def test_colons(self):
+        self.assertEqual('/a:b', unsign(sign('/a:b')))
+
+    def test_tampered(self):
+        value = sign('/tickets/')
+        self.assertTrue(unsign('/projects/' + value[len('/tickets/'):]) is None)
+        self.assertTrue(unsign(value[:-1]) is None)
+        self.assertTrue(unsign('/tickets/') is None)
+
+    def test_salt(self):
+        value = sign('/tickets/')
+        self.use_settings(UTURN_SIGNING_SALT='other')
+        self.assertTrue(unsign(value) is None)
+
+    def test_secret_key(self):
+        value = sign('/tickets/')
+        self.use_settings(SECRET_KEY='other')
+        self.assertTrue(unsign(value) is None)
+
+    def test_fallback_keys(self):
+        value = sign('/tickets/')
+        self.use_settings(SECRET_KEY='new', SECRET_KEY_FALLBACKS=['secret'])
+        self.assertEqual('/tickets/', unsign(value))
+        self.assertNotEqual(value, sign('/tickets/'))
+
+    def test_rotation(self):
+        self.use_settings(UTURN_SIGNING_KEYS=['old'])
+        value = sign('/tickets/')
+        self.use_settings(UTURN_SIGNING_KEYS=['new', 'old'])
+        self.assertEqual('/tickets/', unsign(value))
+        self.use_settings(UTURN_SIGNING_KEYS=['new'])
+        self.assertTrue(unsign(value) is None)
+
+
+class SignedRedirectTest(SigningTestCase):
+
+    def test_signed(self):
+        request = GET({'next': sign('/tickets/')})
+        self.assertEqual('/tickets/', get_redirect_url(request))
+
+    def test_signed_absolute(self):
+        # Validated before it was signed: not checked again.
+        request = GET({'next': sign('http://example.com/tickets/')})
+        self.assertEqual('http://example.com/tickets/',
+                         get_redirect_url(request))
+
+    def test_unsigned(self):
+        request = GET({'next': '/tickets/'})
+        self.assertEqual('/tickets/', get_redirect_url(request))
+        request = GET({'next': 'http://example.com/tickets/'})
+        self.assertTrue(get_redirect_url(request) is None)
+
+    def test_forged(self):
+        request = GET({'next': 'http://example.com/:forged'})
+        self.assertTrue(get_redirect_url(request) is None)
+
+    def test_require_signature(self):
+        self.use_settings(UTURN_REQUIRE_SIGNATURE=True)
+        request = GET({'next': '/tickets/'})
+        self.assertTrue(get_redirect_url(request) is None)
+        request = GET({'next': sign('/tickets/')})
+        self.assertEqual('/tickets/', get_redirect_url(request))
+
+    def test_disabled(self):
+        value = sign('/tickets/')
+        self.use_settings(UTURN_SIGNED=False)
+        self.assertEqual(value, get_redirect_url(GET({'next': value})))
+        self.assertEqual('next=%2Fpath', uturn_fragment(GET()))
+
+
+class SignedTemplateTagTest(SigningTestCase):
+
+    def test_uturn(self):
+        request = GET()
+        uturn = Template("{% load uturn %}{% uturn 'with_params' 'hi' %}")
+        url = uturn.render(RequestContext(request))
+        self.assertEqual('/with-params/hi/?' + uturn_fragment(request), url)
+        self.assertTrue(uturn_fragment(request).startswith('next=%2Fpath%3A'))
+
+    def test_uturn_param(self):
+        uturn = Template("{% load uturn %}{% uturn_param %}")
+        html = uturn.render(RequestContext(GET({'next': '/tickets/'})))
+        self.assertTrue(" value='%s'" % sign('/tickets/') in html)
+
+
+class SigningOracleTest(SigningTestCase):
+    """
+    Only values ``get_redirect_url`` would accept are signed, so pages can't
+    be used to sign arbitrary next URLs.
+
+    """
+    def request(self, path):
+        request = GET()
+        request.path = path
+        return request
+
+    def test_fragment(self):
+        fragment = uturn_fragment(self.request('//evil.com/x'))
+        self.assertEqual('next=%2F%2Fevil.com%2Fx', fragment)
+        request = GET({'next': '//evil.com/x'})
+        self.assertTrue(get_redirect_url(request) is None)
+
+    def test_rewriter(self):
+        rewriter = LinkRewriter(self.request('/\\evil.com'))
+        self.assertTrue(b"value='/\\evil.com'" in rewriter.input())
+
+    def test_input(self):
+        # Accepted because it's signed, but passed along unsigned: it's not
+        # an URL the request would accept by itself
+        request = GET({'next': sign('http://example.com/')})
+        self.assertTrue("value='http://example.com/'" in uturn_input(request))
+        request = GET({'next': '/tickets/'})
+        self.assertTrue(sign('/tickets/') in uturn_input(request))
+
+    def test_encode(self):
+        self.assertEqual(sign('/tickets/'), encode_redirect_url('/tickets/'))
+        self.assertEqual('//evil.com/', encode_redirect_url('//evil.com/'))
+        self.assertEqual(sign('//testserver/'),
+                         encode_redirect_url('//testserver/', GET()))
+        self.use_settings(UTURN_ALLOWED_HOSTS=['example.com'])
+        self.assertEqual(sign('http://example.com/'),
+                         encode_redirect_url('http://example.com/'))
@@ -1,14 +1,84 @@
 # -*- coding: utf-8 -*-
 from unittest import TestCase
-from django.template import Template, RequestContext
-from django import VERSION as django_version
+from django.template import Context, Template, RequestContext
+from django.test.utils import override_settings
+from django.utils import translation
+from django.urls import NoReverseMatch, clear_url_caches, set_script_prefix
 
-from .http import GET
+from .http import GET, SettingsTestCase
 
-if django_version[:2] == (1, 4):
-    NAME = 'with_params'
-else:
-    NAME = "'with_params'"
+from ..templatetags import uturn as tags
+from ..templatetags.uturn import reverse_cache_info
+
+NAME = "'with_params'"
+
+
+#: Renders shared by the template tags and the Jinja2 globals: the tag, its
+#: arguments and keyword arguments, the request parameters (``None`` renders
+#: without a request), the settings and the expected output.
+MATRIX = [
+    ('uturn', ['with_params', 'hi'], {}, {}, {},
+     '/with-params/hi/?next=%2Fpath'),
+    ('uturn', ['with_params'], {'name': 'hi'}, {'next': '/login'}, {},
+     '/with-params/hi/?next=%2Fpath'),
+    ('uturn', ['with_params', 1], {}, None, {}, '/with-params/1/'),
+    ('uturn', ['with_params', 'hi'], {}, {}, {'UTURN_REDIRECT_PARAM': 'back'},
+     '/with-params/hi/?back=%2Fpath'),
+    ('uturn', ['with_params', 'hi'], {}, {}, {'UTURN_PLACEHOLDERS': True},
+     '/with-params/hi/?{{uturn:fragment}}'),
+    ('defaulturl', ['with_params', 'hi'], {}, {}, {}, '/with-params/hi/'),
+    ('defaulturl', ['with_params', 'hi'], {}, {'next': '/login'}, {},
+     '/login'),
+    ('defaulturl', ['with_params', 'hi'], {}, {'next': 'login'}, {},
+     '/with-params/hi/'),
+    ('defaulturl', ['with_params', 'hi'], {}, {'next': '/a?x=1&y=2'}, {},
+     '/a?x=1&amp;y=2'),
+    ('defaulturl', ['with_params', 'hi'], {}, {'next': '/<b>'}, {},
+     '/&lt;b&gt;'),
+    ('defaulturl', ['with_params', 'hi'], {}, {'next': '/login'},
+     {'UTURN_PLACEHOLDERS': True}, '{{uturn:default:/with-params/hi/}}'),
+    ('defaulturl', ['with_params', 'hi'], {}, None, {}, '/with-params/hi/'),
+    ('uturn_param', [], {}, {}, {}, ''),
+    ('uturn_param', [], {}, {'next': '/okay-then'}, {},
+     "<div style='display:none'><input type='hidden' name='next' "
+     "value='/okay-then'></div>"),
+    ('uturn_param', [], {}, {'next': '/okay-then'},
+     {'UTURN_PLACEHOLDERS': True}, '{{uturn:input}}'),
+    ('uturn_param', [], {}, None, {}, ''),
+]
+
+
+def literal(value):
+    return "'%s'" % value if isinstance(value, str) else str(value)
+
+
+class MatrixTests(object):
+    """
+    Renders the ``MATRIX`` with ``render(tag, args, kwargs, request)``.
+
+    """
+    def test_matrix(self):
+        for tag, args, kwargs, data, settings, expected in MATRIX:
+            with override_settings(**settings):
+                request = GET(data) if data is not None else None
+                self.assertEqual(expected,
+                                 self.render(tag, args, kwargs, request),
+                                 (tag, args, kwargs, data, settings))
+
+
+def tag_source(tag, args, kwargs, sep=' '):
+    bits = [literal(arg) for arg in args]
+    bits += ['%s=%s' % (k, literal(v)) for k, v in kwargs.items()]
+    return '{% ' + tag + ' ' + sep.join(bits) + ' %}'
+
+
+class DjangoMatrixTest(MatrixTests, TestCase):
+
+    def render(self, tag, args, kwargs, request):
+        t = Template('{% load uturn %}' + tag_source(tag, args, kwargs))
+        if request is None:
+            return t.render(Context())
+        return t.render(RequestContext(request))
 
 
 class DefaultUrlTemplateTagTest(TestCase):
@@ -26,6 +96,18 @@ class DefaultUrlTemplateTagTest(TestCase):
         self.assertEqual('/login', uturn.render(c))
         self.assertEqual('/with-params/hi/', url.render(c))
 
+    def test_escaped(self):
+        c = RequestContext(GET({'next': '/"><script>x</script>'}))
+        escaped = '/&quot;&gt;&lt;script&gt;x&lt;/script&gt;'
+        t = Template("{% load uturn %}{% defaulturl " + NAME + " 'hi' %}")
+        self.assertEqual(escaped, t.render(c))
+        t = Template("{% load uturn %}"
+                     "{% defaulturl " + NAME + " 'hi' as url %}{{ url }}")
+        self.assertEqual(escaped, t.render(c))
+        t = Template("{% load uturn %}{% autoescape off %}"
+                     "{% defaulturl " + NAME + " 'hi' %}{% endautoescape %}")
+        self.assertEqual('/"><script>x</script>', t.render(c))
+
 
 class UturnTemplateTagTest(TestCase):
 
@@ -47,26 +129,188 @@ class UturnTemplateTagTest(TestCase):
 
 class UturnParamTemplateTagTest(TestCase):
 
-    def setUp(self):
-        from django import VERSION
-        super(UturnParamTemplateTagTest, self).setUp()
-        self.with_request = VERSION[:2] == (1, 2)
-
     def test_plain(self):
-        if self.with_request:
-            uturn = Template("{% load uturn %}{% uturn_param request %}")
-        else:
-            uturn = Template("{% load uturn %}{% uturn_param %}")
+        uturn = Template("{% load uturn %}{% uturn_param %}")
         c = RequestContext(GET())
         self.assertEqual("", uturn.render(c))
 
 
     def test_override(self):
-        if self.with_request:
-            uturn = Template("{% load uturn %}{% uturn_param request %}")
-        else:
-            uturn = Template("{% load uturn %}{% uturn_param %}")
+        uturn = Template("{% load uturn %}{% uturn_param %}")
         c = RequestContext(GET({'next': '/okay-then'}))
         html = uturn.render(c)
         self.assertTrue(" value='/okay-then'" in html)
         self.assertTrue(" name='next'" in html)
+
+
+class ReverseCacheTest(SettingsTestCase):
+
+    def setUp(self):
+        super(ReverseCacheTest, self).setUp()
+        self.use_settings(UTURN_REVERSE_CACHE_SIZE=2)
+
+    def render(self, tag='uturn', arg="'hi'", context=None, name=NAME):
+        t = Template("{% load uturn %}{% " + tag + " " + name + " " + arg +
+                     " %}")
+        return t.render(RequestContext(GET(), context or {}))
+
+    def test_disabled(self):
+        self.use_settings(UTURN_REVERSE_CACHE_SIZE=0)
+        self.assertEqual('/with-params/hi/?next=%2Fpath', self.render())
+        self.assertTrue(reverse_cache_info() is None)
+
+    def test_cached(self):
+        # Tags with literal arguments only are folded instead
+        hi = {'name': 'hi'}
+        self.assertEqual('/with-params/hi/?next=%2Fpath',
+                         self.render(arg='name', context=hi))
+        self.assertEqual('/with-params/hi/?next=%2Fpath',
+                         self.render(arg='name', context=hi))
+        self.assertEqual('/with-params/hi/',
+                         self.render('defaulturl', arg='name', context=hi))
+        info = reverse_cache_info()
+        self.assertEqual((2, 1, 1), (info.hits, info.misses, info.currsize))
+
+    def test_arguments(self):
+        self.assertEqual('/with-params/hi/?next=%2Fpath',
+                         self.render(arg='name', context={'name': 'hi'}))
+        self.assertEqual('/with-params/ho/?next=%2Fpath',
+                         self.render(arg='name', context={'name': 'ho'}))
+        self.assertEqual('/with-params/1/?next=%2Fpath',
+                         self.render(arg='name', context={'name': 1}))
+        self.assertEqual(0, reverse_cache_info().hits)
+
+    def test_bounded(self):
+        for name in ('a', 'b', 'c'):
+            self.render(arg='name', context={'name': name})
+        self.assertEqual(2, reverse_cache_info().currsize)
+
+    def test_uncacheable_arguments(self):
+        class Name(object):
+            def __str__(self):
+                return 'hi'
+        self.assertEqual('/with-params/hi/?next=%2Fpath',
+                         self.render(arg='name', context={'name': Name()}))
+        self.assertEqual(0, reverse_cache_info().currsize)
+
+    def test_cleared_with_url_caches(self):
+        hi = {'name': 'hi'}
+        self.render(arg='name', context=hi)
+        self.render(arg='name', context=hi)
+        clear_url_caches()
+        self.render(arg='name', context=hi)
+        info = reverse_cache_info()
+        self.assertEqual((0, 1, 1), (info.hits, info.misses, info.currsize))
+
+    def test_asvar(self):
+        t = Template("{% load uturn %}{% uturn " + NAME + " 'hi' as url %}"
+                     "<{{ url }}>")
+        self.assertEqual('</with-params/hi/?next=%2Fpath>',
+                         t.render(RequestContext(GET())))
+
+    def test_asvar_escaped_once(self):
+        t = Template("{% load uturn %}{% uturn 'text' text as url %}{{ url }}|"
+                     "{% defaulturl 'text' text as url %}{{ url }}|"
+                     "{% uturn 'text' text %}")
+        self.assertEqual('/text/x&amp;y/?next=%2Fpath|/text/x&amp;y/|'
+                         '/text/x&amp;y/?next=%2Fpath',
+                         t.render(RequestContext(GET(), {'text': 'x&y'})))
+
+    def test_language(self):
+        context = {'name': 'ticket-add'}
+        for language in ('en', 'fr', 'en'):
+            with translation.override(language):
+                self.assertEqual('/%s/tickets/add/' % language,
+                                 self.render('defaulturl', '', context,
+                                             'name'))
+        info = reverse_cache_info()
+        self.assertEqual((1, 2, 2), (info.hits, info.misses, info.currsize))
+
+
+class FoldedUrlTest(TestCase):
+
+    def setUp(self):
+        super(FoldedUrlTest, self).setUp()
+        self.reversed = []
+        self.reverse = tags.reverse
+
+        def reverse(*args, **kwargs):
+            self.reversed.append(args)
+            return self.reverse(*args, **kwargs)
+        tags.reverse = reverse
+
+    def tearDown(self):
+        tags.reverse = self.reverse
+        super(FoldedUrlTest, self).tearDown()
+
+    def node(self, tag):
+        return Template("{% load uturn %}" + tag).nodelist[-1]
+
+    def test_literals_folded(self):
+        for tag in ("{% uturn 'with_params' 'hi' %}",
+                    "{% defaulturl 'with_params' 1 %}",
+                    "{% uturn 'with_params' name='hi' as url %}"):
+            self.assertFalse(self.node(tag).folded is None, tag)
+
+    def test_not_folded(self):
+        for tag in ("{% uturn 'with_params' name %}",
+                    "{% uturn name 'hi' %}",
+                    "{% uturn 'with_params' 'hi'|upper %}",
+                    "{% uturn 'app:with_params' 'hi' %}"):
+            self.assertTrue(self.node(tag).folded is None, tag)
+
+    def test_reversed_once(self):
+        t = Template("{% load uturn %}{% uturn 'with_params' 'hi' %}"
+                     "{% defaulturl 'with_params' 'hi' %}")
+        for i in range(3):
+            self.assertEqual('/with-params/hi/?next=%2Fpath/with-params/hi/',
+                             t.render(RequestContext(GET())))
+        self.assertEqual(2, len(self.reversed))
+
+    def test_request_specific(self):
+        t = Template("{% load uturn %}{% uturn 'with_params' 'hi' %}"
+                     "|{% defaulturl 'with_params' 'hi' %}")
+        self.assertEqual('/with-params/hi/?next=%2Fpath|/with-params/hi/',
+                         t.render(RequestContext(GET())))
+        self.assertEqual('/with-params/hi/?next=%2Fpath|/login',
+                         t.render(RequestContext(GET({'next': '/login'}))))
+
+    def test_cleared_with_url_caches(self):
+        t = Template("{% load uturn %}{% uturn 'with_params' 'hi' %}")
+        t.render(RequestContext(GET()))
+        clear_url_caches()
+        t.render(RequestContext(GET()))
+        self.assertEqual(2, len(self.reversed))
+
+    def test_script_prefix(self):
+        t = Template("{% load uturn %}{% defaulturl 'with_params' 'hi' %}")
+        self.assertEqual('/with-params/hi/', t.render(RequestContext(GET())))
+        set_script_prefix('/app/')
+        try:
+            self.assertEqual('/app/with-params/hi/',
+                             t.render(RequestContext(GET())))
+        finally:
+            set_script_prefix('/')
+
+    def test_language(self):
+        t = Template("{% load uturn %}{% defaulturl 'ticket-add' %}")
+        for language in ('en', 'fr', 'en'):
+            with translation.override(language):
+                self.assertEqual('/%s/tickets/add/' % language,
+                                 t.render(RequestContext(GET())))
+        self.assertEqual(2, len(self.reversed))
+
+    def test_asvar_unescaped(self):
+        t = Template("{% load uturn %}"
+                     "{% defaulturl 'text' 'x&y' as url %}{{ url }}|"
+                     "{% defaulturl 'text' 'x&y' %}|"
+                     "{% url 'text' 'x&y' as url %}{{ url }}")
+        self.assertEqual('/text/x&amp;y/|/text/x&amp;y/|/text/x&amp;y/',
+                         t.render(RequestContext(GET())))
+
+    def test_no_reverse_match(self):
+        t = Template("{% load uturn %}{% defaulturl 'nonexistent' as url %}"
+                     "<{{ url }}>")
+        self.assertEqual('<>', t.render(RequestContext(GET())))
+        t = Template("{% load uturn %}{% uturn 'nonexistent' %}")
+        self.assertRaises(NoReverseMatch, t.render, RequestContext(GET()))
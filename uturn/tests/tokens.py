@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from django.core.cache import caches
+from django.template import RequestContext, Template
+
+from .http import GET, POST, SettingsTestCase
+
+from .. import tokens
+from ..http import get_redirect_url, smart_redirect, uturn_fragment
+from ..tokens import resolve, tokenize
+
+
+class TokenTestCase(SettingsTestCase):
+
+    def setUp(self):
+        super(TokenTestCase, self).setUp()
+        self.use_settings(
+            UTURN_TOKENS=True,
+            UTURN_TOKEN_CACHE='uturn',
+            CACHES={
+                'default': {
+                    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                },
+                'uturn': {
+                    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                    'LOCATION': 'uturn-tests',
+                },
+            })
+        caches['uturn'].clear()
+
+
+class TokenizeTest(TokenTestCase):
+
+    def setUp(self):
+        super(TokenizeTest, self).setUp()
+        self.get_random_string = tokens.get_random_string
+
+    def tearDown(self):
+        tokens.get_random_string = self.get_random_string
+        super(TokenizeTest, self).tearDown()
+
+    def fake_random(self, *values):
+        values = list(values)
+        tokens.get_random_string = lambda length, chars: values.pop(0)
+
+    def test_roundtrip(self):
+        token = tokenize('/tickets/?status=open&page=2')
+        self.assertTrue(token.startswith('~'))
+        self.assertEqual(9, len(token))
+        self.assertEqual('/tickets/?status=open&page=2', resolve(token))
+
+    def test_length(self):
+        self.use_settings(UTURN_TOKEN_LENGTH=4)
+        self.assertEqual(5, len(tokenize('/tickets/')))
+
+    def test_same_url_same_token(self):
+        self.assertEqual(tokenize('/tickets/'), tokenize('/tickets/'))
+        self.assertNotEqual(tokenize('/tickets/'), tokenize('/projects/'))
+
+    def test_collision(self):
+        self.fake_random('aaaa', 'aaaa', 'bbbb')
+        self.assertEqual('~aaaa', tokenize('/tickets/'))
+        self.assertEqual('~bbbb', tokenize('/projects/'))
+        self.assertEqual('/tickets/', resolve('~aaaa'))
+        self.assertEqual('/projects/', resolve('~bbbb'))
+
+    def test_too_many_collisions(self):
+        self.fake_random(*(['aaaa'] * (tokens.MAX_ATTEMPTS + 1)))
+        self.assertEqual('~aaaa', tokenize('/tickets/'))
+        self.assertEqual('/projects/', tokenize('/projects/'))
+
+    def test_expired(self):
+        token = tokenize('/tickets/')
+        caches['uturn'].clear()
+        self.assertTrue(resolve(token) is None)
+        self.assertNotEqual(token, tokenize('/tickets/'))
+
+
+class TokenRedirectTest(TokenTestCase):
+
+    def test_resolved(self):
+        token = tokenize('/tickets/?status=open')
+        request = GET({'next': token})
+        self.assertEqual('/tickets/?status=open', get_redirect_url(request))
+        request = POST({'next': token})
+        self.assertEqual('/tickets/?status=open', get_redirect_url(request))
+
+    def test_expired(self):
+        token = tokenize('/tickets/?status=open')
+        caches['uturn'].clear()
+        response = smart_redirect(GET({'next': token}), '/default')
+        self.assertEqual('/default', response['Location'])
+
+    def test_unknown(self):
+        self.assertTrue(get_redirect_url(GET({'next': '~unknown'})) is None)
+
+    def test_disabled(self):
+        token = tokenize('/tickets/')
+        self.use_settings(UTURN_TOKENS=False)
+        self.assertTrue(get_redirect_url(GET({'next': token})) is None)
+        self.assertEqual('next=%2Fpath', uturn_fragment(GET()))
+
+    def test_plain_urls(self):
+        request = GET({'next': '/tickets/'})
+        self.assertEqual('/tickets/', get_redirect_url(request))
+
+
+class TokenTemplateTagTest(TokenTestCase):
+
+    def test_uturn(self):
+        uturn = Template("{% load uturn %}{% uturn 'with_params' 'hi' %}")
+        url = uturn.render(RequestContext(GET()))
+        self.assertEqual('/with-params/hi/?next=' + tokenize('/path'), url)
+
+    def test_uturn_param(self):
+        token = tokenize('/tickets/?status=open')
+        uturn = Template("{% load uturn %}{% uturn_param %}")
+        html = uturn.render(RequestContext(GET({'next': token})))
+        self.assertTrue(" value='%s'" % token in html)
+        html = uturn.render(RequestContext(GET({'next': '/tickets/'})))
+        self.assertTrue(" value='%s'" % tokenize('/tickets/') in html)
@@ -1,5 +1,12 @@
 # -*- coding: utf-8 -*-
-from django.conf.urls.defaults import patterns, url
+from django.conf.urls.i18n import i18n_patterns
+from django.http import HttpResponse, HttpResponseRedirect, \
+                        StreamingHttpResponse
+from django.template import RequestContext, Template
+from django.urls import re_path
+from django.views.decorators.cache import cache_page
+
+from ..decorators import uturn
 
 
 def default_view(request):
@@ -13,8 +20,60 @@ def with_params(request, *args, **kwargs):
     return None
 
 
-urlpatterns = patterns('',
-    url(r'^default/$', default_view, name='default_view'),
-    url(r'^other/$', other_view, name='other_view'),
-    url(r'^with-params/(?P<name>\w+)/$', with_params, name='with_params'),
+def redirect_view(request):
+    return HttpResponseRedirect('/to-here')
+
+
+async def async_redirect_view(request):
+    return HttpResponseRedirect('/to-here')
+
+
+async def async_view(request):
+    return HttpResponse(b'hi')
+
+
+#: Set when the body of ``streaming_view`` is consumed.
+streamed = []
+
+
+def streaming_body():
+    streamed.append(True)
+    yield b'streamed'
+
+
+def streaming_view(request):
+    return StreamingHttpResponse(streaming_body())
+
+
+#: Set each time ``cached_view`` renders its template.
+rendered = []
+
+cached_template = Template("{% load uturn %}"
+                           "<a href='{% uturn 'default_view' %}'>edit</a>"
+                           "<a href='{% defaulturl 'other_view' %}'>back</a>"
+                           "<form>{% uturn_param %}</form>")
+
+
+@cache_page(60, key_prefix='uturn-tests')
+def cached_view(request):
+    rendered.append(True)
+    return HttpResponse(cached_template.render(RequestContext(request)))
+
+
+urlpatterns = [
+    re_path(r'^default/$', default_view, name='default_view'),
+    re_path(r'^other/$', other_view, name='other_view'),
+    re_path(r'^with-params/(?P<name>\w+)/$', with_params, name='with_params'),
+    re_path(r'^text/(?P<text>[^/]+)/$', with_params, name='text'),
+    re_path(r'^redirect/$', redirect_view, name='redirect_view'),
+    re_path(r'^uturn-redirect/$', uturn(redirect_view)),
+    re_path(r'^async-redirect/$', async_redirect_view),
+    re_path(r'^async-uturn-redirect/$', uturn(async_redirect_view)),
+    re_path(r'^async/$', async_view),
+    re_path(r'^streaming/$', streaming_view),
+    re_path(r'^cached/$', cached_view),
+]
+
+urlpatterns += i18n_patterns(
+    re_path(r'^tickets/add/$', default_view, name='ticket-add'),
 )
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import random
+from urllib.parse import urlsplit
+from django.http.request import split_domain_port
+from django.utils.http import url_has_allowed_host_and_scheme
+
+from .http import GET, SettingsTestCase
+
+from .. import http
+from ..conf import get_config
+
+
+#: Pieces next URLs are built from by the fuzzer: separators, schemes,
+#: hosts and the characters browsers treat in surprising ways.
+TOKENS = [
+    '/', '/', '/', '//', '///', '\\', '/\\', '\\\\', '\t', '\n', '\r', ' ',
+    '\x00', '\x01', '\x1f', '\x7f', '\xa0', '​', '　', '﻿',
+    'http:', 'https:', 'HTTP:', 'hTTps:', 'javascript:', 'ftp:', 'data:',
+    'mailto:', ':', '//testserver', 'testserver', 'example.com', 'evil.com',
+    'sub.example.com', 'TESTSERVER', '@', 'user:pass@', ':80', ':443', '.',
+    '..', '?', '#', '&', '=', 'next', '%2F', '%5C', '%2f%2f', '%09', '%00',
+    'a', 'path', 'b/c', '[', ']', '[::1]', 'ı', 'xn--', '／', ';',
+]
+
+#: Starts of fuzzed next URLs.
+PREFIXES = [
+    '', '/', '/', '//', '///', '\\\\', '/\\', '\\/', 'http://', 'https://',
+    'HTTP://', 'http:/', 'http:', 'http:\\\\', 'javascript:', 'ftp://', ' ',
+    '\t', '\x01', '\xa0//',
+]
+
+#: Hosts following the prefixes.
+HOSTS = [
+    '', 'testserver', 'TESTSERVER', 'example.com', 'evil.com',
+    'user@testserver', 'testserver:80', 'testserver@evil.com',
+    'evil.com@testserver', 'evil.com\\@testserver', '[::1]', 'ex\tample.com',
+]
+
+#: Hosts allowed in the fuzzed configurations, besides ``testserver``.
+ALLOWED_HOSTS = ['example.com']
+
+
+def fuzzed(rng):
+    return (rng.choice(PREFIXES) + rng.choice(HOSTS) +
+            ''.join(rng.choice(TOKENS) for i in range(rng.randint(0, 4))))
+
+
+def validate(next):
+    return http._validate(GET(), next, get_config())
+
+
+def django_accepts(url, hosts):
+    allowed = set(hosts)
+    # Uturn compares domains like ALLOWED_HOSTS does, ignoring case and port;
+    # Django compares the whole host
+    try:
+        netloc = urlsplit(url.strip()).netloc
+    except ValueError:
+        netloc = ''
+    if split_domain_port(netloc)[0] in hosts:
+        allowed.add(netloc)
+    return url_has_allowed_host_and_scheme(url, allowed)
+
+
+class ValidatorTest(SettingsTestCase):
+
+    def test_plain_paths(self):
+        for next in ('/', '/a', '/tickets/?status=open&page=2#top',
+                     '/a//b', '/%2F%2Fevil.com', '/caf\xe9', '/?next=//x'):
+            self.assertEqual(next, validate(next))
+
+    def test_rejected(self):
+        for next in ('//evil.com', '///evil.com', '/\\evil.com',
+                     '\\\\evil.com', '/\t/evil.com', '/\n/evil.com',
+                     '\x01//evil.com', ' //evil.com', '\xa0//evil.com',
+                     'http:///evil.com', 'http:/evil.com', 'http:evil.com',
+                     'javascript:alert(1)', 'JavaScript://testserver/%0a',
+                     'ftp://testserver/', 'data:text/html,x', 'path', '//',
+                     'http://[::1', 'http://testserver\\@evil.com/',
+                     'http://evil.com\\@testserver/', '/a\\b', '/a\x00'):
+            self.assertEqual(None, validate(next), repr(next))
+
+    def test_absolute(self):
+        for next in ('http://testserver/a', 'https://TestServer/a',
+                     '//testserver/a?b#c'):
+            self.assertEqual(next, validate(next))
+        self.assertEqual(None, validate('http://user@testserver/a'))
+        self.use_settings(UTURN_ALLOWED_HOSTS=['example.com'])
+        self.assertEqual('https://example.com/a',
+                         validate('https://example.com/a'))
+        self.assertEqual(None, validate('http://testserver/a'))
+
+    def test_rejection_reasons(self):
+        rejected = []
+
+        def receiver(sender, request, value, reason, **kwargs):
+            rejected.append(reason)
+        http.signals.redirect_rejected.connect(receiver)
+        try:
+            for next in ('/\\evil.com', 'ftp://testserver/',
+                         'http://evil.com/'):
+                validate(next)
+        finally:
+            http.signals.redirect_rejected.disconnect(receiver)
+        self.assertEqual(['path', 'scheme', 'host'], rejected)
+
+
+class DifferentialFuzzTest(SettingsTestCase):
+    """
+    Every next URL Uturn accepts must be accepted by Django's
+    ``url_has_allowed_host_and_scheme`` with the same hosts.
+
+    """
+    ITERATIONS = 20000
+
+    def fuzz(self, hosts, seed):
+        rng = random.Random(seed)
+        accepted = absolute = 0
+        for i in range(self.ITERATIONS):
+            next = fuzzed(rng)
+            if validate(next) is not None:
+                self.assertTrue(django_accepts(next, hosts),
+                                'Uturn accepts %r, Django does not' % next)
+                accepted += 1
+                absolute += not http._PLAIN_PATH_RE.match(next)
+        # Make sure the fuzzer exercises the accepting paths as well
+        self.assertTrue(accepted > self.ITERATIONS // 20, accepted)
+        self.assertTrue(absolute > self.ITERATIONS // 400, absolute)
+
+    def test_current_host(self):
+        self.fuzz(['testserver'], 601)
+
+    def test_allowed_hosts(self):
+        self.use_settings(UTURN_ALLOWED_HOSTS=ALLOWED_HOSTS)
+        self.fuzz(ALLOWED_HOSTS, 1601)
+
+    def test_plain_path_fast_path(self):
+        # The fast path must never accept what the strict validation rejects
+        rng = random.Random(2601)
+        for i in range(self.ITERATIONS):
+            next = '/' + ''.join(rng.choice(TOKENS)
+                                 for j in range(rng.randint(0, 5)))
+            if http._PLAIN_PATH_RE.match(next) is not None:
+                self.assertTrue(django_accepts(next, ['testserver']),
+                                repr(next))
+                self.assertEqual(urlsplit(next).netloc, '', repr(next))
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+from django import forms
+from django.views.generic.edit import FormView
+
+from .forms import TicketForm
+from .http import GET, POST, SettingsTestCase
+
+from ..conf import get_config
+from ..views import UturnMixin
+
+
+class PlainForm(forms.Form):
+    title = forms.CharField()
+
+
+class TicketView(UturnMixin, FormView):
+    form_class = TicketForm
+    success_url = '/tickets/'
+
+
+class PlainTicketView(UturnMixin, FormView):
+    form_class = PlainForm
+    success_url = '/tickets/'
+
+
+class UturnMixinTest(SettingsTestCase):
+
+    def post(self, data, view=TicketView):
+        return view.as_view()(POST(data))
+
+    def test_success_url(self):
+        response = self.post({'title': 'Fish'})
+        self.assertEqual(302, response.status_code)
+        self.assertEqual('/tickets/', response['Location'])
+
+    def test_next(self):
+        response = self.post({'title': 'Fish', 'next': '/tickets/?q=bass'})
+        self.assertEqual('/tickets/?q=bass', response['Location'])
+
+    def test_invalid_next(self):
+        response = self.post({'title': 'Fish', 'next': '//evil.com/'})
+        self.assertEqual('/tickets/', response['Location'])
+
+    def test_invalid_form(self):
+        view = TicketView()
+        view.setup(POST({'next': '/tickets/?q=bass'}))
+        form = view.get_form()
+        self.assertFalse(form.is_valid())
+        self.assertTrue("value='/tickets/?q=bass'" in str(form['next']))
+
+    def test_plain_form(self):
+        response = self.post({'title': 'Fish', 'next': '/tickets/?q=bass'},
+                             PlainTicketView)
+        self.assertEqual('/tickets/?q=bass', response['Location'])
+        view = PlainTicketView()
+        view.setup(GET({'next': '/tickets/'}))
+        self.assertFalse('next' in view.get_form().fields)
+
+    def test_form_request(self):
+        view = TicketView()
+        request = GET({'next': '/tickets/'})
+        view.setup(request)
+        self.assertTrue(view.get_form().uturn_request is request)
+
+    def test_form_kwargs(self):
+        request = GET({'next': '/tickets/'})
+        view = TicketView()
+        view.setup(request)
+        self.assertTrue(view.get_form_kwargs()['uturn_request'] is request)
+        view = PlainTicketView()
+        view.setup(request)
+        self.assertFalse('uturn_request' in view.get_form_kwargs())
+
+    def test_loop(self):
+        view = TicketView()
+        view.setup(GET({'next': '/path'}))
+        self.assertEqual('/tickets/', view.get_success_url())
+
+    def test_metrics(self):
+        self.use_settings(UTURN_METRICS=True)
+        get_config().metrics.reset()
+        self.post({'title': 'Fish', 'next': '/tickets/?q=bass'})
+        self.post({'title': 'Fish'})
+        counters = get_config().metrics.counters()
+        self.assertEqual(1, counters[('uturn_redirects_total', 'overridden')])
+        self.assertEqual(1, counters[('uturn_redirects_total', 'kept')])
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Short tokens standing in for next URLs.
+
+When the ``UTURN_TOKENS`` setting is enabled, next URLs are stored in the
+Django cache named by ``UTURN_TOKEN_CACHE`` (``default`` by default) under a
+short random token, which is passed around instead of the URL itself. Tokens
+expire after ``UTURN_TOKEN_TIMEOUT`` seconds or when the cache evicts them;
+an expired token simply results in the default redirect.
+
+"""
+import hashlib
+
+from django.core.cache import caches
+from django.utils.crypto import get_random_string
+
+from .conf import get_config
+
+
+#: Tokens start with this character, which never starts a next URL.
+TOKEN_PREFIX = '~'
+
+#: Characters tokens are made of; none of them need to be URL encoded.
+TOKEN_CHARS = ('abcdefghijklmnopqrstuvwxyz'
+               'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_')
+
+#: Number of times a new random token is tried when it's already taken.
+MAX_ATTEMPTS = 5
+
+
+def is_token(value):
+    return value.startswith(TOKEN_PREFIX)
+
+
+def tokenize(url):
+    """
+    Returns the token for ``url``, storing it in the cache when necessary.
+
+    The same URL keeps the same token until it expires. Falls back to the URL
+    itself when no unique token could be found.
+
+    """
+    config = get_config()
+    cache = caches[config.token_cache]
+    timeout = config.token_timeout
+    url_key = _url_key(url)
+    token = cache.get(url_key)
+    if token is not None and cache.get(_token_key(token)) == url:
+        if hasattr(cache, 'touch'):
+            cache.touch(url_key, timeout)
+            cache.touch(_token_key(token), timeout)
+        return token
+    for attempt in range(MAX_ATTEMPTS):
+        token = TOKEN_PREFIX + get_random_string(config.token_length,
+                                                 TOKEN_CHARS)
+        # add() leaves existing keys alone, so colliding tokens never
+        # overwrite another URL
+        if cache.add(_token_key(token), url, timeout):
+            cache.set(url_key, token, timeout)
+            return token
+    return url
+
+
+def resolve(token):
+    """
+    Returns the URL stored for ``token`` or ``None`` when it's unknown or
+    expired.
+
+    """
+    cache = caches[get_config().token_cache]
+    return cache.get(_token_key(token))
+
+
+def _token_key(token):
+    return 'uturn:token:' + token
+
+
+def _url_key(url):
+    digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    return 'uturn:url:' + digest
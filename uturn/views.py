@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from django.http import Http404, HttpResponse
+
+from .conf import get_config
+from .forms import UturnFormMixin
+from .http import get_redirect_target
+from .metrics import render_prometheus
+
+
+class UturnMixin(object):
+    """
+    Mixin for Django's generic editing views (``CreateView``, ``UpdateView``,
+    ``DeleteView`` and ``FormView``) redirecting to the next URL of the
+    request, when there's a valid one, instead of the success URL::
+
+        class TicketUpdate(UturnMixin, UpdateView):
+            model = Ticket
+            fields = ['title']
+            success_url = reverse_lazy('ticket-list')
+
+    The next URL is returned by ``get_success_url``, so views don't need the
+    ``uturn`` decorator or ``UturnMiddleware`` to examine their responses.
+    Redirects that would loop are ignored like they are by those. The
+    redirects are counted by the metrics, but the ``redirect_overridden`` and
+    ``redirect_kept`` signals aren't sent: there's no response yet.
+
+    Forms using ``uturn.forms.UturnFormMixin`` get the request, so they can
+    pass the next URL along in a hidden field.
+
+    """
+    def get_success_url(self):
+        next = get_redirect_target(self.request)
+        metrics = get_config().metrics
+        if metrics is not None:
+            metrics.increment('uturn_redirects_total',
+                              'overridden' if next else 'kept')
+        if next:
+            return next
+        return super(UturnMixin, self).get_success_url()
+
+    def get_form_kwargs(self):
+        kwargs = super(UturnMixin, self).get_form_kwargs()
+        if issubclass(self.get_form_class(), UturnFormMixin):
+            kwargs['uturn_request'] = self.request
+        return kwargs
+
+
+def metrics(request):
+    """
+    Renders the metrics collected by Uturn in the Prometheus text format.
+
+    Responds with a 404 unless the ``UTURN_METRICS`` setting is enabled. The
+    view doesn't restrict access by itself: protect it when you add it to your
+    URL configuration.
+
+    """
+    collector = get_config().metrics
+    if collector is None:
+        raise Http404('Uturn metrics are disabled')
+    return HttpResponse(render_prometheus(collector),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')